@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import hashlib
+import zlib
+from typing import Iterable
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from .models import LiteratureWork, TextBlob
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def put_text(session: Session, text: str) -> str:
+    """Store text compressed under its content hash; returns the hash."""
+    key = content_hash(text)
+    if session.get(TextBlob, key) is None:
+        raw = text.encode("utf-8")
+        session.add(TextBlob(content_hash=key, data=zlib.compress(raw), size_bytes=len(raw)))
+    return key
+
+
+def set_full_text(session: Session, work: LiteratureWork, text: str | None) -> None:
+    work.full_text_hash = put_text(session, text) if text else None
+    # Kept on the row so token budgets can be planned without loading the text.
+    work.full_text_chars = len(text) if text else None
+
+
+def get_text(session: Session, key: str | None) -> str | None:
+    if not key:
+        return None
+    return get_texts(session, [key]).get(key)
+
+
+def get_texts(session: Session, keys: Iterable[str | None]) -> dict[str, str]:
+    wanted = {key for key in keys if key}
+    if not wanted:
+        return {}
+    blobs = session.exec(select(TextBlob).where(TextBlob.content_hash.in_(wanted))).all()
+    return {blob.content_hash: zlib.decompress(blob.data).decode("utf-8") for blob in blobs}
+
+
+def prune_orphan_blobs(session: Session) -> None:
+    # Blobs are shared between works with identical text, so they are removed
+    # only once no work points at them.
+    referenced = select(LiteratureWork.full_text_hash).where(LiteratureWork.full_text_hash.is_not(None))
+    session.exec(delete(TextBlob).where(TextBlob.content_hash.not_in(referenced)))
@@ -1,15 +1,130 @@
+import asyncio
 import os
+import weakref
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .migrations import apply_migrations
+from .settings import env_int
 
 DATABASE_URL = os.getenv("CODEX_COUNCIL_DB_URL", "sqlite:///./codex_council.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+
+def _is_file_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas() -> dict[str, str | int]:
+    # WAL lets readers run alongside a writer; busy_timeout makes writers queue
+    # for the lock instead of failing with "database is locked". NORMAL sync is
+    # durable in WAL mode except for the last commits before a power loss.
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": env_int("CODEX_COUNCIL_SQLITE_BUSY_TIMEOUT_MS", 30000),
+        "temp_store": "MEMORY",
+        "mmap_size": env_int("CODEX_COUNCIL_SQLITE_MMAP_BYTES", 256 * 1024 * 1024),
+        # Negative values are KiB rather than pages.
+        "cache_size": -env_int("CODEX_COUNCIL_SQLITE_CACHE_KIB", 64 * 1024),
+    }
+
+
+def _apply_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _create_engine(url: str):
+    if not _is_file_sqlite(url):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    created = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        # Swarm tasks, job workers and request handlers each hold a connection;
+        # SQLite connections are cheap, so size the pool for that rather than
+        # making handlers wait on a checkout.
+        pool_size=env_int("CODEX_COUNCIL_DB_POOL_SIZE", 10),
+        max_overflow=env_int("CODEX_COUNCIL_DB_MAX_OVERFLOW", 20),
+        pool_timeout=30,
+    )
+    event.listen(created, "connect", _apply_pragmas)
+    return created
+
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return url
+    return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+
+
+def _create_async_engine(url: str) -> tuple[AsyncEngine, weakref.WeakSet]:
+    pooling = {}
+    if _is_file_sqlite(url):
+        pooling = {
+            "pool_size": env_int("CODEX_COUNCIL_DB_POOL_SIZE", 10),
+            "max_overflow": env_int("CODEX_COUNCIL_DB_MAX_OVERFLOW", 20),
+            "pool_timeout": 30,
+        }
+    created = create_async_engine(
+        async_database_url(url),
+        connect_args={"check_same_thread": False},
+        **pooling,
+    )
+    # The raw aiosqlite connections, so a pool left behind by a closed loop can
+    # still stop their worker threads.
+    opened: weakref.WeakSet = weakref.WeakSet()
+    event.listen(
+        created.sync_engine,
+        "connect",
+        lambda dbapi_connection, record: opened.add(dbapi_connection.driver_connection),
+    )
+    if _is_file_sqlite(url):
+        event.listen(created.sync_engine, "connect", _apply_pragmas)
+    return created, opened
+
+
+engine = _create_engine(DATABASE_URL)
+# Request handlers and the orchestrator read through a per-loop async engine so
+# their queries run on aiosqlite's thread instead of blocking the event loop.
+_async_engines: dict[asyncio.AbstractEventLoop, tuple[AsyncEngine, weakref.WeakSet]] = {}
+
+
+def _retire_closed_loops() -> None:
+    for loop in [loop for loop in _async_engines if loop.is_closed()]:
+        created, opened = _async_engines.pop(loop)
+        # Closing through the pool would need the dead loop; stopping the
+        # aiosqlite thread closes the sqlite connection on that thread instead.
+        created.sync_engine.dispose(close=False)
+        for connection in list(opened):
+            connection.stop()
+
+
+def get_async_engine() -> AsyncEngine:
+    # aiosqlite connections belong to the loop that opened them, and test clients
+    # and job workers run their own loops, so each loop gets its own pool. Pooled
+    # connections keep their pragmas, which then run once per connection.
+    loop = asyncio.get_running_loop()
+    entry = _async_engines.get(loop)
+    if entry is None:
+        _retire_closed_loops()
+        entry = _async_engines[loop] = _create_async_engine(DATABASE_URL)
+    return entry[0]
+
+
+async def dispose_async_engine() -> None:
+    entry = _async_engines.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[0].dispose()
 
 
 def create_db_and_tables() -> None:
@@ -21,3 +136,7 @@ def create_db_and_tables() -> None:
 
 def get_session() -> Session:
     return Session(engine)
+
+
+def async_session() -> AsyncSession:
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
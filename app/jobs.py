@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, select
+
+from .db import engine
+from .models import Job
+from .settings import env_float, env_int
+
+JobHandler = Callable[[dict, Optional[str]], Awaitable[Optional[dict]]]
+TERMINAL_STATUSES = {"succeeded", "failed"}
+UNLEASED = {"lease_owner": None, "lease_token": None, "lease_expires_at": None}
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    handler: JobHandler
+    # Jobs that decrypt provider keys wait in the queue until the session is unlocked;
+    # the passphrase itself is never persisted.
+    needs_secret: bool = False
+    on_failure: Callable[[dict, str], None] | None = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "payload": json.loads(job.payload),
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "lease_owner": job.lease_owner,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+    }
+
+
+class JobQueue:
+    def __init__(
+        self,
+        lease_seconds: float | None = None,
+        poll_seconds: float | None = None,
+        concurrency: int | None = None,
+    ) -> None:
+        self.lease_seconds = lease_seconds or env_float("CODEX_COUNCIL_JOB_LEASE_SECONDS", 30.0)
+        self.poll_seconds = poll_seconds or env_float("CODEX_COUNCIL_JOB_POLL_SECONDS", 1.0)
+        self.concurrency = concurrency or max(1, env_int("CODEX_COUNCIL_JOB_CONCURRENCY", 4))
+        self.retry_seconds = env_float("CODEX_COUNCIL_JOB_RETRY_SECONDS", 5.0)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.specs: dict[str, JobSpec] = {}
+        self.secret: Callable[[], str | None] = lambda: None
+        # Errors are persisted, so callers can scrub keys and signed URLs from them first.
+        self.redact: Callable[[str], str] = lambda text: text
+        self._active: dict[int, asyncio.Task] = {}
+        self._lost: set[int] = set()
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_task: asyncio.Task | None = None
+        self._stopping = False
+
+    def register(
+        self,
+        kind: str,
+        handler: JobHandler,
+        *,
+        needs_secret: bool = False,
+        on_failure: Callable[[dict, str], None] | None = None,
+    ) -> None:
+        self.specs[kind] = JobSpec(handler=handler, needs_secret=needs_secret, on_failure=on_failure)
+
+    def enqueue(self, kind: str, payload: dict, *, max_attempts: int = 3) -> int:
+        if kind not in self.specs:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with Session(engine) as session:
+            job = Job(kind=kind, payload=json.dumps(payload), max_attempts=max(1, max_attempts))
+            session.add(job)
+            session.commit()
+            job_id = job.id
+        self.wake()
+        return job_id
+
+    def wake(self) -> None:
+        # Safe from any thread: request handlers enqueue from asyncio.to_thread.
+        if self._wake is None or self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def get(self, job_id: int) -> Job | None:
+        with Session(engine) as session:
+            return session.get(Job, job_id)
+
+    def _claimable(self, now: datetime):
+        # Queued jobs whose backoff has elapsed, or running jobs whose owner stopped heartbeating.
+        return or_(
+            and_(Job.status == "queued", Job.run_after <= now),
+            and_(Job.status == "running", Job.lease_expires_at < now),
+        )
+
+    def _claim(self, job_id: int | None = None, active: list[int] | None = None) -> Job | None:
+        # Runs on a worker thread, so callers on the loop pass a snapshot of the
+        # active job ids rather than letting it read the live dict.
+        has_secret = self.secret() is not None
+        kinds = [kind for kind, spec in self.specs.items() if has_secret or not spec.needs_secret]
+        if not kinds:
+            return None
+        now = _now()
+        with Session(engine) as session:
+            query = select(Job.id).where(Job.kind.in_(kinds), self._claimable(now))
+            active = list(self._active) if active is None else active
+            if active:
+                # A job this process still runs can outlive its lease (a stalled
+                # heartbeat); claiming it again would run it twice here.
+                query = query.where(Job.id.not_in(active))
+            if job_id is not None:
+                query = query.where(Job.id == job_id)
+            candidates = session.exec(query.order_by(Job.id).limit(5)).all()
+            for candidate in candidates:
+                claimed = session.exec(
+                    update(Job)
+                    .where(Job.id == candidate, self._claimable(now))
+                    .values(
+                        status="running",
+                        lease_owner=self.worker_id,
+                        lease_token=uuid.uuid4().hex,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        attempts=Job.attempts + 1,
+                        updated_at=now,
+                    )
+                )
+                session.commit()
+                if claimed.rowcount:
+                    return session.get(Job, candidate)
+        return None
+
+    def _update_owned(self, job: Job, **values) -> bool:
+        # Matches on the claim's token, not the worker id: the same worker may
+        # have claimed the job again after this lease expired.
+        with Session(engine) as session:
+            result = session.exec(
+                update(Job)
+                .where(Job.id == job.id, Job.lease_token == job.lease_token, Job.status == "running")
+                .values(updated_at=_now(), **values)
+            )
+            session.commit()
+            return bool(result.rowcount)
+
+    async def _heartbeat(self, job: Job, task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            renewed = await asyncio.to_thread(
+                self._update_owned,
+                job,
+                lease_expires_at=_now() + timedelta(seconds=self.lease_seconds),
+            )
+            if not renewed:
+                # Another worker reclaimed the job after a missed lease; stop duplicate work.
+                self._lost.add(job.id)
+                task.cancel()
+                return
+
+    def _release(self, job: Job) -> None:
+        # Hand the job back without charging an attempt (shutdown, restart, cancelled request).
+        self._update_owned(job, status="queued", attempts=Job.attempts - 1, **UNLEASED)
+
+    def _fail(self, job: Job, spec: JobSpec, payload: dict, error: str, final: bool) -> None:
+        if final or job.attempts >= job.max_attempts:
+            self._update_owned(job, status="failed", error=error, **UNLEASED)
+            if spec.on_failure:
+                spec.on_failure(payload, error)
+            return
+        delay = min(300.0, self.retry_seconds * (2 ** (job.attempts - 1)))
+        self._update_owned(
+            job,
+            status="queued",
+            error=error,
+            run_after=_now() + timedelta(seconds=delay),
+            **UNLEASED,
+        )
+
+    async def _execute(self, job: Job, final: bool = False) -> None:
+        spec = self.specs[job.kind]
+        payload = json.loads(job.payload)
+        heartbeat = asyncio.create_task(self._heartbeat(job, asyncio.current_task()))
+        try:
+            result = await spec.handler(payload, self.secret())
+        except asyncio.CancelledError:
+            if job.id not in self._lost:
+                await asyncio.to_thread(self._release, job)
+            raise
+        except Exception as exc:
+            error = self.redact(str(exc) or exc.__class__.__name__)
+            await asyncio.to_thread(self._fail, job, spec, payload, error, final)
+        else:
+            await asyncio.to_thread(
+                self._update_owned,
+                job,
+                status="succeeded",
+                result=json.dumps(result) if result is not None else None,
+                error=None,
+                **UNLEASED,
+            )
+        finally:
+            heartbeat.cancel()
+            self._lost.discard(job.id)
+
+    async def run_now(self, job_id: int) -> Job:
+        # Interactive jobs execute in the calling request under a lease, so a crash
+        # leaves a durable job for the worker to resume instead of losing the work.
+        job = await asyncio.to_thread(self._claim, job_id, list(self._active))
+        if job is not None:
+            await self._execute(job, final=True)
+        return await self.wait(job_id)
+
+    async def wait(self, job_id: int) -> Job:
+        while True:
+            job = await asyncio.to_thread(self.get, job_id)
+            if job is None or job.status in TERMINAL_STATUSES:
+                return job
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _fill(self) -> None:
+        while len(self._active) < self.concurrency:
+            # The claim commits on its worker thread even if we are cancelled
+            # meanwhile, so hand a job claimed during shutdown straight back.
+            claim = asyncio.ensure_future(asyncio.to_thread(self._claim, None, list(self._active)))
+            try:
+                job = await asyncio.shield(claim)
+            except asyncio.CancelledError:
+                job = await claim
+                if job is not None:
+                    await asyncio.to_thread(self._release, job)
+                raise
+            if job is None:
+                return
+            task = asyncio.create_task(self._execute(job))
+            self._active[job.id] = task
+            task.add_done_callback(lambda _task, job_id=job.id: self._finished(job_id))
+
+    def _finished(self, job_id: int) -> None:
+        self._active.pop(job_id, None)
+        self.wake()
+
+    async def _run(self) -> None:
+        # wait_for can swallow a cancellation that races the wake event, so the
+        # loop also checks an explicit stop flag.
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                await self._fill()
+            except SQLAlchemyError:
+                # A locked database is transient; try again on the next poll.
+                pass
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        tasks = [task for task in (self._loop_task, *self._active.values()) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+        self._wake = None
+        self._loop = None
+        self._active.clear()
+
+    def release_owned(self) -> None:
+        # Used before a hard process exit so the next process can claim at once.
+        with Session(engine) as session:
+            session.exec(
+                update(Job)
+                .where(Job.lease_owner == self.worker_id, Job.status == "running")
+                .values(status="queued", attempts=Job.attempts - 1, **UNLEASED)
+            )
+            session.commit()
+
+    def depth(self) -> dict[str, dict[str, int]]:
+        # Outstanding jobs by kind, for a view of load across workloads.
+        query = (
+            select(Job.kind, Job.status, func.count(Job.id))
+            .where(Job.status.in_(("queued", "running")))
+            .group_by(Job.kind, Job.status)
+        )
+        depth: dict[str, dict[str, int]] = {}
+        with Session(engine) as session:
+            for kind, status, count in session.exec(query).all():
+                depth.setdefault(kind, {"queued": 0, "running": 0})[status] = count
+        return depth
+
+    def list(self, status: str | None = None, kind: str | None = None, limit: int = 50) -> list[Job]:
+        query = select(Job)
+        if status:
+            query = query.where(Job.status == status)
+        if kind:
+            query = query.where(Job.kind == kind)
+        with Session(engine) as session:
+            return session.exec(query.order_by(Job.id.desc()).limit(limit)).all()
+
+
+job_queue = JobQueue()
@@ -8,6 +8,7 @@ import httpx
 from pypdf import PdfReader
 from sqlmodel import Session, select
 
+from .blobs import set_full_text
 from .db import engine
 from .models import LiteratureQuery, LiteratureWork
 
@@ -210,9 +211,9 @@ def ingest_local_pdfs(query_id: int, base_dir: Path) -> None:
                 source="local",
                 title=pdf_path.stem,
                 pdf_path=str(pdf_path),
-                full_text=text,
                 updated_at=datetime.now(timezone.utc),
             )
+            set_full_text(session, work, text)
             session.add(work)
         session.commit()
 
@@ -226,14 +227,14 @@ def update_full_texts(query_id: int) -> None:
             )
         ).all()
         for work in works:
-            if work.full_text:
+            if work.full_text_hash:
                 continue
             try:
                 text = extract_pdf_text(Path(work.pdf_path))
             except Exception:
                 continue
             if text:
-                work.full_text = text
+                set_full_text(session, work, text)
                 work.updated_at = datetime.now(timezone.utc)
                 session.add(work)
         session.commit()
@@ -249,6 +250,46 @@ def run_literature_query(
     include_non_article: bool = False,
     openalex_email: str | None = None,
     semantic_scholar_key: str | None = None,
+) -> None:
+    with Session(engine) as session:
+        query_row = session.get(LiteratureQuery, query_id)
+        if not query_row:
+            return
+        fetched = query_row.status == "fetched"
+    # A resumed job skips straight to the idempotent PDF downloads once works are stored.
+    if not fetched:
+        _fetch_works(
+            query_id,
+            query,
+            sources,
+            per_source_limit,
+            include_non_article,
+            openalex_email,
+            semantic_scholar_key,
+        )
+
+    oa_dir = base_dir / "literature" / "oa" / str(query_id)
+    with Session(engine) as session:
+        works = session.exec(select(LiteratureWork).where(LiteratureWork.query_id == query_id)).all()
+        for work in works:
+            if work.open_access_url and not work.pdf_path:
+                filename = _safe_filename(work.doi or work.title)
+                target = oa_dir / f"{filename}.pdf"
+                if _download_pdf(work.open_access_url, target):
+                    work.pdf_path = str(target)
+                    work.updated_at = datetime.now(timezone.utc)
+                    session.add(work)
+        session.commit()
+
+
+def _fetch_works(
+    query_id: int,
+    query: str,
+    sources: list[str],
+    per_source_limit: int,
+    include_non_article: bool,
+    openalex_email: str | None,
+    semantic_scholar_key: str | None,
 ) -> None:
     results = []
     if "openalex" in sources:
@@ -276,8 +317,8 @@ def run_literature_query(
             if enriched.get("open_access_url") and not item.get("open_access_url"):
                 item["open_access_url"] = enriched.get("open_access_url")
 
+    # Works and the "fetched" status commit together, so a crash mid-fetch leaves nothing to undo.
     with Session(engine) as session:
-        session.exec(select(LiteratureWork).where(LiteratureWork.query_id == query_id)).all()
         for item in deduped:
             work = LiteratureWork(
                 query_id=query_id,
@@ -294,21 +335,7 @@ def run_literature_query(
             )
             session.add(work)
         query_row = session.get(LiteratureQuery, query_id)
-        if query_row:
-            query_row.status = "fetched"
-            query_row.updated_at = datetime.now(timezone.utc)
-            session.add(query_row)
-        session.commit()
-
-    oa_dir = base_dir / "literature" / "oa" / str(query_id)
-    with Session(engine) as session:
-        works = session.exec(select(LiteratureWork).where(LiteratureWork.query_id == query_id)).all()
-        for work in works:
-            if work.open_access_url and not work.pdf_path:
-                filename = _safe_filename(work.doi or work.title)
-                target = oa_dir / f"{filename}.pdf"
-                if _download_pdf(work.open_access_url, target):
-                    work.pdf_path = str(target)
-                    work.updated_at = datetime.now(timezone.utc)
-                    session.add(work)
+        query_row.status = "fetched"
+        query_row.updated_at = datetime.now(timezone.utc)
+        session.add(query_row)
         session.commit()
@@ -1,3 +1,5 @@
+import asyncio
+import json
 from datetime import datetime, timezone
 import os
 import shutil
@@ -12,13 +14,16 @@ from contextlib import asynccontextmanager
 from fastapi import BackgroundTasks, FastAPI, HTTPException, UploadFile
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from sqlalchemy import delete
 from sqlmodel import Session, select
 
-from .crypto import prepare_encrypted_secret, decrypt_secret
-from .db import create_db_and_tables, engine
+from .crypto import prepare_encrypted_secret
+from .blobs import get_texts, prune_orphan_blobs, set_full_text
+from .db import async_session, create_db_and_tables, dispose_async_engine, engine
 from .artifacts import write_review_artifacts
 from .files import ensure_required_files, export_idea_markdown, snapshot_idea_version
+from .jobs import job_queue, job_to_dict
 from .models import (
     CouncilMemo,
     CouncilRound,
@@ -27,6 +32,7 @@ from .models import (
     GateStatus,
     Idea,
     AgentMemo,
+    Job,
     LiteratureAssessment,
     LiteratureQuery,
     LiteratureWork,
@@ -42,12 +48,27 @@ from .models import (
     Run,
     RunStatus,
 )
-from .orchestrator import DEFAULT_MODELS, run_swarm, PROVIDERS
+from .orchestrator import (
+    DEFAULT_MODELS,
+    PROVIDERS,
+    active_runs,
+    load_api_key,
+    pending_stages,
+    planned_idea_count,
+    run_swarm,
+)
 from .literature import EXCLUDED_WORK_TYPES, run_literature_query
 from .literature import extract_pdf_text
 from .review_ingest import extract_pdf_pages, split_sections, build_grounded_artifacts
 from .review_validation import split_review_output, validate_review_output
 from .modes import MODE_IDEATION, get_mode_config
+from .persistence import write_behind
+from .providers.accounting import GROUP_FIELDS as USAGE_GROUP_FIELDS, llm_scope, usage_summary
+from .providers.admission import admission
+from .providers.cache import response_cache
+from .providers.clients import provider_clients
+from .providers.rate_limit import rate_limiters
+from .providers.resilience import circuit_breakers
 from .prompts import (
     build_council_prompt_with_dossier,
     build_literature_paper_prompt,
@@ -55,6 +76,7 @@ from .prompts import (
     build_review_prompt,
 )
 from .review_personas import DEFAULT_REVIEW_PERSONAS, REVIEW_PERSONAS, persona_label
+from .streaming import stream_with_flush, write_partial_content
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 
@@ -66,7 +88,16 @@ async def lifespan(_: FastAPI):
     (BASE_DIR / "literature" / "pdfs").mkdir(parents=True, exist_ok=True)
     (BASE_DIR / "literature" / "oa").mkdir(parents=True, exist_ok=True)
     (BASE_DIR / "literature" / "assessments").mkdir(parents=True, exist_ok=True)
-    yield
+    provider_clients.open(PROVIDERS.keys())
+    app.state.provider_clients = provider_clients
+    job_queue.start()
+    try:
+        yield
+    finally:
+        await job_queue.stop()
+        await write_behind.stop()
+        await provider_clients.aclose()
+        await dispose_async_engine()
 
 
 app = FastAPI(title="IPE Breakthrough Idea Swarm", lifespan=lifespan)
@@ -87,9 +118,16 @@ class RunInput(BaseModel):
     provider: str
     model: Optional[str] = None
     idea_count: int = 1
+    concurrency: int = 1
     topic_focus: Optional[str] = None
     literature_query_id: Optional[int] = None
     use_assessment_seeds: bool = False
+    deadline_seconds: Optional[int] = Field(default=None, gt=0)
+    max_tokens: Optional[int] = Field(default=None, gt=0)
+    pitch_batch_size: int = Field(default=1, ge=1, le=10)
+    candidate_count: Optional[int] = Field(default=None, gt=0)
+    structured_output: bool = False
+    chained: bool = False
 
 
 class ReviewInput(BaseModel):
@@ -175,18 +213,14 @@ async def test_provider(provider: str, payload: ProviderTestInput) -> dict:
     model = payload.model or DEFAULT_MODELS.get(provider)
     if not model:
         raise HTTPException(status_code=400, detail="Model required for provider")
-    with Session(engine) as session:
-        credential = session.exec(
-            select(ProviderCredential)
-            .where(ProviderCredential.provider == provider)
-            .order_by(ProviderCredential.created_at.desc())
-        ).first()
-        if not credential:
-            raise HTTPException(status_code=400, detail="Missing credentials for provider")
-        api_key = decrypt_secret(app.state.passphrase, credential.api_key_encrypted, credential.salt)
+    async with async_session() as session:
+        api_key = await session.run_sync(load_api_key, provider, app.state.passphrase)
+    if api_key is None:
+        raise HTTPException(status_code=400, detail="Missing credentials for provider")
     prompt = "Reply with OK if you can read this."
     try:
-        response = await provider_impl.generate(prompt, model, api_key)
+        with llm_scope(stage="provider_test", priority="interactive"):
+            response = await provider_impl.generate(prompt, model, api_key, use_cache=False)
     except Exception as exc:
         message = _redact_secrets(str(exc))
         status = 502
@@ -196,6 +230,49 @@ async def test_provider(provider: str, payload: ProviderTestInput) -> dict:
     return {"status": "ok", "model": model, "response": response.content}
 
 
+@app.get("/api/llm/cache")
+async def get_llm_cache_stats() -> dict:
+    return await asyncio.to_thread(response_cache.stats)
+
+
+@app.delete("/api/llm/cache")
+async def clear_llm_cache() -> dict:
+    removed = await asyncio.to_thread(response_cache.clear)
+    return {"status": "cleared", "removed": removed}
+
+
+@app.get("/api/llm/rate-limits")
+async def get_llm_rate_limits() -> List[dict]:
+    return rate_limiters.snapshot()
+
+
+@app.get("/api/llm/queue")
+async def get_llm_queue() -> dict:
+    jobs = await asyncio.to_thread(job_queue.depth)
+    return {**admission.snapshot(), "jobs": jobs, "writes": write_behind.snapshot()}
+
+
+@app.get("/api/llm/circuit-breakers")
+async def get_llm_circuit_breakers() -> List[dict]:
+    return circuit_breakers.snapshot()
+
+
+@app.get("/api/llm/usage")
+async def get_llm_usage(
+    group_by: str = "stage",
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    run_id: Optional[int] = None,
+    review_id: Optional[int] = None,
+) -> List[dict]:
+    fields = [field.strip() for field in group_by.split(",") if field.strip()]
+    invalid = [field for field in fields if field not in USAGE_GROUP_FIELDS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by fields: {', '.join(invalid)}")
+    filters = {"provider": provider, "model": model, "run_id": run_id, "review_id": review_id}
+    return await asyncio.to_thread(usage_summary, fields, filters)
+
+
 @app.post("/api/session/unlock")
 async def unlock_session(payload: SessionUnlock) -> dict:
     if not payload.passphrase:
@@ -209,7 +286,7 @@ async def save_credentials(payload: CredentialInput) -> dict:
     if app.state.passphrase is None:
         raise HTTPException(status_code=400, detail="Unlock session with passphrase first")
     encrypted, salt = prepare_encrypted_secret(app.state.passphrase, payload.api_key)
-    with Session(engine) as session:
+    async with async_session() as session:
         credential = ProviderCredential(
             provider=payload.provider,
             name=payload.name,
@@ -217,14 +294,14 @@ async def save_credentials(payload: CredentialInput) -> dict:
             salt=salt,
         )
         session.add(credential)
-        session.commit()
+        await session.commit()
     return {"status": "saved"}
 
 
 @app.get("/api/credentials")
 async def list_credentials() -> List[dict]:
-    with Session(engine) as session:
-        credentials = session.exec(select(ProviderCredential)).all()
+    async with async_session() as session:
+        credentials = (await session.exec(select(ProviderCredential))).all()
     return [
         {
             "provider": cred.provider,
@@ -236,35 +313,114 @@ async def list_credentials() -> List[dict]:
 
 
 @app.post("/api/runs")
-async def start_run(payload: RunInput, background_tasks: BackgroundTasks) -> dict:
+async def start_run(payload: RunInput) -> dict:
     if app.state.passphrase is None:
         raise HTTPException(status_code=400, detail="Unlock session with passphrase first")
     model = payload.model or DEFAULT_MODELS.get(payload.provider)
     if not model:
         raise HTTPException(status_code=400, detail="Unknown provider or model not specified")
-    with Session(engine) as session:
+    async with async_session() as session:
         run = Run(
             status=RunStatus.queued,
             provider=payload.provider,
             model=model,
             idea_count=max(1, payload.idea_count),
+            concurrency=max(1, payload.concurrency),
             topic_focus=payload.topic_focus,
             literature_query_id=payload.literature_query_id,
             use_assessment_seeds=payload.use_assessment_seeds,
+            deadline_seconds=payload.deadline_seconds,
+            max_tokens=payload.max_tokens,
+            pitch_batch_size=payload.pitch_batch_size,
+            candidate_count=payload.candidate_count,
+            structured_output=payload.structured_output,
+            chained=payload.chained,
             created_at=datetime.now(timezone.utc),
             updated_at=datetime.now(timezone.utc),
         )
         session.add(run)
-        session.commit()
-        session.refresh(run)
-    background_tasks.add_task(run_swarm, run.id, app.state.passphrase, BASE_DIR)
-    return {"run_id": run.id}
+        await session.commit()
+        await session.refresh(run)
+    job_id = await asyncio.to_thread(job_queue.enqueue, "run_swarm", {"run_id": run.id})
+    return {"run_id": run.id, "job_id": job_id}
+
+
+async def _run_swarm_job(payload: dict, passphrase: str | None) -> None:
+    await run_swarm(payload["run_id"], passphrase, BASE_DIR)
+
+
+def _run_swarm_job_failed(payload: dict, error: str) -> None:
+    with Session(engine) as session:
+        run = session.get(Run, payload["run_id"])
+        if run and run.status in (RunStatus.queued, RunStatus.running):
+            run.status = RunStatus.failed
+            run.log = error
+            run.updated_at = datetime.now(timezone.utc)
+            session.add(run)
+            session.commit()
+
+
+job_queue.register("run_swarm", _run_swarm_job, needs_secret=True, on_failure=_run_swarm_job_failed)
+
+
+@app.post("/api/runs/{run_id}/cancel")
+async def cancel_run(run_id: int) -> dict:
+    async with async_session() as session:
+        run = await session.get(Run, run_id)
+        if not run:
+            raise HTTPException(status_code=404, detail="Run not found")
+        if run.status not in (RunStatus.queued, RunStatus.running):
+            raise HTTPException(status_code=409, detail=f"Run is already {run.status.value}")
+        run.cancel_requested = True
+        if run.status == RunStatus.queued:
+            # Not picked up yet: the job will see the final status and exit without work.
+            run.status = RunStatus.cancelled
+            run.log = "Cancelled by user"
+        run.updated_at = datetime.now(timezone.utc)
+        session.add(run)
+        await session.commit()
+        status = run.status
+    guard = active_runs.get(run_id)
+    if guard:
+        guard.stop(RunStatus.cancelled, "Cancelled by user")
+    return {"run_id": run_id, "status": status.value, "cancel_requested": True}
+
+
+@app.post("/api/runs/{run_id}/resume")
+async def resume_run(run_id: int) -> dict:
+    if app.state.passphrase is None:
+        raise HTTPException(status_code=400, detail="Unlock session with passphrase first")
+    async with async_session() as session:
+        run = await session.get(Run, run_id)
+        if not run:
+            raise HTTPException(status_code=404, detail="Run not found")
+        if run.status in (RunStatus.queued, RunStatus.running):
+            raise HTTPException(status_code=409, detail="Run is already in progress")
+        ideas = (await session.exec(select(Idea).where(Idea.run_id == run_id).order_by(Idea.id))).all()
+        pending = {idea.id: await session.run_sync(pending_stages, idea.id) for idea in ideas}
+        pending = {idea_id: stages for idea_id, stages in pending.items() if stages}
+        missing_ideas = max(0, planned_idea_count(run) - len(ideas))
+        if not pending and not missing_ideas:
+            return {"run_id": run_id, "job_id": None, "pending_stages": {}, "missing_ideas": 0}
+        run.status = RunStatus.queued
+        run.cancel_requested = False
+        run.log = None
+        run.updated_at = datetime.now(timezone.utc)
+        session.add(run)
+        await session.commit()
+    job_id = await asyncio.to_thread(job_queue.enqueue, "run_swarm", {"run_id": run_id})
+    return {
+        "run_id": run_id,
+        "job_id": job_id,
+        "pending_stages": {str(idea_id): stages for idea_id, stages in pending.items()},
+        "missing_ideas": missing_ideas,
+    }
 
 
 @app.get("/api/runs")
 async def list_runs() -> List[dict]:
-    with Session(engine) as session:
-        runs = session.exec(select(Run).order_by(Run.created_at.desc()).limit(5)).all()
+    async with async_session() as session:
+        runs = (await session.exec(select(Run).order_by(Run.created_at.desc()).limit(5))).all()
     return [
         {
             "id": run.id,
@@ -272,9 +428,16 @@ async def list_runs() -> List[dict]:
             "provider": run.provider,
             "model": run.model,
             "idea_count": run.idea_count,
+            "concurrency": run.concurrency,
             "topic_focus": run.topic_focus,
             "literature_query_id": run.literature_query_id,
             "use_assessment_seeds": run.use_assessment_seeds,
+            "deadline_seconds": run.deadline_seconds,
+            "max_tokens": run.max_tokens,
+            "pitch_batch_size": run.pitch_batch_size,
+            "candidate_count": run.candidate_count,
+            "structured_output": run.structured_output,
+            "chained": run.chained,
             "created_at": run.created_at.isoformat(),
             "updated_at": run.updated_at.isoformat(),
             "log": run.log,
@@ -285,8 +448,8 @@ async def list_runs() -> List[dict]:
 
 @app.get("/api/ideas")
 async def list_ideas() -> List[dict]:
-    with Session(engine) as session:
-        ideas = session.exec(select(Idea).order_by(Idea.created_at.desc())).all()
+    async with async_session() as session:
+        ideas = (await session.exec(select(Idea).order_by(Idea.created_at.desc()))).all()
     return [
         {
             "id": idea.id,
@@ -296,6 +459,7 @@ async def list_ideas() -> List[dict]:
             "breakthrough_type": idea.breakthrough_type,
             "big_claim": idea.big_claim,
             "status": idea.status,
+            "screen_score": idea.screen_score,
             "updated_at": idea.updated_at.isoformat(),
         }
         for idea in ideas
@@ -304,21 +468,21 @@ async def list_ideas() -> List[dict]:
 
 @app.get("/api/ideas/{idea_id}")
 async def get_idea(idea_id: int) -> dict:
-    with Session(engine) as session:
-        idea = session.get(Idea, idea_id)
+    async with async_session() as session:
+        idea = await session.get(Idea, idea_id)
         if not idea:
             raise HTTPException(status_code=404, detail="Idea not found")
-        parts = session.exec(select(DossierPart).where(DossierPart.idea_id == idea_id)).all()
-        latest_round = _latest_council_round(session, idea_id)
+        parts = (await session.exec(select(DossierPart).where(DossierPart.idea_id == idea_id))).all()
+        latest_round = await session.run_sync(_latest_council_round, idea_id)
         if latest_round:
-            memos = session.exec(
+            memos = (await session.exec(
                 select(CouncilMemo).where(CouncilMemo.round_id == latest_round.id)
-            ).all()
+            )).all()
         else:
-            memos = session.exec(
+            memos = (await session.exec(
                 select(CouncilMemo).where(CouncilMemo.idea_id == idea_id)
-            ).all()
-        gates = session.exec(select(GateResult).where(GateResult.idea_id == idea_id)).all()
+            )).all()
+        gates = (await session.exec(select(GateResult).where(GateResult.idea_id == idea_id))).all()
     return {
         "idea": {
             "id": idea.id,
@@ -335,7 +499,10 @@ async def get_idea(idea_id: int) -> dict:
             {"gate": gate.gate, "status": gate.status.value, "notes": gate.notes}
             for gate in gates
         ],
-        "dossier_parts": [{"kind": part.kind.value, "content": part.content} for part in parts],
+        "dossier_parts": [
+            {"kind": part.kind.value, "content": part.content, "partial": part.partial}
+            for part in parts
+        ],
         "council_round": (
             {
                 "id": latest_round.id,
@@ -352,16 +519,16 @@ async def get_idea(idea_id: int) -> dict:
 
 @app.get("/api/reviews")
 async def list_reviews() -> List[dict]:
-    with Session(engine) as session:
-        reviews = session.exec(
+    async with async_session() as session:
+        reviews = (await session.exec(
             select(Review).order_by(Review.created_at.desc()).limit(5)
-        ).all()
+        )).all()
         review_ids = [review.id for review in reviews if review.id is not None]
         personas_by_review: dict[int, list[dict]] = {}
         if review_ids:
-            artifacts = session.exec(
+            artifacts = (await session.exec(
                 select(ReviewArtifact).where(ReviewArtifact.review_id.in_(review_ids))
-            ).all()
+            )).all()
             seen = set()
             for artifact in artifacts:
                 if artifact.review_id is None:
@@ -404,7 +571,7 @@ async def create_review(payload: ReviewInput) -> dict:
     if payload.language not in {"en", "pt"}:
         raise HTTPException(status_code=400, detail="Language must be en or pt")
     level = payload.level if payload.review_type == ReviewType.project else None
-    with Session(engine) as session:
+    async with async_session() as session:
         review = Review(
             review_type=payload.review_type,
             level=level,
@@ -414,26 +581,26 @@ async def create_review(payload: ReviewInput) -> dict:
             language=payload.language or "en",
         )
         session.add(review)
-        session.commit()
-        session.refresh(review)
+        await session.commit()
+        await session.refresh(review)
     return {"review_id": review.id}
 
 
 @app.get("/api/reviews/{review_id}")
 async def get_review(review_id: int) -> dict:
-    with Session(engine) as session:
-        review = session.get(Review, review_id)
+    async with async_session() as session:
+        review = await session.get(Review, review_id)
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
-        artifacts = session.exec(
+        artifacts = (await session.exec(
             select(ReviewArtifact).where(ReviewArtifact.review_id == review_id)
-        ).all()
-        gates = session.exec(
+        )).all()
+        gates = (await session.exec(
             select(ReviewGateResult).where(ReviewGateResult.review_id == review_id)
-        ).all()
-        sections = session.exec(
+        )).all()
+        sections = (await session.exec(
             select(ReviewSection).where(ReviewSection.review_id == review_id)
-        ).all()
+        )).all()
     return {
         "review": {
             "id": review.id,
@@ -453,6 +620,7 @@ async def get_review(review_id: int) -> dict:
                 "content": artifact.content,
                 "persona": artifact.persona,
                 "slot": artifact.slot,
+                "partial": artifact.partial,
             }
             for artifact in artifacts
         ],
@@ -475,6 +643,11 @@ async def get_review(review_id: int) -> dict:
 
 @app.post("/api/reviews/{review_id}/attach-pdf")
 async def attach_pdf_to_review(review_id: int, payload: ReviewAttachPdfInput) -> dict:
+    # PDF parsing, the section rewrite and the artifact files all block.
+    return await asyncio.to_thread(_attach_pdf_to_review, review_id, payload)
+
+
+def _attach_pdf_to_review(review_id: int, payload: ReviewAttachPdfInput) -> dict:
     pdf_dir = BASE_DIR / "reviews" / "pdfs" / str(review_id)
     pdf_path = (pdf_dir / payload.filename).resolve()
     if not pdf_path.exists():
@@ -548,7 +721,7 @@ async def upload_pdf_to_review(review_id: int, file: UploadFile) -> dict:
     content = await file.read()
     if not content:
         raise HTTPException(status_code=400, detail="Empty file")
-    target_path.write_bytes(content)
+    await asyncio.to_thread(target_path.write_bytes, content)
     result = await attach_pdf_to_review(
         review_id,
         ReviewAttachPdfInput(filename=file.filename),
@@ -561,127 +734,171 @@ async def upload_pdf_to_review(review_id: int, file: UploadFile) -> dict:
 async def run_review(review_id: int, payload: ReviewRunInput) -> dict:
     if getattr(app.state, "passphrase", None) is None:
         raise HTTPException(status_code=400, detail="Unlock session with passphrase first")
-    provider_impl = PROVIDERS.get(payload.provider)
-    if not provider_impl:
+    if payload.provider not in PROVIDERS:
         raise HTTPException(status_code=400, detail="Unknown provider")
     model = payload.model or DEFAULT_MODELS.get(payload.provider)
     if not model:
         raise HTTPException(status_code=400, detail="Model required for provider")
 
-    with Session(engine) as session:
-        review = session.get(Review, review_id)
+    async with async_session() as session:
+        review = await session.get(Review, review_id)
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
-        sections = session.exec(
-            select(ReviewSection).where(ReviewSection.review_id == review_id)
-        ).all()
+        sections = (await session.exec(
+            select(ReviewSection).where(ReviewSection.review_id == review_id).limit(1)
+        )).all()
         if not sections:
             raise HTTPException(status_code=400, detail="No sections indexed for review")
-        credential = session.exec(
-            select(ProviderCredential)
-            .where(ProviderCredential.provider == payload.provider)
-            .order_by(ProviderCredential.created_at.desc())
-        ).first()
-        if not credential:
+        if await session.run_sync(load_api_key, payload.provider, app.state.passphrase) is None:
             raise HTTPException(status_code=400, detail="Missing credentials for provider")
-        api_key = decrypt_secret(app.state.passphrase, credential.api_key_encrypted, credential.salt)
-
-        personas = payload.personas or DEFAULT_REVIEW_PERSONAS
-        if not personas:
-            personas = DEFAULT_REVIEW_PERSONAS
-        invalid = [persona for persona in personas if persona not in REVIEW_PERSONAS]
-        if invalid:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unknown personas: {', '.join(invalid)}",
-            )
-        section_payload = [
-            {
-                "section_id": section.section_id,
-                "title": section.title,
-                "page_start": section.page_start,
-                "page_end": section.page_end,
-                "excerpt": section.excerpt,
-            }
-            for section in sections
-        ]
-        section_ids = [section.section_id for section in sections]
-        stored_artifacts: list[ReviewArtifact] = []
-        errors: list[str] = []
-
-        for slot, persona in enumerate(personas, start=1):
-            persona_heading = f"Reviewer persona: {persona_label(persona)}"
-            prompt = build_review_prompt(
-                review_type=review.review_type.value,
-                level=review.level.value if review.level else None,
-                title=review.title,
-                domain=review.domain,
-                method_family=review.method_family,
-                language=review.language or "en",
-                sections=section_payload,
+
+    personas = payload.personas or DEFAULT_REVIEW_PERSONAS
+    invalid = [persona for persona in personas if persona not in REVIEW_PERSONAS]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown personas: {', '.join(invalid)}",
+        )
+
+    job_id = await asyncio.to_thread(
+        job_queue.enqueue,
+        "review",
+        {"review_id": review_id, "provider": payload.provider, "model": model, "personas": personas},
+        max_attempts=2,
+    )
+    return _job_response(await job_queue.run_now(job_id))
+
+
+async def _execute_review(payload: dict, passphrase: str | None) -> dict:
+    review_id = payload["review_id"]
+    provider_impl = PROVIDERS[payload["provider"]]
+    model = payload["model"]
+    personas = payload["personas"]
+    # Sessions are opened per step rather than held across the persona streams.
+    async with async_session() as session:
+        review = await session.get(Review, review_id)
+        if not review:
+            raise RuntimeError("Review not found")
+        sections = (await session.exec(
+            select(ReviewSection).where(ReviewSection.review_id == review_id)
+        )).all()
+        api_key = await session.run_sync(load_api_key, payload["provider"], passphrase)
+    if api_key is None:
+        raise RuntimeError("Missing credentials for provider")
+    section_payload = [
+        {
+            "section_id": section.section_id,
+            "title": section.title,
+            "page_start": section.page_start,
+            "page_end": section.page_end,
+            "excerpt": section.excerpt,
+        }
+        for section in sections
+    ]
+    section_ids = [section.section_id for section in sections]
+    stored_artifacts: list[ReviewArtifact] = []
+    errors: list[str] = []
+
+    for slot, persona in enumerate(personas, start=1):
+        persona_heading = f"Reviewer persona: {persona_label(persona)}"
+        prompt = build_review_prompt(
+            review_type=review.review_type.value,
+            level=review.level.value if review.level else None,
+            title=review.title,
+            domain=review.domain,
+            method_family=review.method_family,
+            language=review.language or "en",
+            sections=section_payload,
+            persona=persona,
+        )
+        async with async_session() as draft_session:
+            draft = ReviewArtifact(
+                review_id=review_id,
+                kind=ReviewArtifactKind.referee_memo,
+                content="",
                 persona=persona,
+                slot=slot,
+                partial=True,
             )
-            response = await provider_impl.generate(prompt, model, api_key)
-            memo, checklist = split_review_output(response.content)
-            memo_lines = memo.splitlines()
-            first_non_empty = next((line for line in memo_lines if line.strip()), "")
-            if persona_heading.lower() not in first_non_empty.lower():
-                memo = f"{persona_heading}\n{memo}".strip()
-            persona_errors = validate_review_output(checklist, section_ids)
-            if persona_errors:
-                checklist = "\n".join([
-                    checklist.strip(),
-                    "",
-                    "VALIDATION_NOTES",
-                    *[f"- {error}" for error in persona_errors],
-                ])
-                errors.extend([
-                    f"{persona_label(persona)} (Reviewer {slot}): {error}"
-                    for error in persona_errors
-                ])
-
-            stored_artifacts.extend([
-                ReviewArtifact(
-                    review_id=review_id,
-                    kind=ReviewArtifactKind.referee_memo,
-                    content=memo,
-                    persona=persona,
-                    slot=slot,
-                ),
-                ReviewArtifact(
-                    review_id=review_id,
-                    kind=ReviewArtifactKind.revision_checklist,
-                    content=checklist,
-                    persona=persona,
-                    slot=slot,
+            draft_session.add(draft)
+            await draft_session.commit()
+            draft_id = draft.id
+        with llm_scope(stage=f"review:{persona}", review_id=review_id, priority="interactive"):
+            content = await stream_with_flush(
+                provider_impl,
+                prompt,
+                model,
+                api_key,
+                lambda text, row_id=draft_id: write_behind.submit(
+                    lambda session: write_partial_content(session, ReviewArtifact, row_id, text)
                 ),
+            )
+        memo, checklist = split_review_output(content)
+        memo_lines = memo.splitlines()
+        first_non_empty = next((line for line in memo_lines if line.strip()), "")
+        if persona_heading.lower() not in first_non_empty.lower():
+            memo = f"{persona_heading}\n{memo}".strip()
+        persona_errors = validate_review_output(checklist, section_ids)
+        if persona_errors:
+            checklist = "\n".join([
+                checklist.strip(),
+                "",
+                "VALIDATION_NOTES",
+                *[f"- {error}" for error in persona_errors],
+            ])
+            errors.extend([
+                f"{persona_label(persona)} (Reviewer {slot}): {error}"
+                for error in persona_errors
             ])
 
-        session.exec(
+        stored_artifacts.extend([
+            ReviewArtifact(
+                review_id=review_id,
+                kind=ReviewArtifactKind.referee_memo,
+                content=memo,
+                persona=persona,
+                slot=slot,
+            ),
+            ReviewArtifact(
+                review_id=review_id,
+                kind=ReviewArtifactKind.revision_checklist,
+                content=checklist,
+                persona=persona,
+                slot=slot,
+            ),
+        ])
+
+    # Partial flushes still queued must not land after the final artifacts.
+    await write_behind.flush()
+    async with async_session() as session:
+        await session.exec(
             ReviewArtifact.__table__.delete().where(ReviewArtifact.review_id == review_id)
         )
         session.add_all(stored_artifacts)
         review.status = ReviewStatus.completed
         review.updated_at = datetime.now(timezone.utc)
         session.add(review)
-        session.commit()
-        stored_artifacts = session.exec(
+        await session.commit()
+        stored_artifacts = (await session.exec(
             select(ReviewArtifact).where(ReviewArtifact.review_id == review_id)
-        ).all()
+        )).all()
     review_dir = BASE_DIR / "reviews" / str(review_id)
-    write_review_artifacts(review_dir, stored_artifacts)
+    await asyncio.to_thread(write_review_artifacts, review_dir, stored_artifacts)
     return {"review_id": review_id, "status": "completed", "validation_errors": errors}
 
 
+job_queue.register("review", _execute_review, needs_secret=True)
+
+
 @app.put("/api/ideas/{idea_id}/gates/{gate_id}")
 async def update_gate(idea_id: int, gate_id: int, payload: GateUpdate) -> dict:
-    with Session(engine) as session:
-        gate = session.exec(
+    async with async_session() as session:
+        gate = (await session.exec(
             select(GateResult).where(
                 GateResult.idea_id == idea_id,
                 GateResult.gate == gate_id,
             )
-        ).first()
+        )).first()
         if not gate:
             gate = GateResult(
                 idea_id=idea_id,
@@ -693,8 +910,8 @@ async def update_gate(idea_id: int, gate_id: int, payload: GateUpdate) -> dict:
             gate.status = payload.status
             gate.notes = payload.notes
         session.add(gate)
-        session.commit()
-        session.refresh(gate)
+        await session.commit()
+        await session.refresh(gate)
     return {"gate": gate.gate, "status": gate.status.value, "notes": gate.notes}
 
 
@@ -713,6 +930,7 @@ def _restart_server(port: int) -> None:
         start_new_session=True,
     )
     time.sleep(0.5)
+    job_queue.release_owned()
     os._exit(0)
 
 
@@ -821,7 +1039,17 @@ def _latest_parts_by_kind(parts: List[DossierPart]) -> dict[str, DossierPart]:
 
 
 def _estimate_tokens(text: str) -> int:
-    return max(1, len(text) // 4)
+    return _tokens_for_chars(len(text))
+
+
+def _tokens_for_chars(chars: int) -> int:
+    return max(1, chars // 4)
+
+
+def _combined_chars(work: LiteratureWork) -> int:
+    # Length of the abstract and full text joined by a space, without loading the text.
+    lengths = [length for length in (len(work.abstract or ""), work.full_text_chars or 0) if length]
+    return sum(lengths) + max(0, len(lengths) - 1)
 
 
 def _next_council_round(session: Session, idea_id: int) -> int:
@@ -924,8 +1152,41 @@ def _redact_secrets(text: str) -> str:
     return redacted
 
 
+job_queue.secret = lambda: getattr(app.state, "passphrase", None)
+job_queue.redact = _redact_secrets
+
+
+def _job_response(job: Job) -> dict:
+    if job.status == "failed":
+        message = job.error or "Job failed"
+        status = 502
+        if "429" in message or "too many requests" in message.lower():
+            status = 429
+        raise HTTPException(status_code=status, detail=message)
+    return json.loads(job.result) if job.result else {}
+
+
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, kind: Optional[str] = None, limit: int = 50) -> List[dict]:
+    jobs = await asyncio.to_thread(job_queue.list, status, kind, max(1, min(limit, 500)))
+    return [job_to_dict(job) for job in jobs]
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: int) -> dict:
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
+
+
 @app.post("/api/ideas/{idea_id}/council/revise")
 async def auto_revise_idea(idea_id: int) -> dict:
+    # All database and file work, so it runs off the event loop as a whole.
+    return await asyncio.to_thread(_auto_revise_idea, idea_id)
+
+
+def _auto_revise_idea(idea_id: int) -> dict:
     with Session(engine) as session:
         idea = session.get(Idea, idea_id)
         if not idea:
@@ -1015,6 +1276,25 @@ async def auto_revise_idea(idea_id: int) -> dict:
 
 @app.post("/api/ideas/{idea_id}/council/resubmit")
 async def resubmit_to_council(idea_id: int, payload: ResubmitInput) -> dict:
+    # Database and file work runs on worker threads before and after the council
+    # call, and nothing is committed unless that call succeeds.
+    prepared = await asyncio.to_thread(_prepare_resubmission, idea_id, payload, app.state.passphrase)
+    council_content = None
+    if prepared["council_prompt"] is not None:
+        provider = PROVIDERS[payload.provider]
+        with llm_scope(stage="council_resubmit", run_id=prepared["run_id"], idea_id=idea_id, priority="interactive"):
+            council_response = await provider.generate(prepared["council_prompt"], prepared["model"], prepared["api_key"])
+        council_content = council_response.content
+    await asyncio.to_thread(_apply_resubmission, idea_id, prepared, council_content)
+    return {
+        "status": "resubmitted",
+        "version_id": prepared["version_id"],
+        "revisions": prepared["revision_count"],
+        "review_ran": payload.run_review,
+    }
+
+
+def _prepare_resubmission(idea_id: int, payload: ResubmitInput, passphrase: str | None) -> dict:
     with Session(engine) as session:
         idea = session.get(Idea, idea_id)
         if not idea:
@@ -1033,11 +1313,66 @@ async def resubmit_to_council(idea_id: int, payload: ResubmitInput) -> dict:
             label="pre-resubmission",
             metadata="Snapshot before council resubmission.",
         )
+        revision_log = None
         revision_count = 0
         if payload.apply_revisions:
             revision_log, revision_count = _build_revision_log(memos, timestamp)
+        prepared = {
+            "run_id": idea.run_id,
+            "now": now,
+            "timestamp": timestamp,
+            "version_id": version_id,
+            "revision_log": revision_log,
+            "revision_count": revision_count,
+            "council_prompt": None,
+        }
+        if not payload.run_review:
+            return prepared
+
+        if passphrase is None:
+            raise HTTPException(status_code=400, detail="Unlock session with passphrase first")
+        provider_name = payload.provider
+        if not provider_name:
+            raise HTTPException(status_code=400, detail="Provider required for council review")
+        if provider_name not in PROVIDERS:
+            raise HTTPException(status_code=400, detail="Unknown provider")
+        model = payload.model or DEFAULT_MODELS.get(provider_name)
+        if not model:
+            raise HTTPException(status_code=400, detail="Model required for provider")
+        api_key = load_api_key(session, provider_name, passphrase)
+        if api_key is None:
+            raise HTTPException(status_code=400, detail="Missing credentials for provider")
+        run = session.get(Run, idea.run_id)
+        topic_focus = run.topic_focus if run else None
+        latest_parts = _latest_parts_by_kind(parts)
+        # The council reads the dossier as it will be stored, revisions included.
+        dossier_payload = {
+            key: part.content.rstrip() + revision_log if revision_log is not None else part.content
+            for key, part in latest_parts.items()
+        }
+    mode_config = get_mode_config(MODE_IDEATION)
+    prepared.update(
+        council_prompt=build_council_prompt_with_dossier(
+            dossier_payload,
+            topic_focus,
+            mode=mode_config.prompt_set,
+        ),
+        model=model,
+        api_key=api_key,
+    )
+    return prepared
+
+
+def _apply_resubmission(idea_id: int, prepared: dict, council_content: str | None) -> None:
+    now = prepared["now"]
+    with Session(engine) as session:
+        idea = session.get(Idea, idea_id)
+        if not idea:
+            raise HTTPException(status_code=404, detail="Idea not found")
+        if prepared["revision_log"] is not None:
+            parts = session.exec(select(DossierPart).where(DossierPart.idea_id == idea_id)).all()
             for part in parts:
-                part.content = part.content.rstrip() + revision_log
+                part.content = part.content.rstrip() + prepared["revision_log"]
                 part.updated_at = now
                 session.add(part)
         idea.status = "resubmitted"
@@ -1050,7 +1385,7 @@ async def resubmit_to_council(idea_id: int, payload: ResubmitInput) -> dict:
                     GateResult.gate == gate_id,
                 )
             ).first()
-            note = f"Resubmitted {timestamp} UTC."
+            note = f"Resubmitted {prepared['timestamp']} UTC."
             if not gate:
                 gate = GateResult(
                     idea_id=idea_id,
@@ -1063,38 +1398,7 @@ async def resubmit_to_council(idea_id: int, payload: ResubmitInput) -> dict:
                 gate.notes = note
             session.add(gate)
 
-        if payload.run_review:
-            if app.state.passphrase is None:
-                raise HTTPException(status_code=400, detail="Unlock session with passphrase first")
-            provider_name = payload.provider
-            if not provider_name:
-                raise HTTPException(status_code=400, detail="Provider required for council review")
-            provider = PROVIDERS.get(provider_name)
-            if not provider:
-                raise HTTPException(status_code=400, detail="Unknown provider")
-            model = payload.model or DEFAULT_MODELS.get(provider_name)
-            if not model:
-                raise HTTPException(status_code=400, detail="Model required for provider")
-            credential = session.exec(
-                select(ProviderCredential)
-                .where(ProviderCredential.provider == provider_name)
-                .order_by(ProviderCredential.created_at.desc())
-            ).first()
-            if not credential:
-                raise HTTPException(status_code=400, detail="Missing credentials for provider")
-            api_key = decrypt_secret(app.state.passphrase, credential.api_key_encrypted, credential.salt)
-            run = session.get(Run, idea.run_id)
-            topic_focus = run.topic_focus if run else None
-            latest_parts = _latest_parts_by_kind(parts)
-            dossier_payload = {key: part.content for key, part in latest_parts.items()}
-            mode_config = get_mode_config(MODE_IDEATION)
-            council_prompt = build_council_prompt_with_dossier(
-                dossier_payload,
-                topic_focus,
-                mode=mode_config.prompt_set,
-            )
-            council_response = await provider.generate(council_prompt, model, api_key)
-            council_content = council_response.content
+        if council_content is not None:
             round_number = _next_council_round(session, idea_id)
             council_round = CouncilRound(
                 idea_id=idea.id,
@@ -1102,8 +1406,7 @@ async def resubmit_to_council(idea_id: int, payload: ResubmitInput) -> dict:
                 status="generated",
             )
             session.add(council_round)
-            session.commit()
-            session.refresh(council_round)
+            session.flush()
             memos = _split_council_memos(council_content)
             memo_models = []
             for idx, memo_text in enumerate(memos, start=1):
@@ -1160,12 +1463,6 @@ async def resubmit_to_council(idea_id: int, payload: ResubmitInput) -> dict:
         updated_parts = session.exec(select(DossierPart).where(DossierPart.idea_id == idea_id)).all()
         updated_memos = session.exec(select(CouncilMemo).where(CouncilMemo.idea_id == idea_id)).all()
     export_idea_markdown(BASE_DIR, idea_id, updated_parts, updated_memos)
-    return {
-        "status": "resubmitted",
-        "version_id": version_id,
-        "revisions": revision_count,
-        "review_ran": payload.run_review,
-    }
 
 
 @app.get("/api/ideas/{idea_id}/versions")
@@ -1228,12 +1525,12 @@ async def get_idea_version(idea_id: int, version_id: str) -> dict:
 
 @app.get("/api/ideas/{idea_id}/council/rounds")
 async def list_council_rounds(idea_id: int) -> List[dict]:
-    with Session(engine) as session:
-        rounds = session.exec(
+    async with async_session() as session:
+        rounds = (await session.exec(
             select(CouncilRound)
             .where(CouncilRound.idea_id == idea_id)
             .order_by(CouncilRound.round_number.desc())
-        ).all()
+        )).all()
     return [
         {
             "id": round_.id,
@@ -1248,16 +1545,16 @@ async def list_council_rounds(idea_id: int) -> List[dict]:
 
 @app.get("/api/ideas/{idea_id}/council/rounds/{round_id}")
 async def get_council_round(idea_id: int, round_id: int) -> dict:
-    with Session(engine) as session:
-        round_ = session.exec(
+    async with async_session() as session:
+        round_ = (await session.exec(
             select(CouncilRound)
             .where(CouncilRound.idea_id == idea_id, CouncilRound.id == round_id)
-        ).first()
+        )).first()
         if not round_:
             raise HTTPException(status_code=404, detail="Council round not found")
-        memos = session.exec(
+        memos = (await session.exec(
             select(CouncilMemo).where(CouncilMemo.round_id == round_.id)
-        ).all()
+        )).all()
     return {
         "round": {
             "id": round_.id,
@@ -1271,13 +1568,13 @@ async def get_council_round(idea_id: int, round_id: int) -> dict:
 
 
 @app.post("/api/literature/queries")
-async def start_literature_query(payload: LiteratureQueryInput, background_tasks: BackgroundTasks) -> dict:
+async def start_literature_query(payload: LiteratureQueryInput) -> dict:
     sources = [source for source in payload.sources if source in {"openalex", "crossref", "semantic_scholar"}]
     if not sources:
         raise HTTPException(status_code=400, detail="No valid sources provided")
     if "openalex" in sources and not payload.openalex_email:
         raise HTTPException(status_code=400, detail="OpenAlex requires an email (mailto) for requests")
-    with Session(engine) as session:
+    async with async_session() as session:
         query = LiteratureQuery(
             query=payload.query,
             sources=",".join(sources),
@@ -1286,27 +1583,65 @@ async def start_literature_query(payload: LiteratureQueryInput, background_tasks
             status="queued",
         )
         session.add(query)
-        session.commit()
-        session.refresh(query)
+        await session.commit()
+        await session.refresh(query)
     (BASE_DIR / "literature" / "pdfs" / str(query.id)).mkdir(parents=True, exist_ok=True)
-    background_tasks.add_task(
+    if payload.semantic_scholar_key:
+        _semantic_scholar_keys[query.id] = payload.semantic_scholar_key
+    job_id = await asyncio.to_thread(
+        job_queue.enqueue,
+        "literature_query",
+        {
+            "query_id": query.id,
+            "query": payload.query,
+            "sources": sources,
+            "per_source_limit": payload.per_source_limit,
+            "include_non_article": payload.include_non_article,
+            "openalex_email": payload.openalex_email,
+        },
+    )
+    return {"query_id": query.id, "job_id": job_id}
+
+
+# API keys stay in memory only; a query resumed after a restart fetches without one.
+_semantic_scholar_keys: dict[int, str] = {}
+
+
+async def _literature_query_job(payload: dict, _passphrase: str | None) -> None:
+    query_id = payload["query_id"]
+    await asyncio.to_thread(
         run_literature_query,
-        query.id,
-        payload.query,
-        sources,
-        payload.per_source_limit,
+        query_id,
+        payload["query"],
+        payload["sources"],
+        payload["per_source_limit"],
         BASE_DIR,
-        payload.include_non_article,
-        payload.openalex_email,
-        payload.semantic_scholar_key,
+        payload["include_non_article"],
+        payload["openalex_email"],
+        _semantic_scholar_keys.get(query_id),
     )
-    return {"query_id": query.id}
+    _semantic_scholar_keys.pop(query_id, None)
+
+
+def _literature_query_job_failed(payload: dict, error: str) -> None:
+    _semantic_scholar_keys.pop(payload["query_id"], None)
+    with Session(engine) as session:
+        query = session.get(LiteratureQuery, payload["query_id"])
+        if query and query.status == "queued":
+            query.status = "failed"
+            query.notes = error
+            query.updated_at = datetime.now(timezone.utc)
+            session.add(query)
+            session.commit()
+
+
+job_queue.register("literature_query", _literature_query_job, on_failure=_literature_query_job_failed)
 
 
 @app.get("/api/literature/queries")
 async def list_literature_queries() -> List[dict]:
-    with Session(engine) as session:
-        queries = session.exec(select(LiteratureQuery).order_by(LiteratureQuery.created_at.desc())).all()
+    async with async_session() as session:
+        queries = (await session.exec(select(LiteratureQuery).order_by(LiteratureQuery.created_at.desc()))).all()
     return [
         {
             "id": query.id,
@@ -1325,18 +1660,18 @@ async def list_literature_queries() -> List[dict]:
 
 @app.get("/api/literature/queries/{query_id}")
 async def get_literature_query(query_id: int) -> dict:
-    with Session(engine) as session:
-        query = session.get(LiteratureQuery, query_id)
+    async with async_session() as session:
+        query = await session.get(LiteratureQuery, query_id)
         if not query:
             raise HTTPException(status_code=404, detail="Query not found")
-        works = session.exec(
+        works = (await session.exec(
             select(LiteratureWork)
             .where(LiteratureWork.query_id == query_id)
             .order_by(LiteratureWork.id)
-        ).all()
-        assessment = session.exec(
+        )).all()
+        assessment = (await session.exec(
             select(LiteratureAssessment).where(LiteratureAssessment.query_id == query_id)
-        ).first()
+        )).first()
     return {
         "query": {
             "id": query.id,
@@ -1372,52 +1707,73 @@ async def get_literature_query(query_id: int) -> dict:
 async def rebuild_query_assessment_llm(query_id: int, payload: LlmAssessmentInput) -> dict:
     if app.state.passphrase is None:
         raise HTTPException(status_code=400, detail="Unlock session with passphrase first")
-    provider = PROVIDERS.get(payload.provider)
-    if not provider:
+    if payload.provider not in PROVIDERS:
         raise HTTPException(status_code=400, detail="Unknown provider")
     model = payload.model or DEFAULT_MODELS.get(payload.provider)
     if not model:
         raise HTTPException(status_code=400, detail="Model required for provider")
-    with Session(engine) as session:
-        query = session.get(LiteratureQuery, query_id)
-        if not query:
+    async with async_session() as session:
+        if not await session.get(LiteratureQuery, query_id):
             raise HTTPException(status_code=404, detail="Query not found")
-        credential = session.exec(
-            select(ProviderCredential)
-            .where(ProviderCredential.provider == payload.provider)
-            .order_by(ProviderCredential.created_at.desc())
-        ).first()
-        if not credential:
+        if await session.run_sync(load_api_key, payload.provider, app.state.passphrase) is None:
             raise HTTPException(status_code=400, detail="Missing credentials for provider")
-        api_key = decrypt_secret(app.state.passphrase, credential.api_key_encrypted, credential.salt)
-        works = session.exec(select(LiteratureWork).where(LiteratureWork.query_id == query_id)).all()
 
-    candidates = []
-    for work in works:
-        combined = " ".join(filter(None, [work.abstract, work.full_text]))
-        if not combined:
-            continue
-        has_full_text = work.full_text is not None
-        candidates.append((has_full_text, work, combined))
-    # Preserve query order; do not prioritize by length.
-    selected = []
-    token_budget = max(1000, payload.max_tokens_budget)
+    job_id = await asyncio.to_thread(
+        job_queue.enqueue,
+        "literature_assessment",
+        {
+            "query_id": query_id,
+            "provider": payload.provider,
+            "model": model,
+            "max_docs": payload.max_docs,
+            "max_tokens_budget": payload.max_tokens_budget,
+        },
+        max_attempts=2,
+    )
+    return _job_response(await job_queue.run_now(job_id))
+
+
+async def _execute_literature_assessment(payload: dict, passphrase: str | None) -> dict:
+    query_id = payload["query_id"]
+    provider = PROVIDERS[payload["provider"]]
+    model = payload["model"]
+    async with async_session() as session:
+        query = await session.get(LiteratureQuery, query_id)
+        if not query:
+            raise RuntimeError("Query not found")
+        api_key = await session.run_sync(load_api_key, payload["provider"], passphrase)
+        if api_key is None:
+            raise RuntimeError("Missing credentials for provider")
+        works = (await session.exec(select(LiteratureWork).where(LiteratureWork.query_id == query_id))).all()
+
+    # Budgets are planned from stored lengths; only the selected full texts are loaded.
+    candidates = [work for work in works if work.abstract or work.full_text_hash]
+    selected_works = []
+    token_budget = max(1000, payload["max_tokens_budget"])
     used_tokens = 0
-    for _, work, combined in candidates:
-        if len(selected) >= max(1, payload.max_docs):
+    # Preserve query order; do not prioritize by length.
+    for work in candidates:
+        if len(selected_works) >= max(1, payload["max_docs"]):
             break
-        tokens = _estimate_tokens(combined)
+        tokens = _tokens_for_chars(_combined_chars(work))
         if used_tokens + tokens > token_budget:
             continue
-        selected.append((work, combined, tokens))
+        selected_works.append(work)
         used_tokens += tokens
+    truncate = not selected_works and bool(candidates)
+    if truncate:
+        selected_works = candidates[:1]
+
+    async with async_session() as session:
+        texts = await session.run_sync(get_texts, [work.full_text_hash for work in selected_works])
+    selected = []
+    for work in selected_works:
+        combined = " ".join(filter(None, [work.abstract, texts.get(work.full_text_hash)]))
+        if truncate:
+            combined = combined[: token_budget * 4]
+        selected.append((work, combined, _estimate_tokens(combined)))
 
-    if not selected and candidates:
-        _, work, combined = candidates[0]
-        truncated = combined[: token_budget * 4]
-        selected = [(work, truncated, _estimate_tokens(truncated))]
-    summaries = []
-    for work, combined, _tokens in selected:
+    async def summarize(work: LiteratureWork, combined: str) -> str:
         metadata_parts = [
             f"year={work.year}" if work.year else None,
             f"venue={work.venue}" if work.venue else None,
@@ -1426,31 +1782,39 @@ async def rebuild_query_assessment_llm(query_id: int, payload: LlmAssessmentInpu
         ]
         metadata = ", ".join([item for item in metadata_parts if item])
         prompt = build_literature_paper_prompt(work.title or "Untitled", metadata, combined)
-        try:
+        with llm_scope(stage="literature_summary"):
             response = await provider.generate(prompt, model, api_key)
-            summaries.append(f"## {work.title or 'Untitled'}\n{response.content.strip()}")
-        except Exception as exc:
-            message = _redact_secrets(str(exc))
-            status = 502
-            if "429" in message or "too many requests" in message.lower():
-                status = 429
-            raise HTTPException(status_code=status, detail=message) from exc
+        return f"## {work.title or 'Untitled'}\n{response.content.strip()}"
 
-    synthesis_prompt = build_literature_synthesis_prompt(summaries, query.query, len(works))
+    # Summaries are independent; the shared provider rate limiter paces them. The
+    # first failure fails the job, so the rest are cancelled rather than left
+    # spending tokens on an assessment that will not be written.
+    tasks = [asyncio.create_task(summarize(work, combined)) for work, combined, _tokens in selected]
     try:
+        summaries = list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    synthesis_prompt = build_literature_synthesis_prompt(summaries, query.query, len(works))
+    with llm_scope(stage="literature_synthesis"):
         synthesis_response = await provider.generate(synthesis_prompt, model, api_key)
-    except Exception as exc:
-        message = _redact_secrets(str(exc))
-        status = 502
-        if "429" in message or "too many requests" in message.lower():
-            status = 429
-        raise HTTPException(status_code=status, detail=message) from exc
     assessment = "\n".join([
         "# Literature Assessment (LLM)",
         "",
         synthesis_response.content.strip(),
     ]).strip() + "\n"
+    assessment_path = await asyncio.to_thread(_store_literature_assessment, query_id, assessment)
 
+    return {
+        "status": "completed",
+        "summary_count": len(summaries),
+        "assessment_path": str(assessment_path),
+    }
+
+
+def _store_literature_assessment(query_id: int, assessment: str) -> Path:
     with Session(engine) as session:
         existing = session.exec(
             select(LiteratureAssessment).where(LiteratureAssessment.query_id == query_id)
@@ -1477,31 +1841,32 @@ async def rebuild_query_assessment_llm(query_id: int, payload: LlmAssessmentInpu
                 query_row.notes = note_value
             session.add(query_row)
         session.commit()
+    return assessment_path
 
-    return {
-        "status": "completed",
-        "summary_count": len(summaries),
-        "assessment_path": str(assessment_path),
-    }
+
+job_queue.register("literature_assessment", _execute_literature_assessment, needs_secret=True)
 
 
 @app.delete("/api/literature/queries/{query_id}")
 async def delete_literature_query(query_id: int) -> dict:
-    with Session(engine) as session:
-        query = session.get(LiteratureQuery, query_id)
+    async with async_session() as session:
+        query = await session.get(LiteratureQuery, query_id)
         if not query:
             raise HTTPException(status_code=404, detail="Query not found")
-        works = session.exec(select(LiteratureWork).where(LiteratureWork.query_id == query_id)).all()
-        for work in works:
-            session.delete(work)
-        assessment = session.exec(
+        await session.exec(delete(LiteratureWork).where(LiteratureWork.query_id == query_id))
+        await session.run_sync(prune_orphan_blobs)
+        assessment = (await session.exec(
             select(LiteratureAssessment).where(LiteratureAssessment.query_id == query_id)
-        ).first()
+        )).first()
         if assessment:
-            session.delete(assessment)
-        session.delete(query)
-        session.commit()
+            await session.delete(assessment)
+        await session.delete(query)
+        await session.commit()
+    await asyncio.to_thread(_remove_literature_query_files, query_id)
+    return {"status": "deleted"}
+
 
+def _remove_literature_query_files(query_id: int) -> None:
     assessment_dir = BASE_DIR / "literature" / "assessments"
     for name in (f"assessment_{query_id}_llm.md", f"assessment_{query_id}.md"):
         path = assessment_dir / name
@@ -1509,30 +1874,32 @@ async def delete_literature_query(query_id: int) -> dict:
             path.unlink()
     shutil.rmtree(BASE_DIR / "literature" / "oa" / str(query_id), ignore_errors=True)
     shutil.rmtree(BASE_DIR / "literature" / "pdfs" / str(query_id), ignore_errors=True)
-    return {"status": "deleted"}
 
 
 @app.post("/api/literature/queries/{query_id}/cleanup")
 async def cleanup_literature_query(query_id: int) -> dict:
-    removed = 0
-    with Session(engine) as session:
-        works = session.exec(select(LiteratureWork).where(LiteratureWork.query_id == query_id)).all()
-        for work in works:
-            if work.work_type and work.work_type in EXCLUDED_WORK_TYPES:
-                session.delete(work)
-                removed += 1
-        session.commit()
+    async with async_session() as session:
+        removed = (await session.exec(
+            delete(LiteratureWork).where(
+                LiteratureWork.query_id == query_id,
+                LiteratureWork.work_type.in_(EXCLUDED_WORK_TYPES),
+            )
+        )).rowcount
+        await session.run_sync(prune_orphan_blobs)
+        await session.commit()
     return {"removed": removed}
 
 
 @app.delete("/api/literature/works/{work_id}")
 async def delete_literature_work(work_id: int) -> dict:
-    with Session(engine) as session:
-        work = session.get(LiteratureWork, work_id)
+    async with async_session() as session:
+        work = await session.get(LiteratureWork, work_id)
         if not work:
             raise HTTPException(status_code=404, detail="Work not found")
-        session.delete(work)
-        session.commit()
+        await session.delete(work)
+        await session.flush()
+        await session.run_sync(prune_orphan_blobs)
+        await session.commit()
     return {"status": "deleted"}
 
 
@@ -1545,6 +1912,11 @@ async def list_local_pdfs(query_id: int) -> List[str]:
 
 @app.post("/api/literature/works/{work_id}/attach-pdf")
 async def attach_pdf_to_work(work_id: int, payload: AttachPdfInput) -> dict:
+    # PDF text extraction is the slow part; it runs with the update off the loop.
+    return await asyncio.to_thread(_attach_pdf_to_work, work_id, payload)
+
+
+def _attach_pdf_to_work(work_id: int, payload: AttachPdfInput) -> dict:
     with Session(engine) as session:
         work = session.get(LiteratureWork, work_id)
         if not work:
@@ -1562,9 +1934,11 @@ async def attach_pdf_to_work(work_id: int, payload: AttachPdfInput) -> dict:
             raise HTTPException(status_code=400, detail=f"PDF parse error: {exc}") from exc
 
         work.pdf_path = str(pdf_path)
-        work.full_text = full_text
+        set_full_text(session, work, full_text)
         work.updated_at = datetime.now(timezone.utc)
         session.add(work)
+        session.flush()
+        prune_orphan_blobs(session)
         session.commit()
         session.refresh(work)
 
@@ -1573,14 +1947,16 @@ async def attach_pdf_to_work(work_id: int, payload: AttachPdfInput) -> dict:
 
 @app.delete("/api/literature/works/{work_id}/attach-pdf")
 async def detach_pdf_from_work(work_id: int) -> dict:
-    with Session(engine) as session:
-        work = session.get(LiteratureWork, work_id)
+    async with async_session() as session:
+        work = await session.get(LiteratureWork, work_id)
         if not work:
             raise HTTPException(status_code=404, detail="Work not found")
         work.pdf_path = None
-        work.full_text = None
+        await session.run_sync(set_full_text, work, None)
         work.updated_at = datetime.now(timezone.utc)
         session.add(work)
-        session.commit()
-        session.refresh(work)
+        await session.flush()
+        await session.run_sync(prune_orphan_blobs)
+        await session.commit()
+        await session.refresh(work)
     return {"id": work.id, "pdf_path": work.pdf_path}
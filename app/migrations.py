@@ -4,9 +4,12 @@ from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Callable, Iterable
 
+import zlib
+
 from sqlalchemy import text
 from sqlmodel import Session
 
+from .blobs import content_hash
 from .db_utils import column_exists
 
 
@@ -115,15 +118,131 @@ def _migrations() -> Iterable[Migration]:
                 _add_column(session, "reviewartifact", "slot", "INTEGER"),
             ),
         ),
+        Migration(
+            version=10,
+            name="add_run_concurrency",
+            apply=lambda session: _add_column(
+                session, "run", "concurrency", "INTEGER DEFAULT 1"
+            ),
+        ),
+        Migration(
+            version=11,
+            name="add_streaming_partial_flags",
+            apply=lambda session: (
+                _add_column(session, "dossierpart", "partial", "BOOLEAN DEFAULT 0"),
+                _add_column(session, "reviewartifact", "partial", "BOOLEAN DEFAULT 0"),
+            ),
+        ),
+        Migration(
+            version=12,
+            name="add_run_limits",
+            apply=lambda session: (
+                _add_column(session, "run", "deadline_seconds", "INTEGER"),
+                _add_column(session, "run", "max_tokens", "INTEGER"),
+                _add_column(session, "run", "cancel_requested", "BOOLEAN DEFAULT 0"),
+            ),
+        ),
+        Migration(
+            version=13,
+            name="add_run_pitch_batch_size",
+            apply=lambda session: _add_column(
+                session, "run", "pitch_batch_size", "INTEGER DEFAULT 1"
+            ),
+        ),
+        Migration(
+            version=14,
+            name="add_candidate_screening",
+            apply=lambda session: (
+                _add_column(session, "run", "candidate_count", "INTEGER"),
+                _add_column(session, "idea", "screen_score", "REAL"),
+            ),
+        ),
+        Migration(
+            version=15,
+            name="add_run_structured_output",
+            apply=lambda session: _add_column(
+                session, "run", "structured_output", "BOOLEAN DEFAULT 0"
+            ),
+        ),
+        Migration(
+            version=16,
+            name="add_run_chained",
+            apply=lambda session: _add_column(session, "run", "chained", "BOOLEAN DEFAULT 0"),
+        ),
+        Migration(
+            version=17,
+            name="add_hot_path_indexes",
+            apply=lambda session: [_create_index(session, *index) for index in HOT_PATH_INDEXES],
+        ),
+        Migration(
+            version=18,
+            name="move_full_text_to_blobs",
+            apply=lambda session: (
+                _add_column(session, "literaturework", "full_text_hash", "VARCHAR"),
+                _add_column(session, "literaturework", "full_text_chars", "INTEGER"),
+                _create_index(session, "ix_literaturework_full_text_hash", "literaturework", ("full_text_hash",)),
+                _move_full_text_to_blobs(session),
+            ),
+        ),
+        Migration(
+            version=19,
+            name="add_job_lease_token",
+            apply=lambda session: _add_column(session, "job", "lease_token", "VARCHAR"),
+        ),
     ]
 
 
+# (name, table, columns) for lookups that otherwise scan or sort: latest council
+# round per idea, gate per idea, newest credential per provider, local PDF dedupe
+# per query, and the newest-first list endpoints.
+HOT_PATH_INDEXES = (
+    ("ix_councilround_idea_round", "councilround", ("idea_id", "round_number")),
+    ("ix_gateresult_idea_gate", "gateresult", ("idea_id", "gate")),
+    ("ix_providercredential_provider_created", "providercredential", ("provider", "created_at")),
+    ("ix_literaturework_query_pdf", "literaturework", ("query_id", "pdf_path")),
+    ("ix_run_created_at", "run", ("created_at",)),
+    ("ix_idea_created_at", "idea", ("created_at",)),
+    ("ix_review_created_at", "review", ("created_at",)),
+    ("ix_literaturequery_created_at", "literaturequery", ("created_at",)),
+)
+
+
 def _add_column(session: Session, table: str, column: str, column_type: str) -> None:
     if column_exists(session, table, column):
         return
     session.exec(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
 
 
+def _create_index(session: Session, name: str, table: str, columns: tuple[str, ...]) -> None:
+    session.exec(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def _move_full_text_to_blobs(session: Session) -> None:
+    # Older databases kept full_text inline; move it into textblob and clear the
+    # column (the model no longer maps it).
+    if not column_exists(session, "literaturework", "full_text"):
+        return
+    created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    rows = session.exec(
+        text("SELECT id, full_text FROM literaturework WHERE full_text IS NOT NULL AND full_text != ''")
+    ).all()
+    for work_id, full_text in rows:
+        key = content_hash(full_text)
+        raw = full_text.encode("utf-8")
+        session.exec(
+            text(
+                "INSERT OR IGNORE INTO textblob (content_hash, data, size_bytes, created_at) "
+                "VALUES (:key, :data, :size, :created_at)"
+            ).bindparams(key=key, data=zlib.compress(raw), size=len(raw), created_at=created_at)
+        )
+        session.exec(
+            text(
+                "UPDATE literaturework SET full_text_hash = :key, full_text_chars = :chars, "
+                "full_text = NULL WHERE id = :id"
+            ).bindparams(key=key, chars=len(full_text), id=work_id)
+        )
+
+
 def apply_migrations(session: Session) -> None:
     _create_schema_migrations_table(session)
     applied = _applied_versions(session)
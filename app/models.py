@@ -16,6 +16,8 @@ class RunStatus(str, Enum):
     running = "running"
     completed = "completed"
     failed = "failed"
+    cancelled = "cancelled"
+    budget_exhausted = "budget_exhausted"
 
 
 class GateStatus(str, Enum):
@@ -70,9 +72,21 @@ class Run(SQLModel, table=True):
     provider: str
     model: str
     idea_count: int = 1
+    concurrency: int = 1
     topic_focus: Optional[str] = None
     literature_query_id: Optional[int] = Field(default=None, index=True)
     use_assessment_seeds: bool = Field(default=False)
+    deadline_seconds: Optional[int] = None
+    max_tokens: Optional[int] = None
+    cancel_requested: bool = Field(default=False)
+    # Pitches requested per LLM call; 1 keeps the one-call-per-idea pitch stage.
+    pitch_batch_size: int = Field(default=1)
+    # Funnel mode: pitch this many candidates and expand only the best idea_count of them.
+    candidate_count: Optional[int] = None
+    # Ask providers for schema-constrained JSON for the pitch and council stages.
+    structured_output: bool = Field(default=False)
+    # Run each idea's stages as one provider conversation that continues from its pitch.
+    chained: bool = Field(default=False)
     created_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
     log: Optional[str] = None
@@ -87,6 +101,7 @@ class Idea(SQLModel, table=True):
     breakthrough_type: Optional[str] = None
     big_claim: Optional[str] = None
     status: Optional[str] = None
+    screen_score: Optional[float] = None
     created_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
 
@@ -96,6 +111,7 @@ class DossierPart(SQLModel, table=True):
     idea_id: int = Field(index=True)
     kind: DossierKind
     content: str
+    partial: bool = Field(default=False)
     created_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
 
@@ -159,6 +175,7 @@ class ReviewArtifact(SQLModel, table=True):
     persona: Optional[str] = Field(default=None, index=True)
     slot: Optional[int] = None
     content: str
+    partial: bool = Field(default=False)
     created_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
 
@@ -209,13 +226,73 @@ class LiteratureWork(SQLModel, table=True):
     abstract: Optional[str] = None
     open_access_url: Optional[str] = None
     pdf_path: Optional[str] = None
-    full_text: Optional[str] = None
+    # Full text lives in TextBlob and is loaded only where it is read.
+    full_text_hash: Optional[str] = Field(default=None, index=True)
+    full_text_chars: Optional[int] = None
     created_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
 
 
+class TextBlob(SQLModel, table=True):
+    # zlib-compressed text keyed by the SHA-256 of its content, shared by identical texts.
+    content_hash: str = Field(primary_key=True)
+    data: bytes
+    size_bytes: int = 0
+    created_at: datetime = Field(default_factory=utc_now)
+
+
 class LiteratureAssessment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     query_id: int = Field(index=True)
     content: str
     created_at: datetime = Field(default_factory=utc_now)
+
+
+class LlmResponseCache(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    cache_key: str = Field(index=True, unique=True)
+    provider: str
+    model: str
+    content: str
+    size_bytes: int = 0
+    hit_count: int = 0
+    created_at: datetime = Field(default_factory=utc_now, index=True)
+    last_used_at: datetime = Field(default_factory=utc_now, index=True)
+
+
+class LlmCall(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    provider: str = Field(index=True)
+    model: str
+    stage: Optional[str] = Field(default=None, index=True)
+    run_id: Optional[int] = Field(default=None, index=True)
+    idea_id: Optional[int] = Field(default=None, index=True)
+    review_id: Optional[int] = Field(default=None, index=True)
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    latency_ms: int = 0
+    retries: int = 0
+    streamed: bool = False
+    cache_hit: bool = False
+    status: str = "ok"
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=utc_now, index=True)
+
+
+class Job(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str = Field(index=True)
+    payload: str = "{}"
+    status: str = Field(default="queued", index=True)
+    attempts: int = 0
+    max_attempts: int = 3
+    lease_owner: Optional[str] = None
+    # Fresh per claim, so a stale heartbeat cannot renew a job claimed again since.
+    lease_token: Optional[str] = None
+    lease_expires_at: Optional[datetime] = Field(default=None, index=True)
+    run_after: datetime = Field(default_factory=utc_now, index=True)
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
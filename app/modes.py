@@ -9,6 +9,8 @@ class ModeConfig:
     mode_id: str
     prompt_set: str
     rubric_path: Path
+    # Stages run after gate 1; they are scheduled concurrently by the stage graph.
+    stages: tuple[str, ...]
 
 
 MODE_IDEATION = "ideation"
@@ -18,6 +20,7 @@ MODE_CONFIGS = {
         mode_id=MODE_IDEATION,
         prompt_set="ideation",
         rubric_path=Path("EVAL_RUBRIC.md"),
+        stages=("design", "data", "positioning", "next_steps", "council"),
     ),
 }
 
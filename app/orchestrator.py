@@ -1,12 +1,16 @@
+import asyncio
+import os
 import re
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
+from typing import Callable, List
 
+import httpx
 from sqlmodel import Session, select
 
 from .crypto import decrypt_secret
-from .db import engine
+from .db import async_session, engine
 from .files import export_idea_markdown
 from .models import (
     AgentMemo,
@@ -23,24 +27,99 @@ from .models import (
     LiteratureAssessment,
 )
 from .modes import MODE_IDEATION, get_mode_config
-from .prompts import build_prompt
+from .persistence import Write, write_behind
+from .pipeline import Stage, StageGraph
+from .pitch_repair import fill_headers, repair_pitch
+from .prompts import (
+    PITCH_BATCH_MARKER,
+    build_followup_prompt,
+    build_header_fill_prompt,
+    build_pitch_batch_prompt,
+    build_prompt,
+    build_screening_prompt,
+)
+from .screening import parse_judge_scores, screen_score, template_gaps
+from .structured import (
+    StructuredOutputError,
+    parse_structured,
+    render_council,
+    render_pitch,
+    salvage_council,
+    structured_prompt,
+)
+from .streaming import stream_with_flush, write_partial_content
+from .providers.accounting import AccountedProvider, llm_scope, tokens_spent
+from .providers.admission import AdmittedProvider, admission
 from .providers.anthropic_provider import AnthropicProvider
+from .providers.base import CacheablePrompt, Conversation, LLMProvider, ProviderError, chained_prompt, split_prompt
+from .providers.cache import CachedProvider, response_cache
+from .providers.rate_limit import RateLimitedProvider, rate_limiters
+from .providers.resilience import ResilientProvider, circuit_breakers
+from .providers.replay_provider import Cassette, RecordingProvider, ReplayProvider
 from .providers.gemini_provider import GeminiProvider
 from .providers.openai_provider import OpenAIProvider
 
+
+def _provider_chain(name: str, provider: LLMProvider) -> LLMProvider:
+    record_path = os.getenv("CODEX_COUNCIL_RECORD_CASSETTE")
+    if record_path and name not in KEYLESS_PROVIDERS:
+        provider = RecordingProvider(name, provider, Cassette(Path(record_path)))
+    admitted = AdmittedProvider(name, provider, admission)
+    limited = RateLimitedProvider(name, admitted, rate_limiters)
+    resilient = ResilientProvider(name, limited, circuit_breakers)
+    return AccountedProvider(name, CachedProvider(name, resilient, response_cache))
+
+
+# Providers that run without stored credentials (offline replay of recorded cassettes).
+KEYLESS_PROVIDERS = {"replay"}
+
 PROVIDERS = {
-    "openai": OpenAIProvider(),
-    "anthropic": AnthropicProvider(),
-    "gemini": GeminiProvider(),
+    "openai": _provider_chain("openai", OpenAIProvider()),
+    "anthropic": _provider_chain("anthropic", AnthropicProvider()),
+    "gemini": _provider_chain("gemini", GeminiProvider()),
+    "replay": _provider_chain("replay", ReplayProvider()),
+}
+
+DOSSIER_STAGES = ("design", "data", "positioning", "next_steps", "council")
+DOSSIER_STAGE_KINDS = {
+    "design": DossierKind.design,
+    "data": DossierKind.data_plan,
+    "positioning": DossierKind.positioning,
+    "next_steps": DossierKind.next_steps,
+}
+COUNCIL_DRAFT_REFEREE = "Council (in progress)"
+# Checkpointed stages of one idea, in pipeline order; a resumed run only pays for the missing ones.
+IDEA_STAGES = ("pitch", "gate1", *DOSSIER_STAGES)
+# Funnel candidates that lost screening keep their pitch but are never expanded.
+SCREENED_OUT = "screened_out"
+STAGE_AUTHORS = {
+    "design": ("Theory Architect", "DESIGN.md"),
+    "data": ("Data Feasibility Agent", "DATA_PLAN.md"),
+    "positioning": ("Measurement Agent", "POSITIONING.md"),
+    "next_steps": ("PI Proxy Agent", "NEXT_STEPS.md"),
 }
 
 DEFAULT_MODELS = {
     "openai": "gpt-5-nano",
     "anthropic": "claude-3-5-sonnet-20240620",
     "gemini": "gemini-1.5-flash",
+    "replay": "replay",
 }
 
 
+def load_api_key(session: Session, provider: str, passphrase: str) -> str | None:
+    credential = session.exec(
+        select(ProviderCredential)
+        .where(ProviderCredential.provider == provider)
+        .order_by(ProviderCredential.created_at.desc())
+    ).first()
+    if credential:
+        return decrypt_secret(passphrase, credential.api_key_encrypted, credential.salt)
+    if provider in KEYLESS_PROVIDERS:
+        return ""
+    return None
+
+
 def _parse_header_value(content: str, key: str) -> str | None:
     match = re.search(rf"^{re.escape(key)}\s*:\s*(.+)$", content, re.MULTILINE)
     return match.group(1).strip() if match else None
@@ -90,15 +169,27 @@ def _build_gate1_retry_prompt(pitch: str) -> str:
 
 
 def _build_gate1_retry_prompt_with_base(base_prompt: str, draft: str) -> str:
-    return "\n\n".join([
-        base_prompt.strip(),
+    prefix, suffix = split_prompt(base_prompt)
+    return CacheablePrompt(prefix, "\n\n".join([
+        suffix.strip(),
         "CRITICAL FIX: Your last output missed required header fields.",
         "The header block must be the first lines of the output.",
         "Return only the corrected PITCH.md content.",
         "",
         "Previous draft:",
         draft.strip(),
-    ])
+    ]))
+
+
+def _split_pitch_batch(content: str) -> dict[int, str]:
+    # Pitches keyed by their marker number; the first copy of a repeated number wins.
+    marker = re.escape(PITCH_BATCH_MARKER).replace(re.escape("{index}"), r"(\d+)")
+    parts = re.split(rf"^\s*{marker}\s*$", content, flags=re.MULTILINE)
+    pitches: dict[int, str] = {}
+    for number, text in zip(parts[1::2], parts[2::2]):
+        if text.strip():
+            pitches.setdefault(int(number), text.strip())
+    return pitches
 
 
 def _split_council_memos(content: str) -> List[str]:
@@ -148,6 +239,48 @@ def _next_council_round(session: Session, idea_id: int) -> int:
     return (last_round.round_number + 1) if last_round else 1
 
 
+def _restore_outputs(session: Session, idea_id: int) -> dict:
+    # Stage checkpoints are the stored outputs themselves: a final DossierPart per
+    # section, the gate-1 result, and a generated council round.
+    outputs: dict = {}
+    parts = session.exec(
+        select(DossierPart).where(DossierPart.idea_id == idea_id, DossierPart.partial == False)  # noqa: E712
+    ).all()
+    sections = {kind: section for section, kind in DOSSIER_STAGE_KINDS.items()}
+    for part in parts:
+        if part.kind == DossierKind.pitch:
+            outputs["pitch"] = part.content
+        elif part.kind in sections:
+            outputs[sections[part.kind]] = part.content
+    gate1 = session.exec(
+        select(GateResult).where(GateResult.idea_id == idea_id, GateResult.gate == 1)
+    ).first()
+    if gate1:
+        outputs["gate1"] = (gate1.status, gate1.notes)
+    council = session.exec(
+        select(CouncilRound).where(CouncilRound.idea_id == idea_id, CouncilRound.status == "generated")
+    ).first()
+    if council:
+        memos = session.exec(select(CouncilMemo).where(CouncilMemo.round_id == council.id)).all()
+        outputs["council"] = "\n---\n".join(memo.content for memo in memos)
+    return outputs
+
+
+def planned_idea_count(run: Run) -> int:
+    # In funnel mode every candidate gets an idea row; idea_count of them are expanded.
+    return max(run.idea_count, run.candidate_count or 0)
+
+
+def pending_stages(session: Session, idea_id: int) -> List[str]:
+    idea = session.get(Idea, idea_id)
+    if idea and idea.status == SCREENED_OUT:
+        return []
+    outputs = _restore_outputs(session, idea_id)
+    if "gate1" in outputs and not _gate1_open(outputs["gate1"]):
+        return []
+    return [stage for stage in IDEA_STAGES if stage not in outputs]
+
+
 def _write_mail_memo(base_dir: Path, memo: AgentMemo) -> None:
     mailbox = "inbox" if memo.direction == "inbox" else "outbox"
     mail_dir = base_dir / "mail" / mailbox
@@ -171,248 +304,730 @@ def _build_memo(role: str, topic: str, content: str) -> str:
     ])
 
 
+class RunStopped(Exception):
+    pass
+
+
+class RunGuard:
+    # Enforces cancellation, the deadline and the token budget of one run. Stage
+    # boundaries call check(); stop() also cancels provider calls still in flight.
+    def __init__(self, run_id: int, deadline_seconds: int | None, max_tokens: int | None) -> None:
+        self.run_id = run_id
+        self.deadline_seconds = deadline_seconds
+        self.max_tokens = max_tokens
+        self.stopped: tuple[RunStatus, str] | None = None
+        self._work: asyncio.Future | None = None
+        self._timer: asyncio.TimerHandle | None = None
+
+    def attach(self, work: asyncio.Future) -> None:
+        self._work = work
+        if self.deadline_seconds:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.deadline_seconds,
+                self.stop,
+                RunStatus.budget_exhausted,
+                f"Deadline of {self.deadline_seconds}s reached",
+            )
+
+    def close(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+        active_runs.pop(self.run_id, None)
+
+    def stop(self, status: RunStatus, reason: str) -> None:
+        if self.stopped:
+            return
+        self.stopped = (status, reason)
+        if self._work:
+            self._work.cancel()
+
+    def _read_limits(self) -> tuple[bool, int | None]:
+        with Session(engine) as session:
+            run = session.get(Run, self.run_id)
+            cancel_requested = run is None or run.cancel_requested
+        if cancel_requested or not self.max_tokens:
+            return cancel_requested, None
+        return False, tokens_spent(self.run_id)
+
+    async def check(self) -> None:
+        # Reads the cancel flag from the database too, so a cancel issued by another
+        # process (or before this worker picked the run up) is honored. Call rows are
+        # queued on the write-behind writer, so a budgeted run flushes them first.
+        if self.max_tokens:
+            await write_behind.flush()
+        cancel_requested, spent = await asyncio.to_thread(self._read_limits)
+        if cancel_requested:
+            self.stop(RunStatus.cancelled, "Cancelled by user")
+        elif spent is not None:
+            if spent >= self.max_tokens:
+                self.stop(RunStatus.budget_exhausted, f"Token budget of {self.max_tokens} exhausted ({spent} used)")
+        if self.stopped:
+            raise RunStopped(self.stopped[1])
+
+
+# Guards of runs executing in this process, so the cancel endpoint can interrupt them at once.
+active_runs: dict[int, RunGuard] = {}
+
+
+@dataclass(frozen=True)
+class SwarmContext:
+    run_id: int
+    provider: LLMProvider
+    model: str
+    api_key: str
+    topic_focus: str | None
+    assessment_text: str | None
+    prompt_set: str
+    base_dir: Path
+    stages: StageGraph
+    guard: RunGuard
+    structured: bool = False
+    chained: bool = False
+
+
+async def _export_idea(base_dir: Path, idea_id: int) -> None:
+    async with async_session() as session:
+        parts = (await session.exec(select(DossierPart).where(DossierPart.idea_id == idea_id))).all()
+        memos = (await session.exec(select(CouncilMemo).where(CouncilMemo.idea_id == idea_id))).all()
+    await asyncio.to_thread(export_idea_markdown, base_dir, idea_id, parts, memos)
+
+
+@dataclass
+class IdeaContext:
+    swarm: SwarmContext
+    idea_id: int
+    idea_seed: str | None
+    # Row ids of in-progress outputs, keyed by stage, filled when a stage starts streaming.
+    rows: dict = field(default_factory=dict)
+    # Provider id of the pitch reply, which chained stages continue from when set.
+    pitch_response_id: str | None = None
+    # Queued writes of this idea; _run_idea waits for them before exporting.
+    writes: list = field(default_factory=list)
+
+
+def _write(ctx: IdeaContext, write: Write) -> asyncio.Future:
+    # Stage output goes through the shared write-behind queue, so the writes of
+    # concurrent stages and ideas commit together instead of one fsync each.
+    future = write_behind.submit(write)
+    ctx.writes.append(future)
+    return future
+
+
+def _post_memo(ctx: IdeaContext, sender: str, topic: str, content: str) -> None:
+    fields = dict(
+        run_id=ctx.swarm.run_id,
+        idea_id=ctx.idea_id,
+        direction="outbox",
+        sender=sender,
+        topic=topic,
+        content=content,
+    )
+
+    def write(session: Session) -> int:
+        memo = AgentMemo(**fields)
+        session.add(memo)
+        session.flush()
+        return memo.id
+
+    async def deliver(committed: asyncio.Future) -> None:
+        # The mail file follows the commit: a replayed batch cannot write it twice
+        # and a failed write leaves no file behind.
+        memo_id = await committed
+        await asyncio.to_thread(_write_mail_memo, ctx.swarm.base_dir, AgentMemo(id=memo_id, **fields))
+
+    ctx.writes.append(asyncio.ensure_future(deliver(write_behind.submit(write))))
+
+
+def _gate1_open(verdict: tuple[GateStatus, str]) -> bool:
+    return verdict[0] == GateStatus.passed
+
+
+def _repair_locally(pitch: str) -> tuple[str, List[str]]:
+    # Pitches that already pass gate 1 are left untouched.
+    if _gate1_status(pitch)[0] == GateStatus.passed:
+        return pitch, []
+    return repair_pitch(pitch)
+
+
+async def _run_structured_pitch(swarm: SwarmContext, pitch_prompt: str) -> str | None:
+    # Schema-constrained output always carries the gate-1 headers; a response that
+    # still fails validation drops back to the free-text pitch path.
+    with llm_scope(stage="pitch", cache=False):
+        response = await swarm.provider.generate(
+            structured_prompt(pitch_prompt, "pitch"), swarm.model, swarm.api_key
+        )
+    try:
+        return render_pitch(parse_structured(response.content, "pitch"))
+    except StructuredOutputError:
+        return None
+
+
+async def _run_pitch(ctx: IdeaContext, inputs: dict) -> str:
+    swarm = ctx.swarm
+    await swarm.guard.check()
+    provider = swarm.provider
+    pitch_prompt = build_prompt(
+        "pitch",
+        swarm.topic_focus,
+        swarm.assessment_text,
+        ctx.idea_seed,
+        mode=swarm.prompt_set,
+    )
+    if swarm.structured:
+        structured_pitch = await _run_structured_pitch(swarm, pitch_prompt)
+        if structured_pitch is not None:
+            return structured_pitch
+    with llm_scope(stage="pitch", cache=False):
+        pitch_response = await provider.generate(pitch_prompt, swarm.model, swarm.api_key)
+    pitch_content, missing = _repair_locally(pitch_response.content)
+    if not missing:
+        if pitch_content == pitch_response.content:
+            ctx.pitch_response_id = pitch_response.response_id
+        return pitch_content
+    # A fill-only prompt costs a fraction of a regeneration; full retries are the last resort.
+    with llm_scope(stage="pitch_repair"):
+        fill_response = await provider.generate(
+            build_header_fill_prompt(pitch_content, missing), swarm.model, swarm.api_key
+        )
+    pitch_content, missing = fill_headers(pitch_content, fill_response.content)
+    if not missing:
+        return pitch_content
+    retry_prompt = _build_gate1_retry_prompt_with_base(pitch_prompt, pitch_content)
+    with llm_scope(stage="pitch_retry", cache=False):
+        retry_response = await provider.generate(retry_prompt, swarm.model, swarm.api_key)
+    pitch_content, missing = _repair_locally(retry_response.content)
+    if missing:
+        retry_prompt = _build_gate1_retry_prompt(pitch_content)
+        with llm_scope(stage="pitch_retry", cache=False):
+            retry_response = await provider.generate(retry_prompt, swarm.model, swarm.api_key)
+        pitch_content, _ = _repair_locally(retry_response.content)
+    return pitch_content
+
+
+def _save_pitch(ctx: IdeaContext, pitch_content: str) -> None:
+    def write(session: Session) -> None:
+        idea = session.get(Idea, ctx.idea_id)
+        idea.title = _parse_title(pitch_content)
+        idea.big_claim = _parse_big_claim(pitch_content)
+        idea.lane_primary = _parse_header_value(pitch_content, "LANE_PRIMARY")
+        idea.lane_secondary = _parse_header_value(pitch_content, "LANE_SECONDARY")
+        idea.breakthrough_type = _parse_header_value(pitch_content, "BREAKTHROUGH_TYPE")
+        idea.updated_at = datetime.now(timezone.utc)
+        session.add(idea)
+        session.add(DossierPart(idea_id=ctx.idea_id, kind=DossierKind.pitch, content=pitch_content))
+
+    _write(ctx, write)
+    _post_memo(ctx, "Ideator Agent", "PITCH", _build_memo("Ideator Agent", "PITCH.md", pitch_content))
+
+
+async def _run_pitch_batch(
+    ctx: SwarmContext,
+    semaphore: asyncio.Semaphore,
+    batch: list[tuple[int, str | None]],
+) -> None:
+    # One call drafts the pitches of several ideas. Each pitch that passes gate 1
+    # locally is checkpointed; the rest keep no pitch and fall back to the
+    # single-pitch stage (with its retries) when their idea runs.
+    async with semaphore:
+        await ctx.guard.check()
+        prompt = build_pitch_batch_prompt(
+            [seed for _, seed in batch],
+            ctx.topic_focus,
+            ctx.assessment_text,
+            mode=ctx.prompt_set,
+        )
+        try:
+            with llm_scope(run_id=ctx.run_id, stage="pitch_batch", priority="bulk", cache=False):
+                response = await ctx.provider.generate(prompt, ctx.model, ctx.api_key)
+        except (ProviderError, httpx.HTTPError):
+            # The failed call is recorded by the accounting layer; every idea in
+            # the batch falls back to its own pitch call.
+            return
+    writes: list = []
+    pitches = _split_pitch_batch(response.content)
+    for index, (idea_id, idea_seed) in enumerate(batch, start=1):
+        if index not in pitches:
+            continue
+        pitch, missing = _repair_locally(pitches[index])
+        if missing:
+            continue
+        _save_pitch(IdeaContext(ctx, idea_id, idea_seed, writes=writes), pitch)
+    # The ideas' stage graphs restore these pitches from the database.
+    await asyncio.gather(*writes)
+
+
+async def _run_gate1(ctx: IdeaContext, inputs: dict) -> tuple[GateStatus, str]:
+    return _gate1_status(inputs["pitch"])
+
+
+def _save_gate1(ctx: IdeaContext, verdict: tuple[GateStatus, str]) -> None:
+    status, notes = verdict
+    _write(ctx, lambda session: session.add(GateResult(idea_id=ctx.idea_id, gate=1, status=status, notes=notes)))
+
+
+def _clear_interrupted_stages(session: Session, idea_id: int) -> None:
+    # Partial rows belong to an interrupted attempt; those stages start over.
+    session.exec(
+        DossierPart.__table__.delete().where(DossierPart.idea_id == idea_id, DossierPart.partial == True)  # noqa: E712
+    )
+    stale_rounds = session.exec(
+        select(CouncilRound).where(CouncilRound.idea_id == idea_id, CouncilRound.status == "streaming")
+    ).all()
+    for stale in stale_rounds:
+        session.exec(CouncilMemo.__table__.delete().where(CouncilMemo.round_id == stale.id))
+        session.delete(stale)
+
+
+async def _stream_stage(
+    ctx: IdeaContext,
+    section: str,
+    model_cls: type,
+    row_id: int,
+    pitch: str | None = None,
+    structured: bool = False,
+    render: Callable[[str], str] | None = None,
+) -> str:
+    # Each stage streams into its own in-progress row so partial text is visible
+    # (and survives failures) before the full completion arrives; `render` turns
+    # the text so far into what the row shows.
+    swarm = ctx.swarm
+    await swarm.guard.check()
+    prompt = build_prompt(
+        section,
+        swarm.topic_focus,
+        swarm.assessment_text,
+        ctx.idea_seed,
+        mode=swarm.prompt_set,
+    )
+    if swarm.chained and pitch:
+        # Continue the pitch conversation: concurrent stages each branch from the
+        # pitch turn and send only their own instruction.
+        pitch_prompt = build_prompt(
+            "pitch",
+            swarm.topic_focus,
+            swarm.assessment_text,
+            ctx.idea_seed,
+            mode=swarm.prompt_set,
+        )
+        prompt = chained_prompt(
+            Conversation(((pitch_prompt, pitch),), ctx.pitch_response_id),
+            build_followup_prompt(section, swarm.prompt_set),
+        )
+    if structured:
+        prompt = structured_prompt(prompt, section)
+    with llm_scope(stage=section, cache=False):
+        return await stream_with_flush(
+            swarm.provider,
+            prompt,
+            swarm.model,
+            swarm.api_key,
+            lambda text: write_behind.submit(
+                lambda session: write_partial_content(session, model_cls, row_id, render(text) if render else text)
+            ),
+        )
+
+
+def _render_council_draft(content: str) -> str:
+    # The visible draft of a structured council shows the memos that have fully
+    # arrived, rendered as text, never the raw JSON.
+    return "\n---\n".join(render_council({"memos": salvage_council(content)}))
+
+
+def _dossier_stage(section: str) -> Stage:
+    kind = DOSSIER_STAGE_KINDS[section]
+    role, topic = STAGE_AUTHORS[section]
+
+    async def run(ctx: IdeaContext, inputs: dict) -> str:
+        def create(session: Session) -> int:
+            part = DossierPart(idea_id=ctx.idea_id, kind=kind, content="", partial=True)
+            session.add(part)
+            session.flush()
+            return part.id
+
+        ctx.rows[section] = await _write(ctx, create)
+        return await _stream_stage(ctx, section, DossierPart, ctx.rows[section], pitch=inputs["pitch"])
+
+    def persist(ctx: IdeaContext, content: str) -> None:
+        def write(session: Session) -> None:
+            part = session.get(DossierPart, ctx.rows[section])
+            part.content = content
+            part.partial = False
+            part.updated_at = datetime.now(timezone.utc)
+            session.add(part)
+
+        _write(ctx, write)
+        _post_memo(ctx, role, topic, _build_memo(role, topic, content))
+
+    return Stage(section, run, inputs=("pitch", "gate1"), persist=persist)
+
+
+async def _run_council(ctx: IdeaContext, inputs: dict) -> str:
+    def create(session: Session) -> tuple[int, int]:
+        council_round = CouncilRound(
+            idea_id=ctx.idea_id,
+            round_number=_next_council_round(session, ctx.idea_id),
+            status="streaming",
+        )
+        session.add(council_round)
+        session.flush()
+        council_draft = CouncilMemo(
+            idea_id=ctx.idea_id,
+            round_id=council_round.id,
+            referee=COUNCIL_DRAFT_REFEREE,
+            content="",
+        )
+        session.add(council_draft)
+        session.flush()
+        return council_draft.id, council_round.id
+
+    ctx.rows["council"] = await _write(ctx, create)
+    draft_id = ctx.rows["council"][0]
+    if not ctx.swarm.structured:
+        return await _stream_stage(ctx, "council", CouncilMemo, draft_id, pitch=inputs["pitch"])
+    content = await _stream_stage(
+        ctx,
+        "council",
+        CouncilMemo,
+        draft_id,
+        pitch=inputs["pitch"],
+        structured=True,
+        render=_render_council_draft,
+    )
+    try:
+        memos = parse_structured(content, "council")["memos"]
+    except StructuredOutputError:
+        # Repaired locally, keeping every memo that validates, rather than paying
+        # for the whole council again.
+        memos = salvage_council(content)
+        if not memos:
+            raise
+    return "\n---\n".join(render_council({"memos": memos}))
+
+
+def _save_council(ctx: IdeaContext, content: str) -> None:
+    draft_id, round_id = ctx.rows["council"]
+    memos = _split_council_memos(content)
+
+    def write(session: Session) -> None:
+        council_draft = session.get(CouncilMemo, draft_id)
+        if council_draft:
+            session.delete(council_draft)
+        council_round = session.get(CouncilRound, round_id)
+        council_round.status = "generated"
+        session.add(council_round)
+        for idx, memo_text in enumerate(memos, start=1):
+            referee = f"Referee {chr(64 + idx)}" if idx <= 5 else f"Referee {idx}"
+            session.add(CouncilMemo(
+                idea_id=ctx.idea_id,
+                round_id=council_round.id,
+                referee=referee,
+                content=memo_text,
+            ))
+
+    _write(ctx, write)
+    _post_memo(ctx, "Council Agents", "Council", _build_memo("Council Agents", "council memos", content))
+
+
+async def _run_review_gates(ctx: IdeaContext, inputs: dict) -> None:
+    def write(session: Session) -> None:
+        gates = {
+            gate.gate
+            for gate in session.exec(select(GateResult).where(GateResult.idea_id == ctx.idea_id)).all()
+        }
+        for gate in (2, 3, 4):
+            if gate not in gates:
+                session.add(GateResult(idea_id=ctx.idea_id, gate=gate, status=GateStatus.needs_revision))
+
+    await _write(ctx, write)
+
+
+async def _judge_pitch(
+    ctx: SwarmContext,
+    semaphore: asyncio.Semaphore,
+    idea_id: int,
+    pitch: str,
+) -> float | None:
+    # One short call per candidate scores the EVAL_RUBRIC idea fields; an unusable
+    # answer leaves the candidate unscored, ranked after the scored ones.
+    async with semaphore:
+        await ctx.guard.check()
+        with llm_scope(run_id=ctx.run_id, idea_id=idea_id, stage="screening", priority="bulk"):
+            response = await ctx.provider.generate(build_screening_prompt(pitch), ctx.model, ctx.api_key)
+    scores = parse_judge_scores(response.content)
+    return screen_score(scores) if scores else None
+
+
+async def _screen_candidates(ctx: SwarmContext, semaphore: asyncio.Semaphore, keep: int) -> List[int]:
+    # Ranks gate-1 survivors and returns the ids to expand; the rest are marked
+    # screened out. Pitches missing template parts rank last without a judge call.
+    # Scores persist, so a resumed run keeps its picks.
+    async with async_session() as session:
+        scores, pitches = await session.run_sync(_screening_candidates, ctx.run_id)
+    passed = {
+        idea_id
+        for idea_id, pitch in pitches.items()
+        if not template_gaps(pitch, _parse_header_value(pitch, "LANE_PRIMARY"))
+    }
+    to_judge = [idea_id for idea_id in pitches if idea_id in passed and scores[idea_id] is None]
+    judged = await asyncio.gather(*[
+        _judge_pitch(ctx, semaphore, idea_id, pitches[idea_id]) for idea_id in to_judge
+    ], return_exceptions=True)
+    for idea_id, outcome in zip(to_judge, judged):
+        if isinstance(outcome, RunStopped):
+            raise outcome
+        scores[idea_id] = None if isinstance(outcome, BaseException) else outcome
+
+    ranked = sorted(
+        scores,
+        key=lambda idea_id: (idea_id not in passed, scores[idea_id] is None, -(scores[idea_id] or 0), idea_id),
+    )
+
+    def write(session: Session) -> None:
+        for rank, idea_id in enumerate(ranked):
+            idea = session.get(Idea, idea_id)
+            idea.screen_score = scores[idea_id]
+            if rank >= keep:
+                idea.status = SCREENED_OUT
+                idea.updated_at = datetime.now(timezone.utc)
+            session.add(idea)
+
+    await write_behind.submit(write)
+    return ranked[:keep]
+
+
+def _screening_candidates(session: Session, run_id: int) -> tuple[dict[int, float | None], dict[int, str]]:
+    # Gate-1 survivors of the run with their stored scores and pitches.
+    ideas = session.exec(select(Idea).where(Idea.run_id == run_id).order_by(Idea.id)).all()
+    scores: dict[int, float | None] = {}
+    pitches: dict[int, str] = {}
+    for idea in ideas:
+        if idea.status in ("failed", SCREENED_OUT):
+            continue
+        outputs = _restore_outputs(session, idea.id)
+        if "gate1" not in outputs or not _gate1_open(outputs["gate1"]):
+            continue
+        scores[idea.id] = idea.screen_score
+        pitches[idea.id] = outputs["pitch"]
+    return scores, pitches
+
+
+def build_idea_graph(stages: tuple[str, ...] = DOSSIER_STAGES) -> StageGraph:
+    # Every stage behind gate 1 only needs the shared prompt inputs, so the
+    # scheduler runs them concurrently; gates 2-4 open once they all finish.
+    dossier = [
+        Stage("council", _run_council, inputs=("pitch", "gate1"), persist=_save_council)
+        if section == "council"
+        else _dossier_stage(section)
+        for section in stages
+    ]
+    return StageGraph([
+        *_pitch_stages(),
+        *dossier,
+        Stage("review_gates", _run_review_gates, inputs=tuple(stages)),
+    ])
+
+
+def build_screening_graph() -> StageGraph:
+    # The cheap front of the pipeline, run for every funnel candidate before screening.
+    return StageGraph(_pitch_stages())
+
+
+def _pitch_stages() -> list[Stage]:
+    return [
+        Stage("pitch", _run_pitch, persist=_save_pitch),
+        Stage("gate1", _run_gate1, inputs=("pitch",), persist=_save_gate1, gate=_gate1_open),
+    ]
+
+
+async def _run_idea(ctx: SwarmContext, idea_id: int, idea_seed: str | None) -> None:
+    async with async_session() as session:
+        completed = await session.run_sync(_restore_outputs, idea_id)
+    idea_ctx = IdeaContext(ctx, idea_id, idea_seed)
+    await _write(idea_ctx, lambda session: _clear_interrupted_stages(session, idea_id))
+    try:
+        result = await ctx.stages.run(idea_ctx, completed)
+    finally:
+        # The export reads the dossier back, so queued writes must land first.
+        settled = await asyncio.gather(*idea_ctx.writes, return_exceptions=True)
+        await _export_idea(ctx.base_dir, idea_id)
+    write_errors = [outcome for outcome in settled if isinstance(outcome, Exception)]
+    if write_errors:
+        raise write_errors[0]
+    if result.errors:
+        raise next(iter(result.errors.values()))
+
+
+async def _run_idea_isolated(
+    ctx: SwarmContext,
+    semaphore: asyncio.Semaphore,
+    idea_id: int,
+    idea_seed: str | None,
+) -> str | None:
+    async with semaphore:
+        try:
+            with llm_scope(run_id=ctx.run_id, idea_id=idea_id, priority="bulk"):
+                await _run_idea(ctx, idea_id, idea_seed)
+        except Exception as exc:
+            if ctx.guard.stopped:
+                # Interrupted by the run guard: keep the partial idea resumable rather than failed.
+                return None
+            await write_behind.submit(lambda session: _mark_idea_failed(session, idea_id))
+            return f"Idea {idea_id}: {exc}"
+    return None
+
+
+def _mark_idea_failed(session: Session, idea_id: int) -> None:
+    idea = session.get(Idea, idea_id)
+    if idea:
+        idea.status = "failed"
+        idea.updated_at = datetime.now(timezone.utc)
+        session.add(idea)
+
+
 async def run_swarm(run_id: int, passphrase: str, base_dir: Path) -> None:
-    with Session(engine) as session:
-        run = session.get(Run, run_id)
-        if not run:
+    async with async_session() as session:
+        run = await session.get(Run, run_id)
+        if not run or run.status not in (RunStatus.queued, RunStatus.running):
             return
         run_provider = run.provider
         run_model = run.model
         run_idea_count = run.idea_count
+        run_planned_ideas = planned_idea_count(run)
+        funnel = run_planned_ideas > run.idea_count
+        run_concurrency = max(1, run.concurrency or 1)
         run_topic_focus = run.topic_focus
         run_literature_query_id = run.literature_query_id
         run_use_assessment_seeds = run.use_assessment_seeds
+        run_pitch_batch_size = max(1, run.pitch_batch_size or 1)
+        run_structured = bool(run.structured_output)
+        run_chained = bool(run.chained)
+        guard = RunGuard(run_id, run.deadline_seconds, run.max_tokens)
         run.status = RunStatus.running
         run.updated_at = datetime.now(timezone.utc)
         session.add(run)
-        session.commit()
+        await session.commit()
 
+    active_runs[run_id] = guard
     try:
-        with Session(engine) as session:
-            credential = session.exec(
-                select(ProviderCredential)
-                .where(ProviderCredential.provider == run_provider)
-                .order_by(ProviderCredential.created_at.desc())
-            ).first()
-            if not credential:
-                raise RuntimeError("Missing credentials for provider")
-            api_key = decrypt_secret(passphrase, credential.api_key_encrypted, credential.salt)
+        async with async_session() as session:
+            api_key = await session.run_sync(load_api_key, run_provider, passphrase)
+        if api_key is None:
+            raise RuntimeError("Missing credentials for provider")
 
         provider = PROVIDERS[run_provider]
         mode_config = get_mode_config(MODE_IDEATION)
         assessment_text = None
         assessment_seeds: List[str] = []
         if run_literature_query_id:
-            with Session(engine) as session:
-                assessment = session.exec(
+            async with async_session() as session:
+                assessment = (await session.exec(
                     select(LiteratureAssessment)
                     .where(LiteratureAssessment.query_id == run_literature_query_id)
-                ).first()
+                )).first()
                 if assessment:
                     assessment_text = assessment.content
                     if run_use_assessment_seeds:
                         assessment_seeds = _extract_assessment_prompts(assessment_text)
 
-        for idx in range(run_idea_count):
-            idea_seed = None
-            if assessment_seeds and idx < len(assessment_seeds):
-                idea_seed = assessment_seeds[idx]
-            with Session(engine) as session:
-                idea = Idea(run_id=run_id)
-                session.add(idea)
-                session.commit()
-                session.refresh(idea)
-                idea_id = idea.id
-
-            pitch_prompt = build_prompt(
-                "pitch",
-                run_topic_focus,
-                assessment_text,
-                idea_seed,
-                mode=mode_config.prompt_set,
-            )
-            pitch_response = await provider.generate(pitch_prompt, run_model, api_key)
-            pitch_content = pitch_response.content
-            gate_status, gate_notes = _gate1_status(pitch_content)
-            if gate_status == GateStatus.failed:
-                retry_prompt = _build_gate1_retry_prompt_with_base(pitch_prompt, pitch_content)
-                retry_response = await provider.generate(retry_prompt, run_model, api_key)
-                pitch_content = retry_response.content
-                gate_status, gate_notes = _gate1_status(pitch_content)
-                if gate_status == GateStatus.failed:
-                    retry_prompt = _build_gate1_retry_prompt(pitch_content)
-                    retry_response = await provider.generate(retry_prompt, run_model, api_key)
-                    pitch_content = retry_response.content
-                    gate_status, gate_notes = _gate1_status(pitch_content)
-
-            with Session(engine) as session:
-                idea = session.get(Idea, idea_id)
-                idea.title = _parse_title(pitch_content)
-                idea.big_claim = _parse_big_claim(pitch_content)
-                idea.lane_primary = _parse_header_value(pitch_content, "LANE_PRIMARY")
-                idea.lane_secondary = _parse_header_value(pitch_content, "LANE_SECONDARY")
-                idea.breakthrough_type = _parse_header_value(pitch_content, "BREAKTHROUGH_TYPE")
-                idea.updated_at = datetime.now(timezone.utc)
-                session.add(idea)
-                session.add(DossierPart(idea_id=idea_id, kind=DossierKind.pitch, content=pitch_content))
-                session.add(GateResult(idea_id=idea_id, gate=1, status=gate_status, notes=gate_notes))
-                session.commit()
-
-            memo_content = _build_memo("Ideator Agent", "PITCH.md", pitch_content)
-            with Session(engine) as session:
-                memo = AgentMemo(
-                    run_id=run_id,
-                    idea_id=idea_id,
-                    direction="outbox",
-                    sender="Ideator Agent",
-                    topic="PITCH",
-                    content=memo_content,
-                )
-                session.add(memo)
-                session.commit()
-                _write_mail_memo(base_dir, memo)
-
-            with Session(engine) as session:
-                parts = session.exec(select(DossierPart).where(DossierPart.idea_id == idea_id)).all()
-                memos = session.exec(select(CouncilMemo).where(CouncilMemo.idea_id == idea_id)).all()
-            export_idea_markdown(base_dir, idea_id, parts, memos)
-
-            if gate_status != GateStatus.passed:
-                continue
-
-            design_prompt = build_prompt(
-                "design",
-                run_topic_focus,
-                assessment_text,
-                idea_seed,
-                mode=mode_config.prompt_set,
-            )
-            design_response = await provider.generate(design_prompt, run_model, api_key)
-            design_content = design_response.content
-
-            data_prompt = build_prompt(
-                "data",
-                run_topic_focus,
-                assessment_text,
-                idea_seed,
-                mode=mode_config.prompt_set,
-            )
-            data_response = await provider.generate(data_prompt, run_model, api_key)
-            data_content = data_response.content
-
-            positioning_prompt = build_prompt(
-                "positioning",
-                run_topic_focus,
-                assessment_text,
-                idea_seed,
-                mode=mode_config.prompt_set,
-            )
-            positioning_response = await provider.generate(positioning_prompt, run_model, api_key)
-            positioning_content = positioning_response.content
-
-            next_steps_prompt = build_prompt(
-                "next_steps",
-                run_topic_focus,
-                assessment_text,
-                idea_seed,
-                mode=mode_config.prompt_set,
-            )
-            next_steps_response = await provider.generate(next_steps_prompt, run_model, api_key)
-            next_steps_content = next_steps_response.content
-
-            council_prompt = build_prompt(
-                "council",
-                run_topic_focus,
-                assessment_text,
-                idea_seed,
-                mode=mode_config.prompt_set,
-            )
-            council_response = await provider.generate(council_prompt, run_model, api_key)
-            council_content = council_response.content
-
-            with Session(engine) as session:
-                session.add(DossierPart(idea_id=idea_id, kind=DossierKind.design, content=design_content))
-                session.add(DossierPart(idea_id=idea_id, kind=DossierKind.data_plan, content=data_content))
-                session.add(DossierPart(idea_id=idea_id, kind=DossierKind.positioning, content=positioning_content))
-                session.add(DossierPart(idea_id=idea_id, kind=DossierKind.next_steps, content=next_steps_content))
-                session.add(GateResult(idea_id=idea_id, gate=2, status=GateStatus.needs_revision))
-                session.add(GateResult(idea_id=idea_id, gate=3, status=GateStatus.needs_revision))
-                session.add(GateResult(idea_id=idea_id, gate=4, status=GateStatus.needs_revision))
-                session.commit()
-
-            for role, topic, content in [
-                ("Theory Architect", "DESIGN.md", design_content),
-                ("Data Feasibility Agent", "DATA_PLAN.md", data_content),
-                ("Measurement Agent", "POSITIONING.md", positioning_content),
-                ("PI Proxy Agent", "NEXT_STEPS.md", next_steps_content),
-            ]:
-                memo_content = _build_memo(role, topic, content)
-                with Session(engine) as session:
-                    memo = AgentMemo(
-                        run_id=run_id,
-                        idea_id=idea_id,
-                        direction="outbox",
-                        sender=role,
-                        topic=topic,
-                        content=memo_content,
-                    )
-                    session.add(memo)
-                    session.commit()
-                    _write_mail_memo(base_dir, memo)
-
-            memos = _split_council_memos(council_content)
-            with Session(engine) as session:
-                round_number = _next_council_round(session, idea_id)
-                council_round = CouncilRound(
-                    idea_id=idea_id,
-                    round_number=round_number,
-                    status="generated",
-                )
-                session.add(council_round)
-                session.commit()
-                session.refresh(council_round)
-                for idx, memo_text in enumerate(memos, start=1):
-                    referee = f"Referee {chr(64 + idx)}" if idx <= 5 else f"Referee {idx}"
-                    session.add(CouncilMemo(
-                        idea_id=idea_id,
-                        round_id=council_round.id,
-                        referee=referee,
-                        content=memo_text,
-                    ))
-                session.commit()
-
-            memo_content = _build_memo("Council Agents", "council memos", council_content)
-            with Session(engine) as session:
-                memo = AgentMemo(
-                    run_id=run_id,
-                    idea_id=idea_id,
-                    direction="outbox",
-                    sender="Council Agents",
-                    topic="Council",
-                    content=memo_content,
-                )
-                session.add(memo)
-                session.commit()
-                _write_mail_memo(base_dir, memo)
-
-            with Session(engine) as session:
-                parts = session.exec(select(DossierPart).where(DossierPart.idea_id == idea_id)).all()
-                memos = session.exec(select(CouncilMemo).where(CouncilMemo.idea_id == idea_id)).all()
-            export_idea_markdown(base_dir, idea_id, parts, memos)
+        ctx = SwarmContext(
+            run_id=run_id,
+            provider=provider,
+            model=run_model,
+            api_key=api_key,
+            topic_focus=run_topic_focus,
+            assessment_text=assessment_text,
+            prompt_set=mode_config.prompt_set,
+            base_dir=base_dir,
+            stages=build_idea_graph(mode_config.stages),
+            guard=guard,
+            structured=run_structured,
+            chained=run_chained,
+        )
 
-        with Session(engine) as session:
-            run = session.get(Run, run_id)
-            run.status = RunStatus.completed
+        # Ideas are created up front so idea order and seed assignment stay
+        # deterministic regardless of which idea finishes first. A resumed run
+        # reuses its ideas and only reruns the stages that never finished.
+        async with async_session() as session:
+            ideas = (await session.exec(select(Idea).where(Idea.run_id == run_id).order_by(Idea.id))).all()
+            missing = [Idea(run_id=run_id) for _ in range(run_planned_ideas - len(ideas))]
+            session.add_all(missing)
+            await session.commit()
+            idea_ids = [idea.id for idea in [*ideas, *missing]]
+            pending_by_idea = {idea_id: await session.run_sync(pending_stages, idea_id) for idea_id in idea_ids}
+            pending = [idea_id for idea_id in idea_ids if pending_by_idea[idea_id]]
+            for idea in ideas:
+                if idea.id in pending and idea.status == "failed":
+                    idea.status = None
+                    session.add(idea)
+            await session.commit()
+
+        seeds = {
+            idea_id: assessment_seeds[idx] if idx < len(assessment_seeds) else None
+            for idx, idea_id in enumerate(idea_ids)
+        }
+        semaphore = asyncio.Semaphore(run_concurrency)
+        # A resumed run only reruns its pending ideas, so success is judged
+        # against the ideas this pass actually ran rather than the whole run.
+        attempted: set[int] = set()
+
+        async def run_ideas() -> list:
+            if run_pitch_batch_size > 1:
+                needs_pitch = [(idea_id, seeds[idea_id]) for idea_id in pending if "pitch" in pending_by_idea[idea_id]]
+                await asyncio.gather(*[
+                    _run_pitch_batch(ctx, semaphore, needs_pitch[start:start + run_pitch_batch_size])
+                    for start in range(0, len(needs_pitch), run_pitch_batch_size)
+                ])
+            screened: list = []
+            expand = pending
+            if funnel:
+                screening = replace(ctx, stages=build_screening_graph())
+                to_screen = [idea_id for idea_id in pending if "gate1" in pending_by_idea[idea_id]]
+                attempted.update(to_screen)
+                screened = await asyncio.gather(*[
+                    _run_idea_isolated(screening, semaphore, idea_id, seeds[idea_id])
+                    for idea_id in to_screen
+                ])
+                kept = await _screen_candidates(ctx, semaphore, run_idea_count)
+                expand = [idea_id for idea_id in pending if idea_id in kept]
+            attempted.update(expand)
+            return screened + await asyncio.gather(*[
+                _run_idea_isolated(ctx, semaphore, idea_id, seeds[idea_id])
+                for idea_id in expand
+            ])
+
+        work = asyncio.ensure_future(run_ideas())
+        guard.attach(work)
+        try:
+            results = await work
+        except (asyncio.CancelledError, RunStopped):
+            # Only the guard's own stop is handled here; shutdown cancellation propagates.
+            if not guard.stopped:
+                raise
+            await asyncio.wait([work])
+            results = []
+        errors = [error for error in results if error]
+        # Call accounting rows are still queued; land them before the run reports done.
+        await write_behind.flush()
+
+        async with async_session() as session:
+            run = await session.get(Run, run_id)
+            if guard.stopped:
+                run.status, run.log = guard.stopped
+            else:
+                run.status = RunStatus.failed if errors and len(errors) == len(attempted) else RunStatus.completed
+                run.log = "\n".join(errors) if errors else None
             run.updated_at = datetime.now(timezone.utc)
             session.add(run)
-            session.commit()
+            await session.commit()
 
     except Exception as exc:
-        with Session(engine) as session:
-            run = session.get(Run, run_id)
+        async with async_session() as session:
+            run = await session.get(Run, run_id)
             if run:
                 run.status = RunStatus.failed
                 run.log = str(exc)
                 run.updated_at = datetime.now(timezone.utc)
                 session.add(run)
-                session.commit()
+                await session.commit()
+    finally:
+        guard.close()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from typing import Any, Callable
+
+from sqlmodel import Session
+
+from .db import engine
+from .settings import env_float, env_int
+
+Write = Callable[[Session], Any]
+
+
+class WriteBehind:
+    """Single writer that coalesces queued writes into batched transactions.
+
+    Each write is a callable that receives the batch's session; its return value
+    (e.g. a flushed row id) resolves the future returned by `submit`. Writes
+    commit in submission order, at most `max_delay` seconds after they arrive.
+    A failed batch is replayed write by write, so writes must touch only the
+    session; side effects such as files belong after the future resolves.
+    """
+
+    def __init__(self, max_batch: int | None = None, max_delay: float | None = None) -> None:
+        self.max_batch = max_batch or env_int("CODEX_COUNCIL_WRITE_BATCH_SIZE", 200)
+        self.max_delay = env_float("CODEX_COUNCIL_WRITE_DELAY_SECONDS", 0.05) if max_delay is None else max_delay
+        self.batches = 0
+        self.writes = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._writer: asyncio.Task | None = None
+
+    def _start(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._writer is None or self._writer.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._writer = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    def submit(self, write: Write) -> asyncio.Future:
+        queue = self._start()
+        future = self._loop.create_future()
+        # Fire-and-forget writes (partial stream flushes) may fail unobserved.
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        queue.put_nowait((write, future))
+        return future
+
+    async def flush(self) -> None:
+        # Resolves once every write submitted before it has committed.
+        await self.submit(lambda session: None)
+
+    async def stop(self) -> None:
+        # Drains the queue, then ends the writer task of the current loop.
+        writer = self._writer
+        if writer is None or writer.done() or self._loop is not asyncio.get_running_loop():
+            return
+        await self.flush()
+        writer.cancel()
+        with suppress(asyncio.CancelledError):
+            await writer
+        self._writer = None
+
+    async def _next_batch(self, queue: asyncio.Queue) -> list[tuple[Write, asyncio.Future]]:
+        batch = [await queue.get()]
+        # A plain sleep rather than wait_for(queue.get()): wait_for can swallow a
+        # cancellation that races a new item, which would keep the writer alive
+        # through loop shutdown while fire-and-forget writes are still arriving.
+        if self.max_delay > 0 and queue.qsize() < self.max_batch - 1:
+            await asyncio.sleep(self.max_delay)
+        while len(batch) < self.max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = await self._next_batch(queue)
+            results = await asyncio.to_thread(self._commit, [write for write, _ in batch])
+            for (_, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _commit(self, writes: list[Write]) -> list[tuple[bool, Any]]:
+        with Session(engine) as session:
+            try:
+                results = [(True, write(session)) for write in writes]
+                session.commit()
+                self.batches += 1
+                self.writes += len(writes)
+                return results
+            except Exception:
+                session.rollback()
+        # One bad write must not sink the others: replay each in its own transaction.
+        return [self._commit_one(write) for write in writes]
+
+    def _commit_one(self, write: Write) -> tuple[bool, Any]:
+        with Session(engine) as session:
+            try:
+                result = write(session)
+                session.commit()
+            except Exception as exc:
+                session.rollback()
+                return False, exc
+        self.batches += 1
+        self.writes += 1
+        return True, result
+
+    def snapshot(self) -> dict:
+        return {
+            "pending": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "writes": self.writes,
+        }
+
+
+write_behind = WriteBehind()
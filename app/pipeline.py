@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Mapping
+
+StageRunner = Callable[[Any, Mapping[str, Any]], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: StageRunner
+    # Upstream stages whose outputs this stage consumes; it starts as soon as all of them finish.
+    inputs: tuple[str, ...] = ()
+    # Called with the output as soon as the stage finishes, so completed work survives later failures.
+    persist: Callable[[Any, Any], None] | None = None
+    # A False verdict closes the stage: nothing downstream of it runs.
+    gate: Callable[[Any], bool] | None = None
+
+
+@dataclass
+class GraphResult:
+    outputs: dict[str, Any]
+    errors: dict[str, BaseException] = field(default_factory=dict)
+    # Stages that never started because a gate closed or an input failed.
+    skipped: list[str] = field(default_factory=list)
+
+
+class StageGraph:
+    def __init__(self, stages: Iterable[Stage]) -> None:
+        self.stages: dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+        for stage in self.stages.values():
+            unknown = [name for name in stage.inputs if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(unknown)}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> list[str]:
+        order: list[str] = []
+        visiting: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage cycle through {name}")
+            visiting.add(name)
+            for upstream in self.stages[name].inputs:
+                visit(upstream)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _closed(self, name: str, output: Any) -> bool:
+        gate = self.stages[name].gate
+        return gate is not None and not gate(output)
+
+    async def _run_stage(self, stage: Stage, ctx: Any, inputs: Mapping[str, Any]) -> Any:
+        output = await stage.run(ctx, inputs)
+        if stage.persist:
+            stage.persist(ctx, output)
+        return output
+
+    async def run(self, ctx: Any, completed: Mapping[str, Any] | None = None) -> GraphResult:
+        # `completed` holds restored outputs of checkpointed stages; they are not run again.
+        outputs = {name: output for name, output in (completed or {}).items() if name in self.stages}
+        closed = {name for name, output in outputs.items() if self._closed(name, output)}
+        waiting = [name for name in self.order if name not in outputs]
+        running: dict[asyncio.Task, str] = {}
+        errors: dict[str, BaseException] = {}
+        try:
+            while True:
+                for name in list(waiting):
+                    stage = self.stages[name]
+                    if all(upstream in outputs and upstream not in closed for upstream in stage.inputs):
+                        waiting.remove(name)
+                        inputs = {upstream: outputs[upstream] for upstream in stage.inputs}
+                        running[asyncio.create_task(self._run_stage(stage, ctx, inputs))] = name
+                if not running:
+                    break
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    name = running.pop(task)
+                    if task.exception() is not None:
+                        errors[name] = task.exception()
+                        continue
+                    outputs[name] = task.result()
+                    if self._closed(name, outputs[name]):
+                        closed.add(name)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        return GraphResult(outputs=outputs, errors=errors, skipped=waiting)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import re
+
+from .prompts import LANE_CATALOG
+
+GATE1_FIELDS = ("LANE_PRIMARY", "BREAKTHROUGH_TYPE", "WHY_THIS_IS_BREAKTHROUGH")
+HEADER_FIELDS = ("LANE_PRIMARY", "LANE_SECONDARY", *GATE1_FIELDS[1:])
+
+# Spellings models drift into, normalized to upper snake case before lookup.
+HEADER_ALIASES = {
+    "LANE_PRIMARY": "LANE_PRIMARY",
+    "PRIMARY_LANE": "LANE_PRIMARY",
+    "LANE": "LANE_PRIMARY",
+    "LANE_SECONDARY": "LANE_SECONDARY",
+    "SECONDARY_LANE": "LANE_SECONDARY",
+    "SECONDARY_LANES": "LANE_SECONDARY",
+    "BREAKTHROUGH_TYPE": "BREAKTHROUGH_TYPE",
+    "BREAKTHROUGH_TYPES": "BREAKTHROUGH_TYPE",
+    "TYPE_OF_BREAKTHROUGH": "BREAKTHROUGH_TYPE",
+    "WHY_THIS_IS_BREAKTHROUGH": "WHY_THIS_IS_BREAKTHROUGH",
+    "WHY_THIS_IS_A_BREAKTHROUGH": "WHY_THIS_IS_BREAKTHROUGH",
+    "WHY_IT_IS_A_BREAKTHROUGH": "WHY_THIS_IS_BREAKTHROUGH",
+    "WHY_BREAKTHROUGH": "WHY_THIS_IS_BREAKTHROUGH",
+}
+LANES = [match.group(1).strip() for match in re.finditer(r"^\d+\)\s*(.+)$", LANE_CATALOG, re.MULTILINE)]
+
+# "**Lane primary:** x", "- _Breakthrough type_: x", "## Why this is a breakthrough" ...
+_HEADER_LINE = re.compile(r"^[\s>#*_`-]*([A-Za-z][A-Za-z _-]{2,40}?)[\s*_`]*:[\s*_`]*(.*)$")
+_SECTION_LINE = re.compile(r"^[\s#*_`-]*([A-Za-z][A-Za-z _-]{2,40}?)[\s*_`]*:?[\s*_`]*$")
+_NEXT_LABEL = re.compile(r"^[\s*_-]*[A-Z][A-Za-z /+()-]{2,60}:")
+
+
+def _canonical(label: str) -> str | None:
+    key = re.sub(r"[\s-]+", "_", label.strip()).upper()
+    return HEADER_ALIASES.get(key)
+
+
+def _field_label(line: str) -> str | None:
+    match = _HEADER_LINE.match(line) or _SECTION_LINE.match(line)
+    return _canonical(match.group(1)) if match else None
+
+
+def _header_lines(pitch: str) -> dict[str, tuple[str, list[int]]]:
+    # Reads header fields however they were decorated; a label on its own line takes
+    # the next non-empty line as its value. Keeps the line numbers each field used.
+    found: dict[str, tuple[str, list[int]]] = {}
+    lines = pitch.splitlines()
+    for idx, line in enumerate(lines):
+        field = _field_label(line)
+        if not field or field in found:
+            continue
+        match = _HEADER_LINE.match(line)
+        value = match.group(2).strip(" *_`") if match else ""
+        used = [idx]
+        if not value:
+            following = next((pos for pos in range(idx + 1, len(lines)) if lines[pos].strip()), None)
+            if following is not None and not _field_label(lines[following]):
+                value = lines[following].strip().lstrip("-* ").strip()
+                used.append(following)
+        if value:
+            found[field] = (value, used)
+    return found
+
+
+def _header_values(pitch: str) -> dict[str, str]:
+    return {field: value for field, (value, _) in _header_lines(pitch).items()}
+
+
+def _section_text(pitch: str, heading: str) -> str:
+    match = re.search(rf"^[\s#*_-]*{heading}[^\n:]*:?[\s*_]*(.*)$", pitch, re.IGNORECASE | re.MULTILINE)
+    if not match:
+        return ""
+    lines = [match.group(1).strip()] if match.group(1).strip() else []
+    for line in pitch[match.end():].splitlines()[1:]:
+        # The section ends at a blank line, a markdown heading or the next "Label:" line.
+        if not line.strip() or line.lstrip().startswith("#") or _NEXT_LABEL.match(line):
+            break
+        lines.append(line.strip())
+    return " ".join(lines).strip()
+
+
+def _extract_from_body(pitch: str, values: dict[str, str]) -> dict[str, str]:
+    extracted: dict[str, str] = {}
+    if "LANE_PRIMARY" not in values:
+        lowered = pitch.lower()
+        mentioned = [lane for lane in LANES if lane.lower() in lowered]
+        if len(mentioned) == 1:
+            extracted["LANE_PRIMARY"] = mentioned[0]
+    if "WHY_THIS_IS_BREAKTHROUGH" not in values:
+        novelty = _section_text(pitch, "novelty statement")
+        if novelty:
+            extracted["WHY_THIS_IS_BREAKTHROUGH"] = novelty
+    return extracted
+
+
+def with_header(pitch: str, values: dict[str, str]) -> str:
+    # Puts a canonical header block first and drops the stray header lines it replaces.
+    used = {idx for field, (_, lines) in _header_lines(pitch).items() if field in values for idx in lines}
+    body = "\n".join(line for idx, line in enumerate(pitch.splitlines()) if idx not in used).strip()
+    header = "\n".join(f"{field}: {values[field]}" for field in HEADER_FIELDS if values.get(field))
+    return f"{header}\n\n{body}".strip()
+
+
+def missing_fields(values: dict[str, str]) -> list[str]:
+    return [field for field in GATE1_FIELDS if not values.get(field)]
+
+
+def repair_pitch(pitch: str) -> tuple[str, list[str]]:
+    """Fix gate-1 headers without a model call; returns the pitch and still-missing fields."""
+    values = _header_values(pitch)
+    values.update(_extract_from_body(pitch, values))
+    missing = missing_fields(values)
+    if not values:
+        return pitch, missing
+    return with_header(pitch, values), missing
+
+
+def fill_headers(pitch: str, response: str) -> tuple[str, list[str]]:
+    """Merge fields returned by a fill-only prompt into the pitch header."""
+    values = _header_values(pitch)
+    values.update({field: value for field, value in _header_values(response).items() if field in GATE1_FIELDS})
+    return with_header(pitch, values), missing_fields(values)
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+from .providers.base import CacheablePrompt, split_prompt
 from .review_personas import persona_guidance, persona_label
+from .structured import SCORE_FIELDS
 
 BASE_CONTEXT = """
 You are an IPE research idea agent. Only propose design-level plans; do not run analyses, estimate models, scrape data, or claim results.
@@ -128,7 +130,7 @@ Write a referee report for a paper. Follow this exact format:
 
 REFEREE_MEMO (350-500 words)
 - Summary (2-3 sentences)
-- Persona-focused assessment (follow persona guidance above)
+- Persona-focused assessment (follow the reviewer persona guidance)
 - Verdict: Reject / Major Revise / Revise
 - Overall score: X/10
 
@@ -149,7 +151,7 @@ Write a referee report for a research project proposal. Follow this exact format
 
 REFEREE_MEMO (350-500 words)
 - Summary (2-3 sentences)
-- Persona-focused assessment (follow persona guidance above)
+- Persona-focused assessment (follow the reviewer persona guidance)
 - Verdict: Reject / Major Revise / Revise
 - Overall score: X/10
 
@@ -201,6 +203,21 @@ PROMPT_SETS = {
 }
 
 
+def _stage_template(section: str, mode: str) -> str:
+    prompt_set = PROMPT_SETS.get(mode)
+    if not prompt_set:
+        raise ValueError(f"Unknown prompt mode: {mode}")
+    templates = {
+        "pitch": prompt_set.pitch,
+        "design": prompt_set.design,
+        "data": prompt_set.data,
+        "positioning": prompt_set.positioning,
+        "next_steps": prompt_set.next_steps,
+        "council": prompt_set.council,
+    }
+    return templates[section]
+
+
 def build_prompt(
     section: str,
     topic_focus: str | None = None,
@@ -213,22 +230,73 @@ def build_prompt(
     assessment_block = ""
     if assessment:
         assessment_block = f"Literature assessment:\n{assessment.strip()}\n"
-    prompt_set = PROMPT_SETS.get(mode)
-    if not prompt_set:
-        raise ValueError(f"Unknown prompt mode: {mode}")
-    templates = {
-        "pitch": prompt_set.pitch,
-        "design": prompt_set.design,
-        "data": prompt_set.data,
-        "positioning": prompt_set.positioning,
-        "next_steps": prompt_set.next_steps,
-        "council": prompt_set.council,
-    }
-    return "\n\n".join([
-        BASE_CONTEXT,
-        LANE_CATALOG,
-        assessment_block + seed_line + focus_line + templates[section],
-    ])
+    template = _stage_template(section, mode)
+    # The context and assessment are identical for every stage of a run, so they
+    # form the cacheable prefix; seed, focus and template vary per call.
+    prefix = "\n\n".join([BASE_CONTEXT, LANE_CATALOG, ""]) + assessment_block
+    return CacheablePrompt(prefix, seed_line + focus_line + template)
+
+
+def build_followup_prompt(section: str, mode: str = "ideation") -> str:
+    # The next turn of a chained idea conversation: the context, seed and pitch
+    # are already in the history, so only the stage instruction is sent.
+    return f"Building on the pitch above:\n{_stage_template(section, mode)}"
+
+
+# Numbered, so a reply that drops or reorders a pitch still maps to the right idea.
+PITCH_BATCH_MARKER = "=== PITCH {index} ==="
+
+
+def build_pitch_batch_prompt(
+    idea_seeds: list[str | None],
+    topic_focus: str | None = None,
+    assessment: str | None = None,
+    mode: str = "ideation",
+) -> str:
+    # Shares the single-pitch prefix, so one batched call replaces len(idea_seeds)
+    # calls that would each resend the same context.
+    prefix, suffix = split_prompt(build_prompt("pitch", topic_focus, assessment, mode=mode))
+    count = len(idea_seeds)
+    seed_lines = [f"Pitch {idx} seed: {seed}" for idx, seed in enumerate(idea_seeds, start=1) if seed]
+    return CacheablePrompt(prefix, "\n\n".join([
+        suffix,
+        f"Produce {count} distinct PITCH.md dossiers in one response, each a different idea "
+        "following the template above, header block first.",
+        *(["\n".join(seed_lines)] if seed_lines else []),
+        f"Start pitch N with a line containing only {PITCH_BATCH_MARKER.format(index='N')}, "
+        f"numbered 1 to {count} in order.",
+        "Do not add any other numbering or any text before the first marker or after the last pitch.",
+    ]))
+
+
+def build_header_fill_prompt(pitch: str, missing: list[str]) -> str:
+    # Deliberately small: no base context, and the lane catalog only when a lane is missing.
+    blocks = [
+        "The research pitch below is missing required header fields.",
+        "Return only these lines, one per field, filled in from the pitch:",
+        "\n".join(f"{field}: <value>" for field in missing),
+    ]
+    if "LANE_PRIMARY" in missing:
+        blocks.append(f"LANE_PRIMARY must name one lane from this catalog.\n{LANE_CATALOG}")
+    if "WHY_THIS_IS_BREAKTHROUGH" in missing:
+        blocks.append("WHY_THIS_IS_BREAKTHROUGH should be 2-3 sentences on a single line.")
+    blocks.extend(["Pitch:", pitch.strip()])
+    return "\n\n".join(blocks)
+
+
+SCREENING_TEMPLATE = """
+You are a screening referee. Score the research pitch below on the idea-mode fields of the
+council rubric, 1-10 each, using the full scale: 9-10 field-shaping, 7-8 strong, 5-6 promising
+but flawed, 3-4 incremental, 1-2 not viable. Judge the idea's substance, not whether the
+template headings are present. Return only these lines:
+""".strip()
+
+
+def build_screening_prompt(pitch: str) -> str:
+    # The rubric and catalog are shared by every candidate, so they form the cached prefix.
+    score_lines = "\n".join(f"{label}: <score>/10" for label in SCORE_FIELDS.values())
+    prefix = "\n\n".join([BASE_CONTEXT, LANE_CATALOG, SCREENING_TEMPLATE, score_lines, ""])
+    return CacheablePrompt(prefix, "Pitch:\n" + pitch.strip())
 
 
 def build_literature_paper_prompt(
@@ -236,15 +304,13 @@ def build_literature_paper_prompt(
     metadata: str,
     text: str,
 ) -> str:
-    return "\n\n".join([
-        BASE_CONTEXT,
-        LANE_CATALOG,
-        LITERATURE_PAPER_TEMPLATE,
+    prefix = "\n\n".join([BASE_CONTEXT, LANE_CATALOG, LITERATURE_PAPER_TEMPLATE, ""])
+    return CacheablePrompt(prefix, "\n\n".join([
         f"Title: {title}",
         f"Metadata: {metadata}",
         "Excerpt:",
         text.strip(),
-    ])
+    ]))
 
 
 def build_literature_synthesis_prompt(
@@ -252,15 +318,14 @@ def build_literature_synthesis_prompt(
     query: str,
     total_works: int,
 ) -> str:
-    return "\n\n".join([
-        BASE_CONTEXT,
-        LANE_CATALOG,
+    prefix = "\n\n".join([BASE_CONTEXT, LANE_CATALOG, ""])
+    return CacheablePrompt(prefix, "\n\n".join([
         f"Query: {query}",
         f"Total works in query: {total_works}",
         LITERATURE_SYNTHESIS_TEMPLATE,
         "Paper summaries:",
         "\n\n".join(summaries),
-    ])
+    ]))
 
 
 def build_council_prompt_with_dossier(
@@ -268,7 +333,7 @@ def build_council_prompt_with_dossier(
     topic_focus: str | None = None,
     mode: str = "ideation",
 ) -> str:
-    base = build_prompt("council", topic_focus, mode=mode)
+    base_prefix, base_suffix = split_prompt(build_prompt("council", topic_focus, mode=mode))
     ordered_keys = ["PITCH", "DESIGN", "DATA_PLAN", "POSITIONING", "NEXT_STEPS"]
     dossier_blocks = []
     for key in ordered_keys:
@@ -276,11 +341,11 @@ def build_council_prompt_with_dossier(
         if content:
             dossier_blocks.append(f"## {key}\n{content.strip()}")
     dossier_text = "\n\n".join(dossier_blocks) if dossier_blocks else "No dossier content available."
-    return "\n\n".join([
-        base,
+    return CacheablePrompt(base_prefix, "\n\n".join([
+        base_suffix,
         "Review the dossier below. Ground critiques in the specific design and claims provided.",
         dossier_text,
-    ])
+    ]))
 
 
 def build_review_prompt(
@@ -316,13 +381,15 @@ def build_review_prompt(
             f"- {section['section_id']} {section['title']} (p{section['page_start']}-{section['page_end']}): {section['excerpt']}"
         )
     language_line = "Output in Portuguese." if language == "pt" else "Output in English."
-    prompt_blocks = [
-        persona_line,
-        persona_notes,
+    # Everything shared by the reviewers of one paper comes first so it can be
+    # served from the provider prefix cache; the persona framing comes last.
+    shared_blocks = [
+        REVIEW_CONTEXT,
+        template,
         language_line,
         "\n".join(header_lines),
         "\n".join(section_lines),
-        REVIEW_CONTEXT,
-        template,
     ]
-    return "\n\n".join([block for block in prompt_blocks if block])
+    persona_blocks = [persona_line, persona_notes]
+    prefix = "\n\n".join(shared_blocks + [""])
+    return CacheablePrompt(prefix, "\n\n".join([block for block in persona_blocks if block]))
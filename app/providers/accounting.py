@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy import case, func
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..models import LlmCall
+from ..persistence import write_behind
+from .base import LLMProvider, ProviderResponse, iter_completion
+
+SCOPE_FIELDS = ("stage", "run_id", "idea_id", "review_id")
+GROUP_FIELDS = ("provider", "model", *SCOPE_FIELDS)
+
+
+@dataclass
+class CallUsage:
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    cached_tokens: int | None = None
+    retries: int = 0
+    cache_hit: bool = False
+
+    def update(
+        self,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
+        cached_tokens: int | None = None,
+    ) -> None:
+        if prompt_tokens is not None:
+            self.prompt_tokens = prompt_tokens
+        if completion_tokens is not None:
+            self.completion_tokens = completion_tokens
+        if cached_tokens is not None:
+            self.cached_tokens = cached_tokens
+
+
+# Call attribution (stage, run, idea, review) set by the pipeline, and the usage
+# of the call currently in flight, filled in by providers and wrappers below it.
+_scope: ContextVar[dict] = ContextVar("llm_call_scope", default={})
+_current: ContextVar[CallUsage | None] = ContextVar("llm_call_usage", default=None)
+
+
+@contextmanager
+def llm_scope(**fields) -> Iterator[None]:
+    token = _scope.set({**_scope.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_scope() -> dict:
+    return _scope.get()
+
+
+def current_usage() -> CallUsage | None:
+    return _current.get()
+
+
+def report_usage(
+    prompt_tokens: int | None = None,
+    completion_tokens: int | None = None,
+    cached_tokens: int | None = None,
+) -> None:
+    usage = _current.get()
+    if usage is not None:
+        usage.update(prompt_tokens, completion_tokens, cached_tokens)
+
+
+def note_retry() -> None:
+    usage = _current.get()
+    if usage is not None:
+        usage.retries += 1
+
+
+def note_cache_hit() -> None:
+    usage = _current.get()
+    if usage is not None:
+        usage.cache_hit = True
+
+
+def record_call(
+    provider: str,
+    model: str,
+    usage: CallUsage,
+    latency: float,
+    streamed: bool,
+    error: BaseException | None = None,
+) -> None:
+    scope = _scope.get()
+    row = LlmCall(
+        provider=provider,
+        model=model,
+        stage=scope.get("stage"),
+        run_id=scope.get("run_id"),
+        idea_id=scope.get("idea_id"),
+        review_id=scope.get("review_id"),
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        cached_tokens=usage.cached_tokens,
+        latency_ms=int(latency * 1000),
+        retries=usage.retries,
+        streamed=streamed,
+        cache_hit=usage.cache_hit,
+        status="ok" if error is None else "error",
+        error=str(error)[:500] if error is not None else None,
+    )
+    # Queued on the write-behind writer so call rows share the run's batched
+    # commits; the returned future swallows failures, since accounting must never
+    # fail the call it describes.
+    write_behind.submit(lambda session: session.add(row))
+
+
+def usage_summary(group_by: list[str], filters: dict | None = None) -> list[dict]:
+    columns = [getattr(LlmCall, field) for field in group_by]
+    query = select(
+        *columns,
+        func.count(LlmCall.id),
+        func.coalesce(func.sum(LlmCall.prompt_tokens), 0),
+        func.coalesce(func.sum(LlmCall.completion_tokens), 0),
+        func.coalesce(func.sum(LlmCall.cached_tokens), 0),
+        func.coalesce(func.sum(LlmCall.latency_ms), 0),
+        func.coalesce(func.max(LlmCall.latency_ms), 0),
+        func.coalesce(func.sum(LlmCall.retries), 0),
+        func.sum(case((LlmCall.status == "error", 1), else_=0)),
+        func.sum(case((LlmCall.cache_hit, 1), else_=0)),
+    )
+    for field, value in (filters or {}).items():
+        if value is not None:
+            query = query.where(getattr(LlmCall, field) == value)
+    if columns:
+        query = query.group_by(*columns)
+    with Session(engine) as session:
+        rows = session.exec(query).all()
+    summary = []
+    for row in rows:
+        keys = dict(zip(group_by, row[: len(group_by)]))
+        calls, prompt, completion, cached, latency, max_latency, retries, errors, hits = row[len(group_by):]
+        if not calls:
+            continue
+        summary.append({
+            **keys,
+            "calls": calls,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cached_tokens": cached,
+            "total_tokens": prompt + completion,
+            "latency_ms_total": latency,
+            "latency_ms_avg": round(latency / calls, 1),
+            "latency_ms_max": max_latency,
+            "retries": retries,
+            "errors": errors or 0,
+            "cache_hits": hits or 0,
+        })
+    summary.sort(key=lambda item: (item["total_tokens"], item["latency_ms_total"]), reverse=True)
+    return summary
+
+
+def tokens_spent(run_id: int) -> int:
+    # Cache hits cost nothing, so they do not count against a run's token budget.
+    query = select(
+        func.coalesce(func.sum(LlmCall.prompt_tokens), 0) + func.coalesce(func.sum(LlmCall.completion_tokens), 0)
+    ).where(LlmCall.run_id == run_id, LlmCall.cache_hit == False)  # noqa: E712
+    with Session(engine) as session:
+        return session.exec(query).one()
+
+
+class AccountedProvider:
+    def __init__(self, name: str, inner: LLMProvider) -> None:
+        self.name = name
+        self.inner = inner
+
+    def generation_params(self, model: str) -> dict:
+        params = getattr(self.inner, "generation_params", None)
+        return params(model) if params else {}
+
+    async def generate(self, prompt: str, model: str, api_key: str, **options) -> ProviderResponse:
+        usage = CallUsage()
+        token = _current.set(usage)
+        started = time.monotonic()
+        try:
+            response = await self.inner.generate(prompt, model, api_key, **options)
+        except Exception as exc:
+            record_call(self.name, model, usage, time.monotonic() - started, False, exc)
+            raise
+        finally:
+            _current.reset(token)
+        usage.update(response.prompt_tokens, response.completion_tokens, response.cached_tokens)
+        record_call(self.name, model, usage, time.monotonic() - started, False)
+        return response
+
+    async def stream(self, prompt: str, model: str, api_key: str, **options) -> AsyncIterator[str]:
+        usage = CallUsage()
+        token = _current.set(usage)
+        started = time.monotonic()
+        if options:
+            chunks = self.inner.stream(prompt, model, api_key, **options)
+        else:
+            chunks = iter_completion(self.inner, prompt, model, api_key)
+        error: BaseException | None = None
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except BaseException as exc:
+            # A consumer closing the stream early is not a provider failure.
+            error = None if isinstance(exc, GeneratorExit) else exc
+            raise
+        finally:
+            record_call(self.name, model, usage, time.monotonic() - started, True, error)
+            try:
+                _current.reset(token)
+            except ValueError:
+                # Generator finalized outside the context it started in.
+                pass
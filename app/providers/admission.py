@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from ..settings import env_float, env_int
+from .accounting import current_scope
+from .base import LLMProvider, ProviderResponse, iter_completion
+
+# Lower index wins. Callers pick a class with llm_scope(priority=...); unscoped calls are "standard".
+PRIORITIES = ("interactive", "standard", "bulk")
+DEFAULT_PRIORITY = "standard"
+
+
+def priority_rank(priority: str | None) -> int:
+    try:
+        return PRIORITIES.index(priority or DEFAULT_PRIORITY)
+    except ValueError:
+        return PRIORITIES.index(DEFAULT_PRIORITY)
+
+
+def default_aging_seconds() -> float:
+    return env_float("CODEX_COUNCIL_ADMISSION_AGING_SECONDS", 30.0)
+
+
+def aged_rank(rank: int, enqueued: float, now: float, aging_seconds: float) -> int:
+    # A waiter is promoted one class per aging period so bulk work never starves.
+    return max(0, rank - int((now - enqueued) // aging_seconds))
+
+
+@dataclass
+class _Waiter:
+    rank: int
+    seq: int
+    enqueued: float
+    future: asyncio.Future = field(repr=False)
+
+
+class AdmissionController:
+    # A global cap on provider calls in flight, shared by every workload. Waiters sit in
+    # per-provider queues; a freed slot goes to the best priority class across all of them,
+    # oldest first. A waiter is promoted one class per aging period so bulk work never starves.
+    def __init__(self, limit: int | None = None, aging_seconds: float | None = None) -> None:
+        self.limit = limit or max(1, env_int("CODEX_COUNCIL_MAX_IN_FLIGHT", 16))
+        self.aging_seconds = aging_seconds or default_aging_seconds()
+        self.in_flight = 0
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.max_wait = 0.0
+        self._queues: dict[str, list[_Waiter]] = {}
+        self._seq = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.in_flight = 0
+            self._queues = {}
+
+    def _effective_rank(self, waiter: _Waiter, now: float) -> int:
+        return aged_rank(waiter.rank, waiter.enqueued, now, self.aging_seconds)
+
+    def _admit(self, rank: int, enqueued: float | None = None) -> None:
+        self.in_flight += 1
+        self.admitted[PRIORITIES[rank]] += 1
+        if enqueued is not None:
+            self.max_wait = max(self.max_wait, time.monotonic() - enqueued)
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self.in_flight < self.limit:
+            # Queues stay short (bounded by concurrent callers), and aging changes the
+            # order over time, so a linear scan is simpler than keeping heaps in sync.
+            waiters = [waiter for queue in self._queues.values() for waiter in queue]
+            if not waiters:
+                return
+            best = min(waiters, key=lambda waiter: (self._effective_rank(waiter, now), waiter.seq))
+            self._remove(best)
+            if best.future.done():
+                # Cancelled while queued; its caller is about to unwind.
+                continue
+            self._admit(best.rank, best.enqueued)
+            best.future.set_result(None)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        for provider, queue in list(self._queues.items()):
+            if waiter in queue:
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[provider]
+                return
+
+    async def acquire(self, provider: str, priority: str | None = None) -> None:
+        self._bind_loop()
+        rank = priority_rank(priority)
+        if self.in_flight < self.limit and not self._queues:
+            self._admit(rank)
+            return
+        waiter = _Waiter(rank, next(self._seq), time.monotonic(), self._loop.create_future())
+        self._queues.setdefault(provider, []).append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted just as the caller went away; hand it on.
+                self.release()
+            else:
+                self._remove(waiter)
+            raise
+
+    def release(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        self._dispatch()
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        providers = []
+        for provider, queue in sorted(self._queues.items()):
+            providers.append({
+                "provider": provider,
+                "queued": len(queue),
+                "by_priority": {
+                    priority: sum(1 for waiter in queue if waiter.rank == rank)
+                    for rank, priority in enumerate(PRIORITIES)
+                },
+                "oldest_wait_seconds": round(max(now - waiter.enqueued for waiter in queue), 2),
+            })
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": sum(item["queued"] for item in providers),
+            "providers": providers,
+            "admitted": dict(self.admitted),
+            "max_wait_seconds": round(self.max_wait, 2),
+        }
+
+
+class AdmittedProvider:
+    # Sits below the per-provider rate limiter, so a call takes a global slot only once its
+    # provider has granted it: pacing waits and 429 cooldowns on one provider hold no slot
+    # the others could use. Retry backoff, above both, holds none either.
+    def __init__(self, name: str, inner: LLMProvider, controller: AdmissionController) -> None:
+        self.name = name
+        self.inner = inner
+        self.controller = controller
+
+    def generation_params(self, model: str) -> dict:
+        params = getattr(self.inner, "generation_params", None)
+        return params(model) if params else {}
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        await self.controller.acquire(self.name, current_scope().get("priority"))
+        try:
+            return await self.inner.generate(prompt, model, api_key)
+        finally:
+            self.controller.release()
+
+    async def stream(self, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+        await self.controller.acquire(self.name, current_scope().get("priority"))
+        try:
+            async for chunk in iter_completion(self.inner, prompt, model, api_key):
+                yield chunk
+        finally:
+            self.controller.release()
+
+
+admission = AdmissionController()
@@ -1,26 +1,128 @@
-import httpx
+import json
+from typing import AsyncIterator
 
-from .base import ProviderResponse
+from .accounting import report_usage
+from .base import (
+    ProviderError,
+    ProviderResponse,
+    chat_turns,
+    iter_sse_data,
+    raise_for_provider_status,
+    raise_for_stream_status,
+    response_schema,
+    split_prompt,
+)
+from .clients import provider_clients
+from .resilience import timeout_for
+
+MESSAGES_URL = "https://api.anthropic.com/v1/messages"
+STREAM_ERROR_STATUS = {"rate_limit_error": 429, "overloaded_error": 529, "api_error": 500}
 
 
 class AnthropicProvider:
-    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
-        headers = {
+    def generation_params(self, model: str) -> dict:
+        return {"max_tokens": 1024, "temperature": 0.7}
+
+    def _usage(self, usage: dict | None) -> dict:
+        if not usage:
+            return {}
+        # input_tokens excludes prompt-cache reads and writes, so add them back.
+        cache_read = usage.get("cache_read_input_tokens")
+        prompt_tokens = usage.get("input_tokens")
+        if prompt_tokens is not None:
+            prompt_tokens += (cache_read or 0) + (usage.get("cache_creation_input_tokens") or 0)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": usage.get("output_tokens"),
+            "cached_tokens": cache_read,
+        }
+
+    def _headers(self, api_key: str) -> dict:
+        return {
             "x-api-key": api_key,
             "anthropic-version": "2023-06-01",
             "content-type": "application/json",
         }
+
+    def _content(self, prompt: str) -> str | list:
+        prefix, suffix = split_prompt(prompt)
+        if not prefix:
+            return prompt
+        # Mark the shared prefix as an ephemeral cache breakpoint.
+        return [
+            {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": suffix or "."},
+        ]
+
+    def _messages(self, prompt: str) -> list[dict]:
+        turns = chat_turns(prompt)
+        if not turns:
+            return [{"role": "user", "content": self._content(prompt)}]
+        # A chained prompt resends its history, with the first turn's prefix still
+        # marked for caching, followed by the new instruction.
+        messages = [{"role": "user", "content": self._content(turns[0][1])}]
+        messages += [{"role": role, "content": text} for role, text in turns[1:]]
+        return messages
+
+    def _payload(self, prompt: str, model: str) -> dict:
         payload = {
             "model": model,
-            "max_tokens": 1024,
-            "messages": [
-                {"role": "user", "content": prompt},
-            ],
-            "temperature": 0.7,
+            "messages": self._messages(prompt),
+            **self.generation_params(model),
         }
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post("https://api.anthropic.com/v1/messages", json=payload, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-        content = "".join(block["text"] for block in data["content"])
-        return ProviderResponse(content=content)
+        structured = response_schema(prompt)
+        if structured:
+            # Anthropic has no JSON response format; forcing a single tool call whose
+            # input schema is the response schema gives the same guarantee.
+            payload["tools"] = [{
+                "name": structured["name"],
+                "description": "Return the requested result.",
+                "input_schema": structured["schema"],
+            }]
+            payload["tool_choice"] = {"type": "tool", "name": structured["name"]}
+        return payload
+
+    def _block_text(self, block: dict) -> str:
+        if block.get("type") == "tool_use":
+            return json.dumps(block.get("input") or {})
+        return block.get("text", "")
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        client = provider_clients.get("anthropic")
+        response = await client.post(
+            MESSAGES_URL,
+            json=self._payload(prompt, model),
+            headers=self._headers(api_key),
+            timeout=timeout_for("anthropic", model),
+        )
+        raise_for_provider_status(response, "Anthropic")
+        data = response.json()
+        content = "".join(self._block_text(block) for block in data["content"])
+        return ProviderResponse(content=content, **self._usage(data.get("usage")))
+
+    async def stream(self, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+        client = provider_clients.get("anthropic")
+        payload = {**self._payload(prompt, model), "stream": True}
+        async with client.stream(
+            "POST",
+            MESSAGES_URL,
+            json=payload,
+            headers=self._headers(api_key),
+            timeout=timeout_for("anthropic", model),
+        ) as response:
+            await raise_for_stream_status(response, "Anthropic")
+            async for data in iter_sse_data(response):
+                event = json.loads(data)
+                if event.get("type") == "error":
+                    error = event.get("error") or {}
+                    status = STREAM_ERROR_STATUS.get(error.get("type"))
+                    raise ProviderError(f"Anthropic error: {error.get('message', data)}", status_code=status)
+                if event.get("type") == "message_start":
+                    report_usage(**self._usage((event.get("message") or {}).get("usage")))
+                if event.get("type") == "message_delta":
+                    report_usage(**self._usage(event.get("usage")))
+                if event.get("type") == "content_block_delta":
+                    delta = event.get("delta") or {}
+                    text = delta.get("text") or delta.get("partial_json")
+                    if text:
+                        yield text
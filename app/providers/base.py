@@ -1,12 +1,174 @@
 from dataclasses import dataclass
-from typing import Protocol
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Protocol
+
+import httpx
 
 
 @dataclass
 class ProviderResponse:
     content: str
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    cached_tokens: int | None = None
+    # Provider-side id of this reply (OpenAI Responses), used to chain follow-up turns.
+    response_id: str | None = None
+
+
+class CacheablePrompt(str):
+    # Prompt text whose leading `prefix` is shared across many calls (base context,
+    # lane catalog, assessment). It is still a plain string for every caller, but
+    # providers can send the prefix through their native prompt-caching path.
+    def __new__(cls, prefix: str, suffix: str) -> "CacheablePrompt":
+        prompt = super().__new__(cls, prefix + suffix)
+        prompt.prefix = prefix
+        return prompt
+
+
+def split_prompt(prompt: str) -> tuple[str, str]:
+    prefix = getattr(prompt, "prefix", "")
+    text = str(prompt)
+    return prefix, text[len(prefix):]
+
+
+def _derive(prompt: str, prefix: str, suffix: str) -> CacheablePrompt:
+    # Keeps any other attributes (schema, conversation) of the prompt it derives from.
+    derived = CacheablePrompt(prefix, suffix)
+    extras = getattr(prompt, "__dict__", {})
+    derived.__dict__.update({key: value for key, value in extras.items() if key != "prefix"})
+    return derived
+
+
+def with_response_schema(prompt: str, name: str, schema: dict) -> CacheablePrompt:
+    # Like the cache prefix, the schema rides on the prompt so every wrapper in the
+    # provider chain passes it through untouched; providers map it to their native
+    # structured-output option.
+    prefix, suffix = split_prompt(prompt)
+    structured = _derive(prompt, prefix, suffix)
+    structured.response_schema = {"name": name, "schema": schema}
+    return structured
+
+
+def response_schema(prompt: str) -> dict | None:
+    return getattr(prompt, "response_schema", None)
+
+
+def extend_prompt(prompt: str, text: str) -> CacheablePrompt:
+    prefix, suffix = split_prompt(prompt)
+    extended = _derive(prompt, prefix, f"{suffix}\n\n{text}")
+    if getattr(prompt, "message", None) is not None:
+        extended.message = f"{prompt.message}\n\n{text}"
+    return extended
+
+
+@dataclass(frozen=True)
+class Conversation:
+    # Earlier (user, assistant) turns, oldest first. The first user turn keeps its
+    # cacheable prefix; previous_response_id lets OpenAI continue server-side.
+    turns: tuple[tuple[str, str], ...]
+    previous_response_id: str | None = None
+
+
+def chained_prompt(history: Conversation, message: str) -> CacheablePrompt:
+    # The text is a standalone transcript, so providers without chaining support
+    # (and the response cache) still see the whole exchange; chaining providers
+    # send `history` natively plus only `message`.
+    first_prompt = history.turns[0][0]
+    prefix, _ = split_prompt(first_prompt)
+    transcript = []
+    for user, assistant in history.turns:
+        transcript += [str(user)[len(prefix):] if not transcript else str(user), assistant]
+    chained = _derive(message, prefix, "\n\n".join([*transcript, message]))
+    chained.conversation = history
+    chained.message = str(message)
+    return chained
+
+
+def conversation(prompt: str) -> tuple[Conversation, str] | None:
+    history = getattr(prompt, "conversation", None)
+    return (history, prompt.message) if history else None
+
+
+def chat_turns(prompt: str) -> list[tuple[str, str]] | None:
+    # (role, text) pairs for providers that take the history as a message list.
+    chained = conversation(prompt)
+    if not chained:
+        return None
+    history, message = chained
+    turns = []
+    for user, assistant in history.turns:
+        turns += [("user", user), ("assistant", assistant)]
+    return [*turns, ("user", message)]
+
+
+class ProviderError(RuntimeError):
+    def __init__(self, message: str, status_code: int | None = None, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
 
 
 class LLMProvider(Protocol):
     async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
         ...
+
+    def stream(self, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+        ...
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def raise_for_provider_status(response: httpx.Response, label: str) -> None:
+    if response.status_code < 400:
+        return
+    raise ProviderError(
+        f"{label} error {response.status_code}: {response.text}",
+        status_code=response.status_code,
+        retry_after=parse_retry_after(response.headers.get("retry-after")),
+    )
+
+
+async def raise_for_stream_status(response: httpx.Response, label: str) -> None:
+    if response.status_code < 400:
+        return
+    await response.aread()
+    raise_for_provider_status(response, label)
+
+
+async def iter_sse_data(response: httpx.Response) -> AsyncIterator[str]:
+    data_lines: list[str] = []
+    async for line in response.aiter_lines():
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
+async def iter_completion(provider: LLMProvider, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+    stream = getattr(provider, "stream", None)
+    if stream is None:
+        response = await provider.generate(prompt, model, api_key)
+        yield response.content
+        return
+    async for chunk in stream(prompt, model, api_key):
+        yield chunk
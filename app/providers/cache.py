@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..models import LlmResponseCache
+from ..persistence import write_behind
+from ..settings import env_flag, env_float, env_int
+from .accounting import current_scope, note_cache_hit
+from .base import LLMProvider, ProviderResponse, iter_completion
+
+
+def cache_key(provider: str, model: str, prompt: str, params: dict | None = None) -> str:
+    payload = json.dumps(
+        {"provider": provider, "model": model, "prompt": prompt, "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        enabled: bool | None = None,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        max_age_seconds: int | None = None,
+    ) -> None:
+        self.enabled = env_flag("CODEX_COUNCIL_LLM_CACHE", False) if enabled is None else enabled
+        self.max_entries = max_entries or env_int("CODEX_COUNCIL_LLM_CACHE_MAX_ENTRIES", 2000)
+        self.max_bytes = max_bytes or env_int("CODEX_COUNCIL_LLM_CACHE_MAX_BYTES", 50 * 1024 * 1024)
+        self.max_age = timedelta(
+            seconds=max_age_seconds or env_int("CODEX_COUNCIL_LLM_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600)
+        )
+        # Puts only run the eviction sweep once the running totals pass a limit,
+        # or every evict_seconds so entries written by other processes and aged
+        # entries nobody reads again are still collected.
+        self.evict_seconds = env_float("CODEX_COUNCIL_LLM_CACHE_EVICT_SECONDS", 300.0)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: int | None = None
+        self._bytes = 0
+        self._next_evict = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        now = datetime.now(timezone.utc)
+        with Session(engine) as session:
+            entry = session.exec(
+                select(LlmResponseCache).where(LlmResponseCache.cache_key == key)
+            ).first()
+            if entry and now - _as_utc(entry.created_at) > self.max_age:
+                session.delete(entry)
+                session.commit()
+                self.evictions += 1
+                self._count(-1, -entry.size_bytes)
+                entry = None
+            if not entry:
+                self.misses += 1
+                return None
+            entry.hit_count += 1
+            entry.last_used_at = now
+            session.add(entry)
+            session.commit()
+            self.hits += 1
+            return entry.content
+
+    def put(self, key: str, provider: str, model: str, content: str) -> None:
+        with Session(engine) as session:
+            self.store(session, key, provider, model, content)
+            session.commit()
+
+    def store(self, session: Session, key: str, provider: str, model: str, content: str) -> None:
+        # A write for the caller's transaction (CachedProvider queues it on the
+        # write-behind writer). The running totals are estimates: a replayed batch
+        # may count an entry twice, which only brings the next sweep forward.
+        now = datetime.now(timezone.utc)
+        entry = session.exec(
+            select(LlmResponseCache).where(LlmResponseCache.cache_key == key)
+        ).first()
+        added = 0 if entry else 1
+        previous_bytes = entry.size_bytes if entry else 0
+        if not entry:
+            entry = LlmResponseCache(cache_key=key, provider=provider, model=model, content=content)
+        entry.content = content
+        entry.size_bytes = len(content.encode("utf-8"))
+        entry.created_at = now
+        entry.last_used_at = now
+        session.add(entry)
+        session.flush()
+        if self._entries is None:
+            self._load_totals(session)
+        else:
+            self._count(added, entry.size_bytes - previous_bytes)
+        if self._should_evict():
+            self._evict(session, now)
+
+    def _count(self, entries: int, size: int) -> None:
+        with self._lock:
+            if self._entries is not None:
+                self._entries += entries
+                self._bytes += size
+
+    def _load_totals(self, session: Session) -> tuple[int, int]:
+        count, total_bytes = session.exec(
+            select(func.count(LlmResponseCache.id), func.coalesce(func.sum(LlmResponseCache.size_bytes), 0))
+        ).one()
+        with self._lock:
+            self._entries, self._bytes = count, total_bytes
+        return count, total_bytes
+
+    def _should_evict(self) -> bool:
+        with self._lock:
+            over = self._entries > self.max_entries or self._bytes > self.max_bytes
+            if not over and time.monotonic() < self._next_evict:
+                return False
+            self._next_evict = time.monotonic() + self.evict_seconds
+            return True
+
+    def _evict(self, session: Session, now: datetime) -> None:
+        expired = session.exec(
+            select(LlmResponseCache).where(LlmResponseCache.created_at < now - self.max_age)
+        ).all()
+        for entry in expired:
+            session.delete(entry)
+        self.evictions += len(expired)
+        session.flush()
+
+        count, total_bytes = self._load_totals(session)
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        # Least recently used entries go first until both limits are met.
+        candidates = session.exec(
+            select(LlmResponseCache).order_by(LlmResponseCache.last_used_at)
+        ).all()
+        for entry in candidates:
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            count -= 1
+            total_bytes -= entry.size_bytes
+            session.delete(entry)
+            self.evictions += 1
+        session.flush()
+        self._load_totals(session)
+
+    def clear(self) -> int:
+        with Session(engine) as session:
+            removed = session.exec(select(func.count(LlmResponseCache.id))).one()
+            session.exec(LlmResponseCache.__table__.delete())
+            session.commit()
+        with self._lock:
+            self._entries, self._bytes = 0, 0
+        return removed
+
+    def stats(self) -> dict:
+        with Session(engine) as session:
+            count, total_bytes = session.exec(
+                select(func.count(LlmResponseCache.id), func.coalesce(func.sum(LlmResponseCache.size_bytes), 0))
+            ).one()
+        return {
+            "enabled": self.enabled,
+            "entries": count,
+            "bytes": total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": int(self.max_age.total_seconds()),
+        }
+
+
+class CachedProvider:
+    # Callers whose prompts repeat while the wanted answers must differ (each idea
+    # of a run drafts from the same pitch prompt) opt out with llm_scope(cache=False).
+    def __init__(self, name: str, inner: LLMProvider, cache: ResponseCache) -> None:
+        self.name = name
+        self.inner = inner
+        self.cache = cache
+
+    def generation_params(self, model: str) -> dict:
+        params = getattr(self.inner, "generation_params", None)
+        return params(model) if params else {}
+
+    def _store(self, key: str, model: str, content: str) -> None:
+        # Queued behind the response, so the entry commits with the run's other writes.
+        write_behind.submit(lambda session: self.cache.store(session, key, self.name, model, content))
+
+    async def generate(
+        self,
+        prompt: str,
+        model: str,
+        api_key: str,
+        *,
+        use_cache: bool = True,
+    ) -> ProviderResponse:
+        if not (self.cache.enabled and use_cache and current_scope().get("cache", True)):
+            return await self.inner.generate(prompt, model, api_key)
+        key = cache_key(self.name, model, prompt, self.generation_params(model))
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            note_cache_hit()
+            return ProviderResponse(content=cached)
+        response = await self.inner.generate(prompt, model, api_key)
+        self._store(key, model, response.content)
+        return response
+
+    async def stream(
+        self,
+        prompt: str,
+        model: str,
+        api_key: str,
+        *,
+        use_cache: bool = True,
+    ) -> AsyncIterator[str]:
+        if not (self.cache.enabled and use_cache and current_scope().get("cache", True)):
+            async for chunk in iter_completion(self.inner, prompt, model, api_key):
+                yield chunk
+            return
+        key = cache_key(self.name, model, prompt, self.generation_params(model))
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            note_cache_hit()
+            yield cached
+            return
+        chunks: list[str] = []
+        async for chunk in iter_completion(self.inner, prompt, model, api_key):
+            chunks.append(chunk)
+            yield chunk
+        self._store(key, model, "".join(chunks))
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+from typing import Iterable
+
+import httpx
+
+from ..settings import env_flag, env_float, env_int
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class ProviderClientRegistry:
+    # One pooled client per provider; clients are rebuilt if used from another event
+    # loop. A client's connections belong to the loop that opened them, so that loop
+    # also closes it: when the client is replaced, or when the loop shuts down.
+    def __init__(
+        self,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: float | None = None,
+        http2: bool | None = None,
+    ) -> None:
+        self.limits = httpx.Limits(
+            max_connections=max_connections or env_int("CODEX_COUNCIL_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=(
+                max_keepalive_connections or env_int("CODEX_COUNCIL_HTTP_MAX_KEEPALIVE", 10)
+            ),
+            keepalive_expiry=(
+                keepalive_expiry
+                if keepalive_expiry is not None
+                else env_float("CODEX_COUNCIL_HTTP_KEEPALIVE_EXPIRY", 60.0)
+            ),
+        )
+        wants_http2 = env_flag("CODEX_COUNCIL_HTTP2", True) if http2 is None else http2
+        self.http2 = wants_http2 and _http2_available()
+        self._clients: dict[str, tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+        self._watchers: dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(limits=self.limits, http2=self.http2, timeout=60.0)
+
+    def get(self, provider: str) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(provider)
+        if entry:
+            client, client_loop = entry
+            if not client.is_closed and client_loop is loop:
+                return client
+            self._retire(client, client_loop)
+        client = self._build_client()
+        self._clients[provider] = (client, loop)
+        if loop not in self._watchers:
+            self._watchers[loop] = loop.create_task(self._close_at_shutdown(loop))
+        return client
+
+    def _retire(self, client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+        if client.is_closed or loop.is_closed():
+            # A closed loop already closed its clients on shutdown, unless it was
+            # closed without cancelling its tasks; then nothing can close it cleanly.
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def _close_at_shutdown(self, loop: asyncio.AbstractEventLoop) -> None:
+        # asyncio.run cancels leftover tasks before closing the loop: the last point
+        # where this loop's clients can still be closed on it.
+        try:
+            await loop.create_future()
+        finally:
+            self._watchers.pop(loop, None)
+            for provider, entry in list(self._clients.items()):
+                client, client_loop = entry
+                if client_loop is not loop:
+                    continue
+                if self._clients.get(provider) is entry:
+                    del self._clients[provider]
+                await client.aclose()
+
+    def open(self, providers: Iterable[str]) -> None:
+        for provider in providers:
+            self.get(provider)
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        loop = asyncio.get_running_loop()
+        for client, client_loop in clients:
+            if client_loop is loop:
+                await client.aclose()
+            else:
+                self._retire(client, client_loop)
+
+
+provider_clients = ProviderClientRegistry()
@@ -1,11 +1,45 @@
+import asyncio
+import hashlib
+import json
 import re
+import time
+from typing import AsyncIterator
 
 import httpx
 
-from .base import ProviderResponse
+from ..settings import env_int
+from .accounting import report_usage
+from .base import (
+    ProviderResponse,
+    chat_turns,
+    iter_sse_data,
+    raise_for_provider_status,
+    raise_for_stream_status,
+    response_schema,
+    split_prompt,
+)
+from .clients import provider_clients
+from .resilience import timeout_for
+
+MODELS_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+CACHED_CONTENTS_URL = "https://generativelanguage.googleapis.com/v1beta/cachedContents"
+
+
+def _gemini_schema(schema: dict) -> dict:
+    # Gemini accepts an OpenAPI subset of JSON Schema without additionalProperties.
+    if isinstance(schema, dict):
+        return {key: _gemini_schema(value) for key, value in schema.items() if key != "additionalProperties"}
+    if isinstance(schema, list):
+        return [_gemini_schema(item) for item in schema]
+    return schema
 
 
 class GeminiProvider:
+    def __init__(self) -> None:
+        # prefix key -> (cachedContents name or None when caching was refused, local expiry)
+        self._prefix_caches: dict[str, tuple[str | None, float]] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+
     def _normalize_model(self, model: str) -> str:
         raw = (model or "").strip()
         if not raw:
@@ -27,22 +61,135 @@ class GeminiProvider:
         }
         return aliases.get(cleaned, cleaned)
 
+    def generation_params(self, model: str) -> dict:
+        return {"temperature": 0.7}
+
+    async def _create_cached_content(
+        self,
+        client: httpx.AsyncClient,
+        model: str,
+        prefix: str,
+        api_key: str,
+        key: str,
+    ) -> str | None:
+        ttl = env_int("CODEX_COUNCIL_GEMINI_CACHE_TTL_SECONDS", 3600)
+        response = await client.post(
+            CACHED_CONTENTS_URL,
+            params={"key": api_key},
+            json={
+                "model": f"models/{model}",
+                "contents": [{"role": "user", "parts": [{"text": prefix}]}],
+                "ttl": f"{ttl}s",
+            },
+            timeout=timeout_for("gemini", model),
+        )
+        now = time.monotonic()
+        if response.status_code >= 400:
+            # Prefix below the model's caching minimum or caching unsupported: send inline.
+            self._prefix_caches[key] = (None, now + ttl)
+            return None
+        name = response.json().get("name")
+        self._prefix_caches[key] = (name, now + ttl * 0.9)
+        return name
+
+    async def _cached_content(self, client: httpx.AsyncClient, model: str, prefix: str, api_key: str) -> str | None:
+        if len(prefix) < env_int("CODEX_COUNCIL_GEMINI_CACHE_MIN_CHARS", 16000):
+            return None
+        key = hashlib.sha256("\0".join([model, api_key, prefix]).encode("utf-8")).hexdigest()
+        entry = self._prefix_caches.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._create_cached_content(client, model, prefix, api_key, key))
+            self._pending[key] = pending
+        try:
+            return await pending
+        finally:
+            self._pending.pop(key, None)
+
+    def _generation_config(self, prompt: str, model: str) -> dict:
+        config = self.generation_params(model)
+        structured = response_schema(prompt)
+        if structured:
+            config = {
+                **config,
+                "responseMimeType": "application/json",
+                "responseSchema": _gemini_schema(structured["schema"]),
+            }
+        return config
+
+    async def _payload(self, client: httpx.AsyncClient, prompt: str, model: str, api_key: str) -> dict:
+        turns = chat_turns(prompt) or [("user", prompt)]
+        prefix, suffix = split_prompt(turns[0][1])
+        cached = await self._cached_content(client, model, prefix, api_key) if prefix else None
+        payload = {"generationConfig": self._generation_config(prompt, model)}
+        if cached:
+            payload["cachedContent"] = cached
+            turns = [("user", suffix or "."), *turns[1:]]
+        elif len(turns) == 1:
+            payload["contents"] = [{"parts": [{"text": prompt}]}]
+            return payload
+        # Gemini calls the assistant side of a conversation "model".
+        payload["contents"] = [
+            {"role": "model" if role == "assistant" else "user", "parts": [{"text": text}]}
+            for role, text in turns
+        ]
+        return payload
+
+    def _usage(self, data: dict) -> dict:
+        usage = data.get("usageMetadata")
+        if not usage:
+            return {}
+        return {
+            "prompt_tokens": usage.get("promptTokenCount"),
+            "completion_tokens": usage.get("candidatesTokenCount"),
+            "cached_tokens": usage.get("cachedContentTokenCount"),
+        }
+
+    def _candidate_text(self, data: dict) -> str:
+        candidates = data.get("candidates", [])
+        if not candidates:
+            return ""
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
     async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
         normalized = self._normalize_model(model)
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{normalized}:generateContent"
+        url = f"{MODELS_URL}/{normalized}:generateContent"
         params = {"key": api_key}
-        payload = {
-            "contents": [
-                {
-                    "parts": [{"text": prompt}],
-                }
-            ],
-            "generationConfig": {"temperature": 0.7},
-        }
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, params=params, json=payload)
-            response.raise_for_status()
-            data = response.json()
+        client = provider_clients.get("gemini")
+        payload = await self._payload(client, prompt, normalized, api_key)
+        response = await client.post(
+            url,
+            params=params,
+            json=payload,
+            timeout=timeout_for("gemini", normalized),
+        )
+        raise_for_provider_status(response, "Gemini")
+        data = response.json()
         candidates = data.get("candidates", [])
         content = candidates[0]["content"]["parts"][0]["text"] if candidates else ""
-        return ProviderResponse(content=content)
+        return ProviderResponse(content=content, **self._usage(data))
+
+    async def stream(self, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+        normalized = self._normalize_model(model)
+        url = f"{MODELS_URL}/{normalized}:streamGenerateContent"
+        params = {"key": api_key, "alt": "sse"}
+        client = provider_clients.get("gemini")
+        payload = await self._payload(client, prompt, normalized, api_key)
+        async with client.stream(
+            "POST",
+            url,
+            params=params,
+            json=payload,
+            timeout=timeout_for("gemini", normalized),
+        ) as response:
+            await raise_for_stream_status(response, "Gemini")
+            async for data in iter_sse_data(response):
+                event = json.loads(data)
+                # Every chunk carries cumulative usage; the last one is the total.
+                report_usage(**self._usage(event))
+                text = self._candidate_text(event)
+                if text:
+                    yield text
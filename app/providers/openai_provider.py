@@ -1,6 +1,24 @@
-import httpx
+import hashlib
+import json
+from typing import AsyncIterator
 
-from .base import ProviderResponse
+from .accounting import report_usage
+from .base import (
+    ProviderResponse,
+    chat_turns,
+    conversation,
+    iter_sse_data,
+    raise_for_provider_status,
+    raise_for_stream_status,
+    response_schema,
+    split_prompt,
+)
+from .clients import provider_clients
+from .resilience import timeout_for
+
+RESPONSES_URL = "https://api.openai.com/v1/responses"
+CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
+SYSTEM_PROMPT = "You are a careful research assistant."
 
 
 class OpenAIProvider:
@@ -8,6 +26,11 @@ class OpenAIProvider:
         model_name = (model or "").lower()
         return model_name.startswith("gpt-5") or model_name.startswith("o1")
 
+    def generation_params(self, model: str) -> dict:
+        if self._use_responses_api(model):
+            return {}
+        return {"temperature": 0.7}
+
     def _extract_response_text(self, data: dict) -> str:
         if "output_text" in data and data["output_text"]:
             return data["output_text"]
@@ -24,59 +47,124 @@ class OpenAIProvider:
                 return "\n".join(parts).strip()
         return ""
 
-    async def _post_with_retry(self, client: httpx.AsyncClient, url: str, payload: dict, headers: dict) -> httpx.Response:
-        try:
-            return await client.post(url, json=payload, headers=headers)
-        except httpx.ReadTimeout as exc:
-            try:
-                return await client.post(url, json=payload, headers=headers)
-            except httpx.ReadTimeout as retry_exc:
-                raise RuntimeError("OpenAI request timed out after 2 attempts.") from retry_exc
+    def _usage(self, usage: dict | None) -> dict:
+        if not usage:
+            return {}
+        # Chat Completions reports prompt/completion tokens, the Responses API input/output.
+        details = usage.get("prompt_tokens_details") or usage.get("input_tokens_details") or {}
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", usage.get("input_tokens")),
+            "completion_tokens": usage.get("completion_tokens", usage.get("output_tokens")),
+            "cached_tokens": details.get("cached_tokens"),
+        }
 
-    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
-        headers = {
+    def _headers(self, api_key: str) -> dict:
+        return {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
-        async with httpx.AsyncClient(timeout=180.0) as client:
-            if self._use_responses_api(model):
-                payload = {
-                    "model": model,
-                    "input": [
-                        {
-                            "role": "system",
-                            "content": [{"type": "input_text", "text": "You are a careful research assistant."}],
-                        },
-                        {"role": "user", "content": [{"type": "input_text", "text": prompt}]},
-                    ],
-                }
-                response = await self._post_with_retry(
-                    client,
-                    "https://api.openai.com/v1/responses",
-                    payload,
-                    headers,
-                )
-                if response.status_code >= 400:
-                    raise RuntimeError(f"OpenAI error {response.status_code}: {response.text}")
-                data = response.json()
-                content = self._extract_response_text(data)
-            else:
-                payload = {
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": "You are a careful research assistant."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    "temperature": 0.7,
-                }
-                response = await self._post_with_retry(
-                    client,
-                    "https://api.openai.com/v1/chat/completions",
-                    payload,
-                    headers,
-                )
-                if response.status_code >= 400:
-                    raise RuntimeError(f"OpenAI error {response.status_code}: {response.text}")
-                data = response.json()
-                content = data["choices"][0]["message"]["content"]
-        return ProviderResponse(content=content)
+
+    def _cache_params(self, prompt: str) -> dict:
+        # OpenAI caches matching prompt prefixes automatically; the system message and
+        # shared prefix always lead the request, and the cache key routes calls that
+        # share a prefix to the same cache.
+        prefix, _ = split_prompt(prompt)
+        if not prefix:
+            return {}
+        return {"prompt_cache_key": hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:32]}
+
+    def _format_params(self, prompt: str, responses_api: bool) -> dict:
+        structured = response_schema(prompt)
+        if not structured:
+            return {}
+        json_schema = {"name": structured["name"], "schema": structured["schema"], "strict": True}
+        if responses_api:
+            return {"text": {"format": {"type": "json_schema", **json_schema}}}
+        return {"response_format": {"type": "json_schema", "json_schema": json_schema}}
+
+    def _responses_input(self, prompt: str) -> dict:
+        chained = conversation(prompt)
+        if chained and chained[0].previous_response_id:
+            # The server already holds the earlier turns; send only the new message.
+            return {
+                "previous_response_id": chained[0].previous_response_id,
+                "input": [{"role": "user", "content": [{"type": "input_text", "text": chained[1]}]}],
+            }
+        messages = [{"role": "system", "content": [{"type": "input_text", "text": SYSTEM_PROMPT}]}]
+        for role, text in chat_turns(prompt) or [("user", prompt)]:
+            kind = "output_text" if role == "assistant" else "input_text"
+            messages.append({"role": role, "content": [{"type": kind, "text": text}]})
+        return {"input": messages}
+
+    def _request(self, prompt: str, model: str) -> tuple[str, dict]:
+        if self._use_responses_api(model):
+            return RESPONSES_URL, {
+                "model": model,
+                **self._responses_input(prompt),
+                **self.generation_params(model),
+                **self._cache_params(prompt),
+                **self._format_params(prompt, responses_api=True),
+            }
+        turns = chat_turns(prompt) or [("user", prompt)]
+        return CHAT_COMPLETIONS_URL, {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                *({"role": role, "content": text} for role, text in turns),
+            ],
+            **self.generation_params(model),
+            **self._cache_params(prompt),
+            **self._format_params(prompt, responses_api=False),
+        }
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        client = provider_clients.get("openai")
+        url, payload = self._request(prompt, model)
+        response = await client.post(
+            url,
+            json=payload,
+            headers=self._headers(api_key),
+            timeout=timeout_for("openai", model),
+        )
+        raise_for_provider_status(response, "OpenAI")
+        data = response.json()
+        response_id = None
+        if url == RESPONSES_URL:
+            content = self._extract_response_text(data)
+            response_id = data.get("id")
+        else:
+            content = data["choices"][0]["message"]["content"]
+        return ProviderResponse(content=content, response_id=response_id, **self._usage(data.get("usage")))
+
+    async def stream(self, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+        client = provider_clients.get("openai")
+        url, payload = self._request(prompt, model)
+        payload["stream"] = True
+        if url == CHAT_COMPLETIONS_URL:
+            payload["stream_options"] = {"include_usage": True}
+        async with client.stream(
+            "POST",
+            url,
+            json=payload,
+            headers=self._headers(api_key),
+            timeout=timeout_for("openai", model),
+        ) as response:
+            await raise_for_stream_status(response, "OpenAI")
+            async for data in iter_sse_data(response):
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                if url == RESPONSES_URL:
+                    if event.get("type") == "response.completed":
+                        report_usage(**self._usage((event.get("response") or {}).get("usage")))
+                    if event.get("type") == "response.output_text.delta":
+                        text = event.get("delta")
+                    else:
+                        text = None
+                else:
+                    if event.get("usage"):
+                        report_usage(**self._usage(event["usage"]))
+                    choices = event.get("choices") or [{}]
+                    text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    yield text
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from ..settings import env_int
+from .accounting import current_scope
+from .admission import aged_rank, default_aging_seconds, priority_rank
+from .base import LLMProvider, ProviderError, ProviderResponse, iter_completion
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    requests_per_minute: int
+    tokens_per_minute: int
+    max_concurrency: int
+
+
+def limits_for(provider: str) -> RateLimits:
+    prefix = f"CODEX_COUNCIL_{provider.upper()}"
+
+    def setting(name: str, default: int) -> int:
+        return env_int(f"{prefix}_{name}", env_int(f"CODEX_COUNCIL_RATE_{name}", default))
+
+    return RateLimits(
+        requests_per_minute=setting("RPM", 60),
+        tokens_per_minute=setting("TPM", 200_000),
+        max_concurrency=max(1, setting("MAX_CONCURRENCY", 8)),
+    )
+
+
+def estimate_tokens(prompt: str, params: dict | None = None) -> int:
+    completion = (params or {}).get("max_tokens", 1024)
+    return max(1, len(prompt) // 4) + completion
+
+
+class TokenBucket:
+    # A per-minute budget (0 disables the bucket) that refills continuously.
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        self._refill()
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens * 60.0 / self.capacity
+
+
+class ProviderLimiter:
+    # Token buckets for RPM/TPM plus an AIMD concurrency cap that halves on 429s.
+    # Callers waiting for a concurrency slot are served by priority class (aged like
+    # admission waiters), so an interactive call does not queue behind a bulk backlog.
+    def __init__(self, limits: RateLimits, aging_seconds: float | None = None) -> None:
+        self.limits = limits
+        self.requests = TokenBucket(limits.requests_per_minute)
+        self.tokens = TokenBucket(limits.tokens_per_minute)
+        self.concurrency = limits.max_concurrency
+        self.aging_seconds = aging_seconds or default_aging_seconds()
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.rate_limited = 0
+        self._successes = 0
+        # (rank, seq, enqueued, future) per waiting caller.
+        self._waiters: list[tuple[int, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.in_flight = 0
+            self._waiters = []
+        return loop
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self.in_flight < self.concurrency and self._waiters:
+            best = min(
+                self._waiters,
+                key=lambda waiter: (aged_rank(waiter[0], waiter[2], now, self.aging_seconds), waiter[1]),
+            )
+            self._waiters.remove(best)
+            if best[3].done():
+                continue
+            self.in_flight += 1
+            best[3].set_result(None)
+
+    async def _take_slot(self, priority: str | None) -> None:
+        loop = self._bind_loop()
+        if self.in_flight < self.concurrency and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = (priority_rank(priority), next(self._seq), time.monotonic(), loop.create_future())
+        self._waiters.append(waiter)
+        try:
+            await waiter[3]
+        except asyncio.CancelledError:
+            if waiter[3].done() and not waiter[3].cancelled():
+                # Granted just as the caller went away; hand the slot on.
+                self._free_slot()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def _free_slot(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        self._dispatch()
+
+    async def acquire(self, tokens: int, priority: str | None = None) -> None:
+        await self._take_slot(priority)
+        try:
+            wait = max(
+                self.cooldown_until - time.monotonic(),
+                self.requests.reserve(1),
+                self.tokens.reserve(tokens),
+            )
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            await self.release()
+            raise
+
+    async def release(self) -> None:
+        self._bind_loop()
+        self._free_slot()
+
+    def on_success(self) -> None:
+        self._successes += 1
+        if self.concurrency < self.limits.max_concurrency and self._successes >= self.concurrency:
+            self.concurrency += 1
+            self._successes = 0
+            self._dispatch()
+
+    def on_rate_limited(self, retry_after: float | None) -> None:
+        self.rate_limited += 1
+        self._successes = 0
+        self.concurrency = max(1, self.concurrency // 2)
+        if retry_after:
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + retry_after)
+
+    def snapshot(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "max_concurrency": self.limits.max_concurrency,
+            "in_flight": self.in_flight,
+            "rate_limited": self.rate_limited,
+            "cooldown_seconds": max(0.0, round(self.cooldown_until - time.monotonic(), 2)),
+        }
+
+
+class RateLimiterRegistry:
+    def __init__(self) -> None:
+        self._limiters: dict[tuple[str, str], ProviderLimiter] = {}
+
+    def get(self, provider: str, model: str) -> ProviderLimiter:
+        key = (provider, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = ProviderLimiter(limits_for(provider))
+            self._limiters[key] = limiter
+        return limiter
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {"provider": provider, "model": model, **limiter.snapshot()}
+            for (provider, model), limiter in sorted(self._limiters.items())
+        ]
+
+
+class RateLimitedProvider:
+    # Paces calls and feeds 429s back into the limiter; retrying is left to the
+    # resilience layer above so every retryable failure shares one policy.
+    def __init__(self, name: str, inner: LLMProvider, registry: RateLimiterRegistry) -> None:
+        self.name = name
+        self.inner = inner
+        self.registry = registry
+
+    def generation_params(self, model: str) -> dict:
+        params = getattr(self.inner, "generation_params", None)
+        return params(model) if params else {}
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        limiter = self.registry.get(self.name, model)
+        await limiter.acquire(
+            estimate_tokens(prompt, self.generation_params(model)), current_scope().get("priority")
+        )
+        try:
+            response = await self.inner.generate(prompt, model, api_key)
+        except ProviderError as exc:
+            if exc.status_code == 429:
+                limiter.on_rate_limited(exc.retry_after)
+            raise
+        finally:
+            await limiter.release()
+        limiter.on_success()
+        return response
+
+    async def stream(self, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+        limiter = self.registry.get(self.name, model)
+        await limiter.acquire(
+            estimate_tokens(prompt, self.generation_params(model)), current_scope().get("priority")
+        )
+        try:
+            async for chunk in iter_completion(self.inner, prompt, model, api_key):
+                yield chunk
+        except ProviderError as exc:
+            if exc.status_code == 429:
+                limiter.on_rate_limited(exc.retry_after)
+            raise
+        finally:
+            await limiter.release()
+        limiter.on_success()
+
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator
+
+from ..settings import env_float, env_int
+from .accounting import current_scope, current_usage, report_usage
+from .base import LLMProvider, ProviderError, ProviderResponse, iter_completion
+
+DEFAULT_CASSETTE = Path(__file__).resolve().parents[2] / "cassettes" / "replay.jsonl"
+SCOPE_FIELDS = ("run_id", "idea_id", "review_id")
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()
+
+
+def scope_key(scope: dict) -> tuple:
+    # The run/idea/review a call belongs to, as recorded with each cassette entry.
+    return tuple(scope.get(field) for field in SCOPE_FIELDS)
+
+
+def cassette_path() -> Path:
+    return Path(os.getenv("CODEX_COUNCIL_REPLAY_CASSETTE") or DEFAULT_CASSETTE)
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    # "recorded" (default), "none", "fixed:<ms>", "uniform:<lo_ms>:<hi_ms>" or
+    # "lognormal:<median_ms>:<sigma>"; the result is multiplied by `scale`.
+    kind: str = "recorded"
+    a: float = 0.0
+    b: float = 0.0
+    scale: float = 1.0
+
+    @classmethod
+    def parse(cls, spec: str | None, scale: float = 1.0) -> "LatencyModel":
+        parts = (spec or "recorded").strip().lower().split(":")
+        kind = parts[0] or "recorded"
+        if kind not in {"recorded", "none", "fixed", "uniform", "lognormal"}:
+            raise ValueError(f"Unknown replay latency model: {spec}")
+        values = [float(value) for value in parts[1:3]] + [0.0, 0.0]
+        return cls(kind=kind, a=values[0], b=values[1], scale=scale)
+
+    def sample(self, rng: random.Random, recorded_ms: float | None) -> float:
+        if self.kind == "none":
+            millis = 0.0
+        elif self.kind == "fixed":
+            millis = self.a
+        elif self.kind == "uniform":
+            millis = rng.uniform(self.a, self.b)
+        elif self.kind == "lognormal":
+            millis = rng.lognormvariate(0.0, self.b) * self.a
+        else:
+            millis = recorded_ms or 0.0
+        return max(0.0, millis * self.scale / 1000.0)
+
+
+def parse_error_rates(spec: str | None) -> list[tuple[int, float]]:
+    # "429:0.05,503:0.01" -> fail 5% of calls with 429 and 1% with 503.
+    rates = []
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        status, _, rate = item.partition(":")
+        rates.append((int(status), float(rate)))
+    return rates
+
+
+class Cassette:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entries: dict[str, list[dict]] | None = None
+
+    def _load(self) -> dict[str, list[dict]]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path.exists():
+                for line in self.path.read_text(encoding="utf-8").splitlines():
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+        return self._entries
+
+    def scopes(self, prompt: str) -> dict[tuple, list[dict]]:
+        # Recorded responses to a prompt, grouped by the run/idea/review that made
+        # the call and ordered by recorded idea order; entries from cassettes
+        # recorded without scopes share one group.
+        grouped: dict[tuple, list[dict]] = {}
+        for entry in self._load().get(prompt_key(prompt), []):
+            grouped.setdefault(scope_key(entry), []).append(entry)
+        order = sorted(grouped, key=lambda scope: [(value is None, value or 0) for value in scope])
+        return {scope: grouped[scope] for scope in order}
+
+    def append(self, entry: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        if self._entries is not None:
+            self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._load().values())
+
+
+class ReplayProvider:
+    def __init__(
+        self,
+        cassette: Cassette | None = None,
+        latency: LatencyModel | None = None,
+        error_rates: list[tuple[int, float]] | None = None,
+        seed: int | None = None,
+        chunk_chars: int | None = None,
+    ) -> None:
+        self.cassette = cassette or Cassette(cassette_path())
+        self.latency = latency or LatencyModel.parse(
+            os.getenv("CODEX_COUNCIL_REPLAY_LATENCY"),
+            env_float("CODEX_COUNCIL_REPLAY_LATENCY_SCALE", 1.0),
+        )
+        self.error_rates = (
+            parse_error_rates(os.getenv("CODEX_COUNCIL_REPLAY_ERRORS")) if error_rates is None else error_rates
+        )
+        if seed is None and os.getenv("CODEX_COUNCIL_REPLAY_SEED"):
+            seed = env_int("CODEX_COUNCIL_REPLAY_SEED", 0)
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self._occurrences: dict[tuple, int] = {}
+        # Replay scope -> recorded scope, fixed on first use so an idea keeps
+        # following one recorded idea across prompts.
+        self._scopes: dict[tuple, tuple] = {}
+        self.chunk_chars = chunk_chars or env_int("CODEX_COUNCIL_REPLAY_CHUNK_CHARS", 200)
+
+    def generation_params(self, model: str) -> dict:
+        return {}
+
+    def _entry(self, prompt: str) -> tuple[dict, random.Random]:
+        # Concurrent ideas reach the provider in a different order on every run, so
+        # the response and the injected error and latency are derived from the
+        # call itself: its prompt and how often that prompt came up in the same
+        # run/idea/review scope, never from a shared cursor or random stream.
+        key = prompt_key(prompt)
+        scope = scope_key(current_scope())
+        counter = (*scope, key)
+        occurrence = self._occurrences.get(counter, 0)
+        self._occurrences[counter] = occurrence + 1
+        rng = random.Random(f"{self.seed}:{key}:{occurrence}")
+        roll = rng.random()
+        for status, rate in self.error_rates:
+            if roll < rate:
+                raise ProviderError(f"Replay injected error {status}", status_code=status)
+            roll -= rate
+        entries = self._recorded(scope, key, self.cassette.scopes(prompt))
+        if not entries:
+            raise ProviderError(
+                f"Replay cassette {self.cassette.path} has no entry for prompt {key[:12]}",
+                status_code=404,
+            )
+        # Repeated prompts replay their recorded responses in order, then cycle.
+        return entries[occurrence % len(entries)], rng
+
+    def _recorded(self, scope: tuple, key: str, recorded: dict[tuple, list[dict]]) -> list[dict]:
+        # A prompt several ideas share (the pitch) was answered differently for
+        # each recorded idea, so each replayed idea follows its own recorded idea
+        # instead of every idea replaying the first one.
+        if not recorded:
+            return []
+        mapped = self._scopes.get(scope)
+        if mapped in recorded:
+            return recorded[mapped]
+        claimed = set(self._scopes.values())
+        free = [candidate for candidate in recorded if candidate not in claimed]
+        if not free:
+            # More replayed scopes than recorded ones: share them round-robin.
+            users = [counter[:-1] for counter in self._occurrences if counter[-1] == key]
+            return list(recorded.values())[users.index(scope) % len(recorded)]
+        if mapped is None:
+            self._scopes[scope] = free[0]
+        return recorded[free[0]]
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        entry, rng = self._entry(prompt)
+        await asyncio.sleep(self.latency.sample(rng, entry.get("latency_ms")))
+        return ProviderResponse(
+            content=entry["content"],
+            prompt_tokens=entry.get("prompt_tokens"),
+            completion_tokens=entry.get("completion_tokens"),
+            cached_tokens=entry.get("cached_tokens"),
+        )
+
+    async def stream(self, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+        entry, rng = self._entry(prompt)
+        content = entry["content"]
+        chunks = [content[i:i + self.chunk_chars] for i in range(0, len(content), self.chunk_chars)] or [""]
+        # Spread the sampled latency across chunks so flush intervals behave as they do live.
+        pause = self.latency.sample(rng, entry.get("latency_ms")) / len(chunks)
+        report_usage(entry.get("prompt_tokens"), entry.get("completion_tokens"), entry.get("cached_tokens"))
+        for chunk in chunks:
+            await asyncio.sleep(pause)
+            yield chunk
+
+
+class RecordingProvider:
+    def __init__(self, name: str, inner: LLMProvider, cassette: Cassette) -> None:
+        self.name = name
+        self.inner = inner
+        self.cassette = cassette
+
+    def generation_params(self, model: str) -> dict:
+        params = getattr(self.inner, "generation_params", None)
+        return params(model) if params else {}
+
+    def _record(self, prompt: str, model: str, content: str, started: float, usage: dict) -> None:
+        self.cassette.append({
+            "key": prompt_key(prompt),
+            "provider": self.name,
+            "model": model,
+            "prompt_preview": str(prompt)[-200:],
+            "content": content,
+            "latency_ms": int((time.monotonic() - started) * 1000),
+            **{field: value for field, value in zip(SCOPE_FIELDS, scope_key(current_scope())) if value is not None},
+            **{name: value for name, value in usage.items() if value is not None},
+        })
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        started = time.monotonic()
+        response = await self.inner.generate(prompt, model, api_key)
+        self._record(prompt, model, response.content, started, {
+            "prompt_tokens": response.prompt_tokens,
+            "completion_tokens": response.completion_tokens,
+            "cached_tokens": response.cached_tokens,
+        })
+        return response
+
+    async def stream(self, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+        started = time.monotonic()
+        chunks: list[str] = []
+        async for chunk in iter_completion(self.inner, prompt, model, api_key):
+            chunks.append(chunk)
+            yield chunk
+        usage = current_usage()
+        self._record(prompt, model, "".join(chunks), started, {
+            "prompt_tokens": usage.prompt_tokens if usage else None,
+            "completion_tokens": usage.completion_tokens if usage else None,
+            "cached_tokens": usage.cached_tokens if usage else None,
+        })
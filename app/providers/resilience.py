@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import httpx
+
+from ..settings import env_float, env_int
+from .accounting import note_retry
+from .base import LLMProvider, ProviderError, ProviderResponse, iter_completion
+
+# Read timeouts per provider, matching the limits the providers shipped with.
+DEFAULT_TIMEOUTS = {"openai": 180.0, "anthropic": 60.0, "gemini": 60.0}
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    max_retries: int
+    backoff_base: float
+    backoff_max: float
+    breaker_threshold: int
+    breaker_reset_seconds: float
+
+
+def policy_for(provider: str) -> ResiliencePolicy:
+    prefix = f"CODEX_COUNCIL_{provider.upper()}"
+
+    def setting(name: str, default: int) -> int:
+        return env_int(f"{prefix}_{name}", env_int(f"CODEX_COUNCIL_RATE_{name}", default))
+
+    return ResiliencePolicy(
+        max_retries=setting("MAX_RETRIES", 5),
+        backoff_base=env_float("CODEX_COUNCIL_RATE_BACKOFF_BASE", 1.0),
+        backoff_max=env_float("CODEX_COUNCIL_RATE_BACKOFF_MAX", 60.0),
+        breaker_threshold=max(1, env_int("CODEX_COUNCIL_BREAKER_THRESHOLD", 5)),
+        breaker_reset_seconds=env_float("CODEX_COUNCIL_BREAKER_RESET_SECONDS", 30.0),
+    )
+
+
+def _model_timeout(model: str) -> float | None:
+    # CODEX_COUNCIL_MODEL_TIMEOUTS="gpt-5*=300,claude-3-5-*=90"; first matching pattern wins.
+    for item in (os.getenv("CODEX_COUNCIL_MODEL_TIMEOUTS") or "").split(","):
+        pattern, _, seconds = item.partition("=")
+        if pattern.strip() and fnmatch.fnmatch((model or "").lower(), pattern.strip().lower()):
+            try:
+                return float(seconds)
+            except ValueError:
+                return None
+    return None
+
+
+def timeout_for(provider: str, model: str) -> httpx.Timeout:
+    read = _model_timeout(model) or env_float(
+        f"CODEX_COUNCIL_{provider.upper()}_TIMEOUT_SECONDS",
+        DEFAULT_TIMEOUTS.get(provider, 60.0),
+    )
+    return httpx.Timeout(read, connect=min(read, env_float("CODEX_COUNCIL_CONNECT_TIMEOUT_SECONDS", 10.0)))
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    # Full jitter around an exponential step keeps concurrent callers from retrying in lockstep.
+    return min(maximum, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, ProviderError):
+        return exc.status_code == 429 or (exc.status_code or 0) >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def is_outage(exc: BaseException) -> bool:
+    # Rate limits mean the provider is up, so only 5xx and transport failures trip the breaker.
+    return is_retryable(exc) and not (isinstance(exc, ProviderError) and exc.status_code == 429)
+
+
+class CircuitOpenError(ProviderError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, reset_seconds: float) -> None:
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probe_started: float | None = None
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self, label: str) -> None:
+        state = self.state
+        if state == "closed":
+            return
+        now = time.monotonic()
+        # Let a single probe through; everyone else keeps failing fast until it returns.
+        # A probe that never reports back (cancelled, hung) is replaced after a reset period.
+        if state == "half_open" and (self.probe_started is None or now - self.probe_started >= self.reset_seconds):
+            self.probe_started = now
+            return
+        retry_in = max(0.0, self.reset_seconds - (time.monotonic() - (self.opened_at or 0.0)))
+        raise CircuitOpenError(
+            f"{label} circuit open after {self.failures} consecutive failures",
+            status_code=503,
+            retry_after=retry_in,
+        )
+
+    def on_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+
+    def on_failure(self) -> None:
+        self.failures += 1
+        if self.probe_started is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+        self.probe_started = None
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "threshold": self.threshold,
+            "trips": self.trips,
+        }
+
+
+class CircuitBreakerRegistry:
+    def __init__(self) -> None:
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+    def get(self, provider: str, model: str, policy: ResiliencePolicy | None = None) -> CircuitBreaker:
+        key = (provider, model)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            policy = policy or policy_for(provider)
+            breaker = CircuitBreaker(policy.breaker_threshold, policy.breaker_reset_seconds)
+            self._breakers[key] = breaker
+        return breaker
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {"provider": provider, "model": model, **breaker.snapshot()}
+            for (provider, model), breaker in sorted(self._breakers.items())
+        ]
+
+
+class ResilientProvider:
+    def __init__(
+        self,
+        name: str,
+        inner: LLMProvider,
+        breakers: CircuitBreakerRegistry,
+        policy: ResiliencePolicy | None = None,
+    ) -> None:
+        self.name = name
+        self.inner = inner
+        self.breakers = breakers
+        self.policy = policy or policy_for(name)
+
+    def generation_params(self, model: str) -> dict:
+        params = getattr(self.inner, "generation_params", None)
+        return params(model) if params else {}
+
+    def _on_failure(self, breaker: CircuitBreaker, exc: BaseException, attempt: int) -> float:
+        self._record_outcome(breaker, exc)
+        if not is_retryable(exc) or attempt >= self.policy.max_retries:
+            raise exc
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after and retry_after > self.policy.backoff_max:
+            # Waiting out a long Retry-After would park the caller (and its run) for
+            # that long; surface the error instead.
+            raise exc
+        return retry_after or backoff_delay(attempt, self.policy.backoff_base, self.policy.backoff_max)
+
+    def _record_outcome(self, breaker: CircuitBreaker, exc: BaseException) -> None:
+        # Any answer from the provider, even a 4xx, shows it is reachable.
+        if is_outage(exc):
+            breaker.on_failure()
+        else:
+            breaker.on_success()
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        breaker = self.breakers.get(self.name, model, self.policy)
+        attempt = 0
+        while True:
+            breaker.before_call(self.name)
+            try:
+                response = await self.inner.generate(prompt, model, api_key)
+            except Exception as exc:
+                delay = self._on_failure(breaker, exc, attempt)
+            else:
+                breaker.on_success()
+                return response
+            attempt += 1
+            note_retry()
+            await asyncio.sleep(delay)
+
+    async def stream(self, prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+        breaker = self.breakers.get(self.name, model, self.policy)
+        attempt = 0
+        while True:
+            breaker.before_call(self.name)
+            started = False
+            try:
+                async for chunk in iter_completion(self.inner, prompt, model, api_key):
+                    started = True
+                    yield chunk
+            except Exception as exc:
+                # Once text has been yielded a retry would duplicate output, so only
+                # failures before the first chunk are retried.
+                if started:
+                    self._record_outcome(breaker, exc)
+                    raise
+                delay = self._on_failure(breaker, exc, attempt)
+            else:
+                breaker.on_success()
+                return
+            attempt += 1
+            note_retry()
+            await asyncio.sleep(delay)
+
+
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import re
+
+from .pitch_repair import LANES
+from .structured import SCORE_FIELDS
+
+# Sections PITCH_TEMPLATE requires. Their presence is a pass/fail filter only:
+# every template-following pitch has them, so they cannot rank candidates.
+REQUIRED_SECTIONS = {
+    "Theoretical puzzle": r"puzzle",
+    "Predictions": r"prediction",
+    "Design family": r"design family",
+    "Novelty statement": r"novelty statement",
+    "Kill criteria": r"kill criteri",
+}
+
+# Idea-mode minimums from EVAL_RUBRIC.md; each point short of one costs a point of score.
+THRESHOLDS = {
+    "novelty": 8,
+    "stakes": 7,
+    "design": 8,
+    "data": 6,
+    "interpretability": 7,
+    "lane_fit": 7,
+    "breakthrough": 8,
+}
+
+
+def template_gaps(pitch: str, lane: str | None) -> list[str]:
+    """Required pitch parts that are missing; an empty list passes the filter."""
+    text = pitch.lower()
+    gaps = [name for name, pattern in REQUIRED_SECTIONS.items() if not re.search(pattern, text)]
+    lane_key = (lane or "").lower()
+    if not lane_key or not any(name.lower() in lane_key or lane_key in name.lower() for name in LANES):
+        gaps.insert(0, "Lane Fit")
+    return gaps
+
+
+def parse_judge_scores(content: str) -> dict[str, float] | None:
+    # Expects one "Label: N/10" line per rubric field; anything less is unusable.
+    scores = {}
+    for field, label in SCORE_FIELDS.items():
+        match = re.search(
+            rf"^[-*#\s]*{re.escape(label)}[^:\n]*:\s*\**\s*(\d+(?:\.\d+)?)",
+            content,
+            re.IGNORECASE | re.MULTILINE,
+        )
+        if not match:
+            return None
+        scores[field] = min(10.0, float(match.group(1)))
+    return scores
+
+
+def screen_score(scores: dict[str, float]) -> float:
+    """Mean rubric score less the shortfall below each EVAL_RUBRIC minimum."""
+    mean = sum(scores.values()) / len(scores)
+    shortfall = sum(max(0.0, THRESHOLDS[field] - value) for field, value in scores.items())
+    return round(mean - shortfall / len(scores), 2)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlmodel import Session
+
+from .db import engine
+from .providers.base import LLMProvider, iter_completion
+from .settings import env_flag, env_float
+
+
+def streaming_enabled() -> bool:
+    return env_flag("CODEX_COUNCIL_STREAMING", True)
+
+
+async def stream_with_flush(
+    provider: LLMProvider,
+    prompt: str,
+    model: str,
+    api_key: str,
+    on_flush: Callable[[str], None],
+    interval: float | None = None,
+) -> str:
+    if not streaming_enabled():
+        response = await provider.generate(prompt, model, api_key)
+        return response.content
+    interval = env_float("CODEX_COUNCIL_STREAM_FLUSH_SECONDS", 2.0) if interval is None else interval
+    chunks: list[str] = []
+    last_flush = time.monotonic()
+    async for chunk in iter_completion(provider, prompt, model, api_key):
+        chunks.append(chunk)
+        if time.monotonic() - last_flush >= interval:
+            on_flush("".join(chunks))
+            last_flush = time.monotonic()
+    return "".join(chunks)
+
+
+def write_partial_content(session: Session, model_cls: type, row_id: int, content: str) -> None:
+    row = session.get(model_cls, row_id)
+    if not row:
+        return
+    row.content = content
+    if hasattr(row, "updated_at"):
+        row.updated_at = datetime.now(timezone.utc)
+    session.add(row)
+
+
+def save_partial_content(model_cls: type, row_id: int, content: str) -> None:
+    with Session(engine) as session:
+        write_partial_content(session, model_cls, row_id, content)
+        session.commit()
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import re
+
+from .providers.base import extend_prompt, with_response_schema
+
+# Strict-mode schemas: every property is required and no others are allowed, which is
+# what OpenAI's strict json_schema format demands and the other providers accept.
+SCORE_FIELDS = {
+    "novelty": "Novelty/agenda-setting",
+    "stakes": "Theoretical stakes clarity",
+    "design": "Design credibility",
+    "data": "Data feasibility",
+    "interpretability": "Interpretability",
+    "lane_fit": "Lane Fit",
+    "breakthrough": "Breakthrough Plausibility",
+}
+
+
+def _object(properties: dict) -> dict:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+_STRING = {"type": "string"}
+_STRINGS = {"type": "array", "items": _STRING}
+
+PITCH_SCHEMA = _object({
+    "lane_primary": _STRING,
+    "lane_secondary": _STRING,
+    "breakthrough_type": _STRING,
+    "why_this_is_breakthrough": _STRING,
+    "working_title": _STRING,
+    "big_claim": _STRING,
+    "body": _STRING,
+})
+
+COUNCIL_SCHEMA = _object({
+    "memos": {
+        "type": "array",
+        "items": _object({
+            "referee": _STRING,
+            "verdict": {"type": "string", "enum": ["accept", "revise", "reject"]},
+            "strengths": _STRINGS,
+            "fatal_flaws": _STRINGS,
+            "required_revisions": _STRINGS,
+            "scores": _object({field: {"type": "number"} for field in SCORE_FIELDS}),
+        }),
+    },
+})
+
+SCHEMAS = {"pitch": PITCH_SCHEMA, "council": COUNCIL_SCHEMA}
+
+INSTRUCTIONS = {
+    "pitch": (
+        "Respond with one JSON object matching the pitch schema. Header fields go in their own keys; "
+        "`body` holds the rest of PITCH.md as markdown, starting at the theoretical puzzle."
+    ),
+    "council": (
+        "Respond with one JSON object matching the council schema: one entry in `memos` per referee, "
+        "scores as numbers from 1 to 10."
+    ),
+}
+
+
+class StructuredOutputError(ValueError):
+    pass
+
+
+def structured_prompt(prompt: str, name: str) -> str:
+    return with_response_schema(extend_prompt(prompt, INSTRUCTIONS[name]), name, SCHEMAS[name])
+
+
+def _check(value, schema: dict, path: str) -> None:
+    kind = schema.get("type")
+    if kind == "object":
+        if not isinstance(value, dict):
+            raise StructuredOutputError(f"{path} is not an object")
+        missing = [key for key in schema.get("required", []) if key not in value]
+        if missing:
+            raise StructuredOutputError(f"{path} is missing {', '.join(missing)}")
+        for key, child in schema.get("properties", {}).items():
+            _check(value[key], child, f"{path}.{key}")
+    elif kind == "array":
+        if not isinstance(value, list):
+            raise StructuredOutputError(f"{path} is not an array")
+        for idx, item in enumerate(value):
+            _check(item, schema["items"], f"{path}[{idx}]")
+    elif kind == "string":
+        if not isinstance(value, str):
+            raise StructuredOutputError(f"{path} is not a string")
+        if "enum" in schema and value.strip().lower() not in schema["enum"]:
+            raise StructuredOutputError(f"{path} must be one of {', '.join(schema['enum'])}")
+    elif kind == "number":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise StructuredOutputError(f"{path} is not a number")
+
+
+def parse_structured(content: str, name: str) -> dict:
+    """Decode and validate a structured response against its schema."""
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip())
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise StructuredOutputError(f"Invalid JSON for {name}: {exc}") from exc
+    _check(data, SCHEMAS[name], name)
+    if name == "council" and not data["memos"]:
+        raise StructuredOutputError("council has no memos")
+    return data
+
+
+def _close_json(text: str) -> str:
+    # Cuts the text at the end of its first top-level value, drops trailing commas
+    # and closes whatever strings, arrays and objects are still open.
+    out: list[str] = []
+    stack: list[str] = []
+    in_string = escaped = False
+    pending_comma = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char.isspace():
+            continue
+        if pending_comma and char not in "}]":
+            out.append(",")
+        pending_comma = False
+        if char == ",":
+            pending_comma = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            if not stack:
+                break
+            out.append(stack.pop())
+            if not stack:
+                break
+        else:
+            if char == '"':
+                in_string = True
+            out.append(char)
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    return "".join(out) + "".join(reversed(stack))
+
+
+def repair_json(content: str):
+    """Best-effort decode of fenced, truncated or comma-damaged JSON, or None.
+
+    Like pitch_repair for free-text pitches: a response that is nearly right is
+    fixed locally instead of paying for another call. An incomplete trailing
+    member is dropped, so a partial stream decodes to what has fully arrived.
+    """
+    start = content.find("{")
+    if start < 0:
+        return None
+    text = content[start:]
+    for _ in range(20):
+        try:
+            return json.loads(_close_json(text))
+        except json.JSONDecodeError:
+            cut = max(text.rfind(","), text.rfind("{", 1), text.rfind("[", 1))
+            shorter = text[:cut] if text[cut] == "," else text[:cut + 1]
+            if cut <= 0 or shorter == text:
+                return None
+            text = shorter
+    return None
+
+
+def salvage_council(content: str) -> list[dict]:
+    # The memos of a council response that pass validation once the JSON is repaired.
+    data = repair_json(content)
+    if not isinstance(data, dict) or not isinstance(data.get("memos"), list):
+        return []
+    memo_schema = COUNCIL_SCHEMA["properties"]["memos"]["items"]
+    memos = []
+    for memo in data["memos"]:
+        try:
+            _check(memo, memo_schema, "memo")
+        except StructuredOutputError:
+            continue
+        memos.append(memo)
+    return memos
+
+
+def render_pitch(data: dict) -> str:
+    # Stored pitches stay markdown with the canonical header block, so gate 1, the
+    # idea fields and exports read them exactly like free-text pitches.
+    header = [
+        f"LANE_PRIMARY: {data['lane_primary'].strip()}",
+        *([f"LANE_SECONDARY: {data['lane_secondary'].strip()}"] if data["lane_secondary"].strip() else []),
+        f"BREAKTHROUGH_TYPE: {data['breakthrough_type'].strip()}",
+        f"WHY_THIS_IS_BREAKTHROUGH: {' '.join(data['why_this_is_breakthrough'].split())}",
+    ]
+    return "\n".join([
+        *header,
+        "",
+        f"Working title: {data['working_title'].strip()}",
+        f"One-sentence big claim: {data['big_claim'].strip()}",
+        "",
+        data["body"].strip(),
+    ]).strip()
+
+
+def render_council(data: dict) -> list[str]:
+    # Memos keep the "Label: X/10" and "Verdict:" lines that Gate 4 scoring reads.
+    memos = []
+    for memo in data["memos"]:
+        lines = [memo["referee"].strip(), f"Verdict: {memo['verdict'].strip().lower()}", "", "Strengths:"]
+        lines += [f"- {item}" for item in memo["strengths"]]
+        lines += ["", "Fatal flaws / biggest risks:"]
+        lines += [f"- {item}" for item in memo["fatal_flaws"]]
+        lines += ["", "Required revisions:"]
+        lines += [f"- {item}" for item in memo["required_revisions"]]
+        lines += ["", "Scores:"]
+        lines += [f"- {label}: {memo['scores'][field]:g}/10" for field, label in SCORE_FIELDS.items()]
+        memos.append("\n".join(lines))
+    return memos
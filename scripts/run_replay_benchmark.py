@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay a recorded cassette through run_swarm offline.")
+    parser.add_argument("--cassette", type=Path, help="Cassette JSONL (defaults to CODEX_COUNCIL_REPLAY_CASSETTE)")
+    parser.add_argument("--ideas", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--topic", default=None, help="Topic focus used when the cassette was recorded")
+    parser.add_argument("--latency", default=None, help="Latency model, e.g. recorded, none, fixed:200")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    # Provider settings are read at import time, so configure the environment first.
+    if args.cassette:
+        os.environ["CODEX_COUNCIL_REPLAY_CASSETTE"] = str(args.cassette)
+    if args.latency:
+        os.environ["CODEX_COUNCIL_REPLAY_LATENCY"] = args.latency
+    os.environ["CODEX_COUNCIL_REPLAY_SEED"] = str(args.seed)
+    os.environ.setdefault("CODEX_COUNCIL_DB_URL", f"sqlite:///{tempfile.mkdtemp()}/replay_benchmark.db")
+
+    from sqlmodel import Session
+
+    from app.db import create_db_and_tables, engine
+    from app.models import Run
+    from app.orchestrator import run_swarm
+    from app.providers.accounting import usage_summary
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        run = Run(
+            provider="replay",
+            model="replay",
+            idea_count=args.ideas,
+            concurrency=args.concurrency,
+            topic_focus=args.topic,
+        )
+        session.add(run)
+        session.commit()
+        run_id = run.id
+
+    started = time.monotonic()
+    with tempfile.TemporaryDirectory() as base_dir:
+        asyncio.run(run_swarm(run_id, "replay", Path(base_dir)))
+    elapsed = time.monotonic() - started
+
+    with Session(engine) as session:
+        run = session.get(Run, run_id)
+        status, log = run.status.value, run.log
+    print(f"run {run_id}: {status} in {elapsed:.2f}s ({args.ideas / elapsed:.2f} ideas/s)")
+    if log:
+        print(log)
+    for row in usage_summary(["stage"], {"run_id": run_id}):
+        print(
+            f"  {row['stage'] or '-':<16} calls={row['calls']:<4} tokens={row['total_tokens']:<8} "
+            f"latency_avg={row['latency_ms_avg']}ms errors={row['errors']}"
+        )
+    return 0 if status == "completed" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -359,6 +359,36 @@ async function loadRuns() {
       <div>${run.created_at}</div>
       <div>${focusLine}</div>
     `;
+    if (run.status === "queued" || run.status === "running") {
+      const cancelButton = document.createElement("button");
+      cancelButton.type = "button";
+      cancelButton.className = "button-secondary";
+      cancelButton.textContent = "Cancel";
+      cancelButton.addEventListener("click", async () => {
+        try {
+          await fetchJSON(`/api/runs/${run.id}/cancel`, { method: "POST" });
+          await loadRuns();
+        } catch (error) {
+          alert(error.message);
+        }
+      });
+      item.appendChild(cancelButton);
+    }
+    if (["failed", "cancelled", "budget_exhausted"].includes(run.status)) {
+      const resumeButton = document.createElement("button");
+      resumeButton.type = "button";
+      resumeButton.className = "button-secondary";
+      resumeButton.textContent = "Resume";
+      resumeButton.addEventListener("click", async () => {
+        try {
+          await fetchJSON(`/api/runs/${run.id}/resume`, { method: "POST" });
+          await loadRuns();
+        } catch (error) {
+          alert(error.message);
+        }
+      });
+      item.appendChild(resumeButton);
+    }
     list.appendChild(item);
   });
 }
@@ -12,5 +12,7 @@ os.environ.setdefault("CODEX_COUNCIL_DB_URL", TEST_DB_URL)
 @pytest.fixture(scope="session", autouse=True)
 def cleanup_test_db() -> None:
     yield
-    if TEST_DB_PATH.exists():
-        TEST_DB_PATH.unlink()
+    # WAL mode keeps -wal and -shm files next to the database while connections are open.
+    for path in (TEST_DB_PATH, Path(f"{TEST_DB_PATH}-wal"), Path(f"{TEST_DB_PATH}-shm")):
+        if path.exists():
+            path.unlink()
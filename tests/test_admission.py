@@ -0,0 +1,158 @@
+import asyncio
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.db import create_db_and_tables, engine
+from app.main import app
+from app.models import LlmCall
+from app.orchestrator import _provider_chain
+from app.providers.accounting import llm_scope
+from app.providers.admission import AdmissionController, AdmittedProvider
+from app.providers.base import ProviderResponse
+from app.providers.rate_limit import RateLimitedProvider, RateLimiterRegistry
+
+
+class RecordingProvider:
+    def __init__(self) -> None:
+        self.order: list[str] = []
+        self.release = asyncio.Event()
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        self.order.append(prompt)
+        if prompt == "hold":
+            await self.release.wait()
+        return ProviderResponse(content=prompt)
+
+
+class AdmissionControllerTest(unittest.TestCase):
+    def test_freed_slot_goes_to_highest_priority_across_providers(self) -> None:
+        controller = AdmissionController(limit=1)
+
+        async def scenario() -> tuple[list[str], dict]:
+            inner = RecordingProvider()
+            openai = AdmittedProvider("openai", inner, controller)
+            gemini = AdmittedProvider("gemini", inner, controller)
+
+            async def call(provider: AdmittedProvider, prompt: str, priority: str) -> None:
+                with llm_scope(priority=priority):
+                    await provider.generate(prompt, "m", "k")
+
+            holder = asyncio.create_task(call(openai, "hold", "bulk"))
+            await asyncio.sleep(0)
+            waiting = [
+                asyncio.create_task(call(openai, "bulk", "bulk")),
+                asyncio.create_task(call(gemini, "standard", "standard")),
+                asyncio.create_task(call(openai, "interactive", "interactive")),
+            ]
+            await asyncio.sleep(0)
+            snapshot = controller.snapshot()
+            inner.release.set()
+            await asyncio.gather(holder, *waiting)
+            return inner.order, snapshot
+
+        order, snapshot = asyncio.run(scenario())
+        self.assertEqual(order, ["hold", "interactive", "standard", "bulk"])
+        self.assertEqual((snapshot["in_flight"], snapshot["queued"]), (1, 3))
+        gemini, openai = snapshot["providers"]
+        self.assertEqual((gemini["provider"], gemini["queued"]), ("gemini", 1))
+        self.assertEqual(openai["by_priority"], {"interactive": 1, "standard": 0, "bulk": 1})
+        self.assertEqual(controller.admitted, {"interactive": 1, "standard": 1, "bulk": 2})
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_cancelled_waiter_leaves_queue_and_aging_promotes_bulk(self) -> None:
+        controller = AdmissionController(limit=1, aging_seconds=5.0)
+
+        async def scenario() -> list[str]:
+            await controller.acquire("openai", "interactive")
+            admitted: list[str] = []
+
+            async def wait(name: str, priority: str) -> None:
+                await controller.acquire("openai", priority)
+                admitted.append(name)
+                controller.release()
+
+            cancelled = asyncio.create_task(wait("cancelled", "interactive"))
+            old_bulk = asyncio.create_task(wait("old_bulk", "bulk"))
+            await asyncio.sleep(0)
+            controller._queues["openai"][1].enqueued -= 20.0
+            fresh = asyncio.create_task(wait("fresh_standard", "standard"))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.gather(cancelled, return_exceptions=True)
+            self.assertEqual(controller.snapshot()["queued"], 2)
+            controller.release()
+            await asyncio.gather(old_bulk, fresh)
+            return admitted
+
+        self.assertEqual(asyncio.run(scenario()), ["old_bulk", "fresh_standard"])
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_provider_in_cooldown_holds_no_slot(self) -> None:
+        controller = AdmissionController(limit=1)
+        registry = RateLimiterRegistry()
+
+        async def scenario() -> list[str]:
+            inner = RecordingProvider()
+            openai = RateLimitedProvider("openai", AdmittedProvider("openai", inner, controller), registry)
+            gemini = RateLimitedProvider("gemini", AdmittedProvider("gemini", inner, controller), registry)
+            registry.get("openai", "m").on_rate_limited(30.0)
+
+            throttled = asyncio.create_task(openai.generate("throttled", "m", "k"))
+            await asyncio.sleep(0.01)
+            with llm_scope(priority="interactive"):
+                await asyncio.wait_for(gemini.generate("interactive", "m", "k"), 1.0)
+            self.assertEqual(controller.in_flight, 0)
+            throttled.cancel()
+            await asyncio.gather(throttled, return_exceptions=True)
+            return inner.order
+
+        self.assertEqual(asyncio.run(scenario()), ["interactive"])
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_interactive_call_overtakes_bulk_backlog_with_default_limits(self) -> None:
+        create_db_and_tables()
+
+        class GatedProvider(RecordingProvider):
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                self.order.append(prompt)
+                await self.release.wait()
+                return ProviderResponse(content=prompt)
+
+        async def scenario() -> list[str]:
+            inner = GatedProvider()
+            provider = _provider_chain("priority-test", inner)
+
+            async def call(prompt: str, priority: str) -> None:
+                with llm_scope(priority=priority):
+                    await provider.generate(prompt, "m", "k")
+
+            bulk = [asyncio.create_task(call(f"bulk-{idx}", "bulk")) for idx in range(24)]
+            await asyncio.sleep(0.05)
+            interactive = asyncio.create_task(call("interactive", "interactive"))
+            await asyncio.sleep(0.05)
+            inner.release.set()
+            await asyncio.gather(*bulk, interactive)
+            return inner.order
+
+        try:
+            order = asyncio.run(scenario())
+        finally:
+            with Session(engine) as session:
+                session.exec(LlmCall.__table__.delete().where(LlmCall.provider == "priority-test"))
+                session.commit()
+        # The default provider cap (8) fills first; the interactive call takes the next freed slot.
+        self.assertEqual(order.index("interactive"), 8)
+
+    def test_queue_endpoint_reports_admission_and_jobs(self) -> None:
+        create_db_and_tables()
+        body = TestClient(app).get("/api/llm/queue").json()
+        self.assertIn("limit", body)
+        self.assertIn("providers", body)
+        self.assertIsInstance(body["jobs"], dict)
+        self.assertIn("batches", body["writes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import asyncio
+import unittest
+
+from app.providers.anthropic_provider import AnthropicProvider
+from app.providers.base import CacheablePrompt, Conversation, chained_prompt, split_prompt
+from app.providers.gemini_provider import GeminiProvider
+from app.providers.openai_provider import CHAT_COMPLETIONS_URL, RESPONSES_URL, OpenAIProvider
+from app.structured import structured_prompt
+
+PITCH_PROMPT = CacheablePrompt("Shared context.\n\n", "Write a pitch.")
+
+
+class ConversationChainingTest(unittest.TestCase):
+    def test_chained_prompt_is_a_standalone_transcript(self) -> None:
+        prompt = chained_prompt(Conversation(((PITCH_PROMPT, "The pitch."),)), "Write the design.")
+        self.assertEqual(split_prompt(prompt)[0], "Shared context.\n\n")
+        self.assertEqual(str(prompt), "Shared context.\n\nWrite a pitch.\n\nThe pitch.\n\nWrite the design.")
+        structured = structured_prompt(prompt, "council")
+        self.assertEqual(structured.conversation, prompt.conversation)
+        self.assertTrue(structured.message.startswith("Write the design.\n\n"))
+
+    def test_openai_continues_from_previous_response(self) -> None:
+        history = Conversation(((PITCH_PROMPT, "The pitch."),), previous_response_id="resp_1")
+        url, payload = OpenAIProvider()._request(chained_prompt(history, "Write the design."), "gpt-5-nano")
+        self.assertEqual(url, RESPONSES_URL)
+        self.assertEqual(payload["previous_response_id"], "resp_1")
+        self.assertEqual(payload["input"], [
+            {"role": "user", "content": [{"type": "input_text", "text": "Write the design."}]},
+        ])
+
+        history = Conversation(((PITCH_PROMPT, "The pitch."),))
+        _, payload = OpenAIProvider()._request(chained_prompt(history, "Write the design."), "gpt-5-nano")
+        self.assertNotIn("previous_response_id", payload)
+        self.assertEqual([item["role"] for item in payload["input"]], ["system", "user", "assistant", "user"])
+        self.assertEqual(payload["input"][2]["content"][0]["type"], "output_text")
+
+        url, payload = OpenAIProvider()._request(chained_prompt(history, "Write the design."), "gpt-4o-mini")
+        self.assertEqual(url, CHAT_COMPLETIONS_URL)
+        self.assertEqual(
+            [(item["role"], item["content"]) for item in payload["messages"][1:]],
+            [("user", PITCH_PROMPT), ("assistant", "The pitch."), ("user", "Write the design.")],
+        )
+
+    def test_message_history_keeps_cached_prefix(self) -> None:
+        prompt = chained_prompt(Conversation(((PITCH_PROMPT, "The pitch."),)), "Write the design.")
+        messages = AnthropicProvider()._payload(prompt, "claude")["messages"]
+        self.assertEqual([message["role"] for message in messages], ["user", "assistant", "user"])
+        self.assertEqual(messages[0]["content"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(messages[2]["content"], "Write the design.")
+
+        payload = asyncio.run(GeminiProvider()._payload(None, prompt, "gemini-2.5-flash", "key"))
+        self.assertEqual([content["role"] for content in payload["contents"]], ["user", "model", "user"])
+        self.assertEqual(payload["contents"][2]["parts"][0]["text"], "Write the design.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+
+from sqlalchemy import text
+from sqlmodel import Session, func, select
+
+from app.db import async_session, create_db_and_tables, engine, get_async_engine, sqlite_pragmas
+from app.models import Run
+
+
+class SqliteProfileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        create_db_and_tables()
+
+    def test_connections_use_wal_profile(self) -> None:
+        with engine.connect() as connection:
+            self.assertEqual(connection.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(connection.execute(text("PRAGMA synchronous")).scalar(), 1)
+            self.assertEqual(
+                connection.execute(text("PRAGMA busy_timeout")).scalar(), sqlite_pragmas()["busy_timeout"]
+            )
+
+    def test_readers_do_not_block_behind_a_writer(self) -> None:
+        writer = engine.connect()
+        try:
+            # An exclusive transaction locks out readers under the rollback journal, not under WAL.
+            writer.exec_driver_sql("BEGIN EXCLUSIVE")
+            writer.execute(text("UPDATE run SET log = log WHERE 0"))
+            with Session(engine) as session:
+                connection = session.connection()
+                connection.exec_driver_sql("PRAGMA busy_timeout=0")
+                try:
+                    self.assertIsNotNone(session.exec(select(func.count()).select_from(Run)).one())
+                finally:
+                    connection.exec_driver_sql(f"PRAGMA busy_timeout={sqlite_pragmas()['busy_timeout']}")
+        finally:
+            writer.rollback()
+            writer.close()
+
+    def test_async_sessions_share_the_database_and_profile(self) -> None:
+        with Session(engine) as session:
+            run = Run(provider="fake", model="fake-model", idea_count=1)
+            session.add(run)
+            session.commit()
+            run_id = run.id
+
+        async def scenario() -> tuple:
+            async with async_session() as session:
+                journal = (await session.exec(text("PRAGMA journal_mode"))).scalar()
+                fetched = await session.get(Run, run_id)
+                # Sync helpers run unchanged through run_sync.
+                model = await session.run_sync(lambda sync: sync.get(Run, run_id).model)
+                return journal, fetched.provider, model
+
+        try:
+            self.assertEqual(asyncio.run(scenario()), ("wal", "fake", "fake-model"))
+        finally:
+            with Session(engine) as session:
+                session.delete(session.get(Run, run_id))
+                session.commit()
+
+    def test_async_engine_pools_per_event_loop(self) -> None:
+        async def scenario() -> tuple:
+            for _ in range(3):
+                async with async_session() as session:
+                    await session.exec(text("SELECT 1"))
+            current = get_async_engine()
+            return current, current.sync_engine.pool.checkedin()
+
+        first, idle = asyncio.run(scenario())
+        # Sequential sessions reuse one pooled connection rather than reopening it.
+        self.assertEqual(idle, 1)
+        second, _ = asyncio.run(scenario())
+        self.assertIsNot(second, first)
+        self.assertEqual(first.sync_engine.pool.checkedin(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
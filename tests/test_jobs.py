@@ -0,0 +1,205 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.db import create_db_and_tables, engine
+from app.jobs import JobQueue
+from app.main import app
+from app.models import Job
+
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self) -> None:
+        create_db_and_tables()
+        self._clear()
+        self.queue = JobQueue(lease_seconds=5.0, poll_seconds=0.01, concurrency=2)
+        self.queue.retry_seconds = 0.0
+        self.calls: list[dict] = []
+
+    def tearDown(self) -> None:
+        self._clear()
+        engine.dispose()
+
+    def _clear(self) -> None:
+        with Session(engine) as session:
+            session.exec(Job.__table__.delete())
+            session.commit()
+
+    async def _drain(self, job_id: int) -> Job:
+        self.queue.start()
+        try:
+            return await asyncio.wait_for(self.queue.wait(job_id), timeout=5)
+        finally:
+            await self.queue.stop()
+
+    def test_failed_job_is_retried_then_succeeds(self) -> None:
+        async def flaky(payload: dict, secret: str | None) -> dict:
+            self.calls.append(payload)
+            if len(self.calls) == 1:
+                raise RuntimeError("transient")
+            return {"value": payload["value"] * 2}
+
+        self.queue.register("flaky", flaky)
+
+        async def scenario() -> Job:
+            return await self._drain(self.queue.enqueue("flaky", {"value": 21}))
+
+        job = asyncio.run(scenario())
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(json.loads(job.result), {"value": 42})
+        self.assertIsNone(job.lease_owner)
+
+    def test_exhausted_attempts_call_failure_hook(self) -> None:
+        failures: list[tuple[dict, str]] = []
+
+        async def broken(payload: dict, secret: str | None) -> None:
+            raise RuntimeError("key=sk-secret exploded")
+
+        self.queue.register("broken", broken, on_failure=lambda payload, error: failures.append((payload, error)))
+        self.queue.redact = lambda text: text.replace("sk-secret", "REDACTED")
+
+        async def scenario() -> Job:
+            return await self._drain(self.queue.enqueue("broken", {"id": 1}, max_attempts=2))
+
+        job = asyncio.run(scenario())
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.assertEqual(job.error, "key=REDACTED exploded")
+        self.assertEqual(failures, [({"id": 1}, "key=REDACTED exploded")])
+
+    def test_expired_lease_is_reclaimed(self) -> None:
+        async def handler(payload: dict, secret: str | None) -> None:
+            self.calls.append(payload)
+
+        self.queue.register("resume", handler)
+        with Session(engine) as session:
+            orphan = Job(
+                kind="resume",
+                payload=json.dumps({"run_id": 7}),
+                status="running",
+                attempts=1,
+                lease_owner="crashed-worker",
+                lease_expires_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+            )
+            live = Job(
+                kind="resume",
+                status="running",
+                attempts=1,
+                lease_owner="live-worker",
+                lease_expires_at=datetime.now(timezone.utc) + timedelta(minutes=5),
+            )
+            session.add_all([orphan, live])
+            session.commit()
+            orphan_id, live_id = orphan.id, live.id
+
+        job = asyncio.run(self._drain(orphan_id))
+        self.assertEqual((job.status, job.attempts), ("succeeded", 2))
+        self.assertEqual(self.calls, [{"run_id": 7}])
+        self.assertEqual(self.queue.get(live_id).lease_owner, "live-worker")
+
+    def test_stale_claim_cannot_renew_or_reclaim_an_active_job(self) -> None:
+        self.queue.register("resume", lambda payload, secret: None)
+        job_id = self.queue.enqueue("resume", {})
+        first = self.queue._claim()
+        with Session(engine) as session:
+            row = session.get(Job, job_id)
+            row.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+            session.add(row)
+            session.commit()
+
+        self.queue._active[job_id] = None
+        self.assertIsNone(self.queue._claim())
+        self.queue._active.clear()
+        second = self.queue._claim()
+        self.assertEqual(second.lease_owner, first.lease_owner)
+        self.assertNotEqual(second.lease_token, first.lease_token)
+        self.assertFalse(self.queue._update_owned(first, status="succeeded"))
+        self.assertTrue(self.queue._update_owned(second, status="succeeded"))
+
+    def test_secret_jobs_wait_for_unlock_and_stop_releases_lease(self) -> None:
+
+        async def slow(payload: dict, secret: str | None) -> None:
+            self.calls.append({"secret": secret})
+            await asyncio.sleep(60)
+
+        self.queue.register("slow", slow, needs_secret=True)
+        secret: list[str] = []
+        self.queue.secret = lambda: secret[0] if secret else None
+
+        async def scenario() -> Job:
+            job_id = self.queue.enqueue("slow", {})
+            self.queue.start()
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.queue.get(job_id).status, "queued")
+            secret.append("passphrase")
+            while not self.calls:
+                await asyncio.sleep(0.01)
+            await self.queue.stop()
+            return self.queue.get(job_id)
+
+        job = asyncio.run(scenario())
+        self.assertEqual(self.calls, [{"secret": "passphrase"}])
+        self.assertEqual((job.status, job.attempts, job.lease_owner), ("queued", 0, None))
+
+    def test_stop_during_claim_hands_the_job_back(self) -> None:
+        self.queue.register("slow", lambda payload, secret: self.calls.append(payload))
+        claiming = threading.Event()
+        claim = self.queue._claim
+
+        def slow_claim(*args) -> Job | None:
+            claiming.set()
+            time.sleep(0.2)
+            return claim(*args)
+
+        self.queue._claim = slow_claim
+
+        async def scenario() -> int:
+            job_id = self.queue.enqueue("slow", {})
+            self.queue.start()
+            await asyncio.to_thread(claiming.wait, 5)
+            await self.queue.stop()
+            return job_id
+
+        # asyncio.run waits for the claim thread, so read the row afterwards.
+        job = self.queue.get(asyncio.run(scenario()))
+        self.assertEqual(self.calls, [])
+        self.assertEqual((job.status, job.attempts, job.lease_owner), ("queued", 0, None))
+
+    def test_run_now_executes_inline_and_does_not_retry(self) -> None:
+        async def handler(payload: dict, secret: str | None) -> dict:
+            self.calls.append(payload)
+            if payload.get("fail"):
+                raise RuntimeError("Fake error 429: slow down")
+            return {"ok": True}
+
+        self.queue.register("interactive", handler)
+
+        async def scenario() -> tuple[Job, Job]:
+            ok = await self.queue.run_now(self.queue.enqueue("interactive", {}))
+            failed = await self.queue.run_now(self.queue.enqueue("interactive", {"fail": True}, max_attempts=2))
+            return ok, failed
+
+        ok, failed = asyncio.run(scenario())
+        self.assertEqual((ok.status, json.loads(ok.result)), ("succeeded", {"ok": True}))
+        self.assertEqual((failed.status, failed.attempts), ("failed", 1))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_jobs_endpoint(self) -> None:
+        with Session(engine) as session:
+            session.add(Job(kind="run_swarm", payload=json.dumps({"run_id": 3})))
+            session.commit()
+        client = TestClient(app)
+        (job,) = client.get("/api/jobs", params={"kind": "run_swarm"}).json()
+        self.assertEqual((job["status"], job["payload"]), ("queued", {"run_id": 3}))
+        self.assertEqual(client.get(f"/api/jobs/{job['id']}").json()["id"], job["id"])
+        self.assertEqual(client.get("/api/jobs/999999").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.blobs import content_hash, get_texts, set_full_text
+from app.crypto import prepare_encrypted_secret
+from app.db import create_db_and_tables, engine
+from app.main import _execute_literature_assessment, app
+from app.migrations import _move_full_text_to_blobs
+from app.models import LiteratureQuery, LiteratureWork, ProviderCredential, TextBlob
+from app.providers.base import ProviderResponse
+
+PAPER = "Sanctions evasion concentrates in a few hubs. " * 200
+
+
+class LiteratureBlobTest(unittest.TestCase):
+    def setUp(self) -> None:
+        create_db_and_tables()
+        with Session(engine) as session:
+            query = LiteratureQuery(query="evasion", sources="openalex", per_source_limit=1)
+            session.add(query)
+            session.commit()
+            self.query_id = query.id
+
+    def tearDown(self) -> None:
+        with Session(engine) as session:
+            session.exec(LiteratureWork.__table__.delete().where(LiteratureWork.query_id == self.query_id))
+            session.exec(TextBlob.__table__.delete().where(TextBlob.content_hash == content_hash(PAPER)))
+            session.exec(LiteratureQuery.__table__.delete().where(LiteratureQuery.id == self.query_id))
+            session.commit()
+
+    def test_full_text_is_deduplicated_compressed_and_pruned(self) -> None:
+        with Session(engine) as session:
+            works = [LiteratureWork(query_id=self.query_id, source="local", title=f"Copy {idx}") for idx in range(2)]
+            for work in works:
+                set_full_text(session, work, PAPER)
+                session.add(work)
+            session.commit()
+            blobs = session.exec(select(TextBlob).where(TextBlob.content_hash == content_hash(PAPER))).all()
+            self.assertEqual(len(blobs), 1)
+            self.assertLess(len(blobs[0].data), len(PAPER) // 10)
+            self.assertEqual(get_texts(session, [works[0].full_text_hash]), {content_hash(PAPER): PAPER})
+            self.assertEqual(works[0].full_text_chars, len(PAPER))
+            work_ids = [work.id for work in works]
+
+        client = TestClient(app)
+        self.assertEqual(client.delete(f"/api/literature/works/{work_ids[0]}").status_code, 200)
+        with Session(engine) as session:
+            self.assertIsNotNone(session.get(TextBlob, content_hash(PAPER)))
+        self.assertEqual(client.delete(f"/api/literature/queries/{self.query_id}").status_code, 200)
+        with Session(engine) as session:
+            self.assertIsNone(session.get(TextBlob, content_hash(PAPER)))
+
+    def test_failed_summary_cancels_the_others(self) -> None:
+        encrypted, salt = prepare_encrypted_secret("passphrase", "sk-test")
+        with Session(engine) as session:
+            credential = ProviderCredential(provider="summaries", api_key_encrypted=encrypted, salt=salt)
+            session.add(credential)
+            session.add_all([
+                LiteratureWork(query_id=self.query_id, source="local", title=f"Paper {idx}", abstract="Hubs.")
+                for idx in range(4)
+            ])
+            session.commit()
+            credential_id = credential.id
+
+        class FailingProvider:
+            def __init__(self) -> None:
+                self.cancelled = 0
+
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                if "Paper 0" in prompt:
+                    await asyncio.sleep(0.01)
+                    raise RuntimeError("summary exploded")
+                try:
+                    await asyncio.sleep(30)
+                except asyncio.CancelledError:
+                    self.cancelled += 1
+                    raise
+                return ProviderResponse(content="summary")
+
+        provider = FailingProvider()
+        payload = {"query_id": self.query_id, "provider": "summaries", "model": "m", "max_docs": 4,
+                   "max_tokens_budget": 100000}
+
+        async def scenario() -> int:
+            with self.assertRaises(RuntimeError):
+                await asyncio.wait_for(_execute_literature_assessment(payload, "passphrase"), 5)
+            # Counted before asyncio.run would cancel any leftover tasks itself.
+            return provider.cancelled
+
+        try:
+            with patch.dict("app.main.PROVIDERS", {"summaries": provider}):
+                self.assertEqual(asyncio.run(scenario()), 3)
+        finally:
+            with Session(engine) as session:
+                session.delete(session.get(ProviderCredential, credential_id))
+                session.commit()
+
+    def test_migration_moves_inline_full_text(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy = create_engine(f"sqlite:///{Path(tmp) / 'legacy.db'}")
+            SQLModel.metadata.create_all(legacy)
+            with Session(legacy) as session:
+                session.exec(text("ALTER TABLE literaturework ADD COLUMN full_text TEXT"))
+                session.exec(text(
+                    "INSERT INTO literaturework (query_id, source, title, full_text, created_at, updated_at) "
+                    "VALUES (1, 'local', 'Old', :paper, '2026-01-01', '2026-01-01')"
+                ).bindparams(paper=PAPER))
+                _move_full_text_to_blobs(session)
+                session.commit()
+                work = session.exec(select(LiteratureWork)).one()
+                self.assertEqual(work.full_text_chars, len(PAPER))
+                self.assertEqual(get_texts(session, [work.full_text_hash]), {content_hash(PAPER): PAPER})
+                inline = session.exec(text("SELECT full_text FROM literaturework")).scalar()
+                self.assertIsNone(inline)
+            legacy.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import unittest
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.db import create_db_and_tables, engine
+from app.main import app
+from app.models import LlmCall
+from app.persistence import write_behind
+from app.providers.accounting import AccountedProvider, llm_scope, report_usage
+from app.providers.base import ProviderError, ProviderResponse
+from app.providers.clients import provider_clients
+from app.providers.openai_provider import OpenAIProvider
+from app.providers.rate_limit import RateLimitedProvider, RateLimiterRegistry
+from app.providers.resilience import CircuitBreakerRegistry, ResilientProvider
+
+
+class UsageProvider:
+    def __init__(self, rate_limited_first: bool = False) -> None:
+        self.rate_limited_first = rate_limited_first
+        self.calls = 0
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        self.calls += 1
+        if self.rate_limited_first and self.calls == 1:
+            raise ProviderError("slow down", status_code=429, retry_after=0.01)
+        if prompt == "boom":
+            raise RuntimeError("provider exploded")
+        return ProviderResponse(content="ok", prompt_tokens=12, completion_tokens=3)
+
+    async def stream(self, prompt: str, model: str, api_key: str):
+        yield "o"
+        report_usage(prompt_tokens=20, completion_tokens=1, cached_tokens=16)
+        yield "k"
+
+
+class LlmAccountingTest(unittest.TestCase):
+    def setUp(self) -> None:
+        create_db_and_tables()
+        self._clear()
+
+    def tearDown(self) -> None:
+        self._clear()
+        engine.dispose()
+
+    def _clear(self) -> None:
+        with Session(engine) as session:
+            session.exec(LlmCall.__table__.delete())
+            session.commit()
+
+    def _calls(self) -> list[LlmCall]:
+        with Session(engine) as session:
+            return session.exec(select(LlmCall).order_by(LlmCall.id)).all()
+
+    def test_records_usage_scope_retries_and_errors(self) -> None:
+        inner = UsageProvider(rate_limited_first=True)
+        limited = RateLimitedProvider("fake", inner, RateLimiterRegistry())
+        provider = AccountedProvider("fake", ResilientProvider("fake", limited, CircuitBreakerRegistry()))
+
+        async def scenario() -> str:
+            with llm_scope(run_id=7, idea_id=70):
+                with llm_scope(stage="pitch"):
+                    await provider.generate("prompt", "m", "key")
+                with llm_scope(stage="design"):
+                    chunks = [chunk async for chunk in provider.stream("prompt", "m", "key")]
+                with llm_scope(stage="council"):
+                    with self.assertRaises(RuntimeError):
+                        await provider.generate("boom", "m", "key")
+            await provider.generate("prompt", "m", "key")
+            await write_behind.flush()
+            return "".join(chunks)
+
+        self.assertEqual(asyncio.run(scenario()), "ok")
+        pitch, design, council, unscoped = self._calls()
+        self.assertEqual((pitch.stage, pitch.run_id, pitch.idea_id), ("pitch", 7, 70))
+        self.assertEqual((pitch.prompt_tokens, pitch.completion_tokens, pitch.retries), (12, 3, 1))
+        self.assertEqual(pitch.status, "ok")
+        self.assertTrue(design.streamed)
+        self.assertEqual((design.prompt_tokens, design.cached_tokens), (20, 16))
+        self.assertEqual((council.status, council.error), ("error", "provider exploded"))
+        self.assertIsNone(unscoped.stage)
+        self.assertIsNone(unscoped.run_id)
+
+    def test_usage_endpoint_aggregates_by_stage(self) -> None:
+        with Session(engine) as session:
+            session.add_all([
+                LlmCall(provider="openai", model="m", stage="design", run_id=1, prompt_tokens=100,
+                        completion_tokens=50, latency_ms=1000),
+                LlmCall(provider="openai", model="m", stage="design", run_id=1, prompt_tokens=100,
+                        completion_tokens=30, latency_ms=3000, retries=2),
+                LlmCall(provider="openai", model="m", stage="pitch", run_id=2, prompt_tokens=10,
+                        completion_tokens=5, latency_ms=500, status="error"),
+            ])
+            session.commit()
+        client = TestClient(app)
+        rows = client.get("/api/llm/usage").json()
+        self.assertEqual([row["stage"] for row in rows], ["design", "pitch"])
+        design = rows[0]
+        self.assertEqual(design["calls"], 2)
+        self.assertEqual(design["total_tokens"], 280)
+        self.assertEqual(design["latency_ms_avg"], 2000)
+        self.assertEqual(design["latency_ms_max"], 3000)
+        self.assertEqual(design["retries"], 2)
+        self.assertEqual(rows[1]["errors"], 1)
+
+        filtered = client.get("/api/llm/usage", params={"group_by": "run_id,stage", "run_id": 2}).json()
+        self.assertEqual(filtered[0]["run_id"], 2)
+        self.assertEqual(len(filtered), 1)
+        self.assertEqual(client.get("/api/llm/usage", params={"group_by": "prompt"}).status_code, 400)
+
+    def test_openai_parses_usage_blocks(self) -> None:
+        chat = {
+            "choices": [{"message": {"content": "hi"}}],
+            "usage": {"prompt_tokens": 40, "completion_tokens": 2, "prompt_tokens_details": {"cached_tokens": 32}},
+        }
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json=chat)
+
+        async def scenario() -> ProviderResponse:
+            provider_clients._clients["openai"] = (
+                httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+                asyncio.get_running_loop(),
+            )
+            try:
+                return await OpenAIProvider().generate("hello", "gpt-4o-mini", "key")
+            finally:
+                await provider_clients.aclose()
+
+        response = asyncio.run(scenario())
+        self.assertEqual((response.prompt_tokens, response.completion_tokens, response.cached_tokens), (40, 2, 32))
+        responses_usage = OpenAIProvider()._usage({"input_tokens": 9, "output_tokens": 4})
+        self.assertEqual(responses_usage["prompt_tokens"], 9)
+        self.assertEqual(responses_usage["completion_tokens"], 4)
+
+    def test_openai_stream_requests_and_reports_usage(self) -> None:
+        events = [
+            {"choices": [{"delta": {"content": "hi"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 8, "completion_tokens": 1}},
+        ]
+        body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        seen: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(json.loads(request.content))
+            return httpx.Response(200, content=body.encode("utf-8"))
+
+        provider = AccountedProvider("openai", OpenAIProvider())
+
+        async def scenario() -> list[str]:
+            provider_clients._clients["openai"] = (
+                httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+                asyncio.get_running_loop(),
+            )
+            try:
+                return [chunk async for chunk in provider.stream("hello", "gpt-4o-mini", "key")]
+            finally:
+                await write_behind.flush()
+                await provider_clients.aclose()
+
+        self.assertEqual(asyncio.run(scenario()), ["hi"])
+        self.assertEqual(seen[0]["stream_options"], {"include_usage": True})
+        (call,) = self._calls()
+        self.assertEqual((call.prompt_tokens, call.completion_tokens), (8, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
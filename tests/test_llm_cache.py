@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, select
+
+from app.db import create_db_and_tables, engine
+from app.models import LlmResponseCache
+from app.persistence import write_behind
+from app.providers.base import ProviderResponse
+from app.providers.cache import CachedProvider, ResponseCache, cache_key
+
+
+class CountingProvider:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.temperature = 0.7
+
+    def generation_params(self, model: str) -> dict:
+        return {"temperature": self.temperature}
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        self.calls += 1
+        return ProviderResponse(content=f"{prompt}#{self.calls}")
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        create_db_and_tables()
+        with Session(engine) as session:
+            session.exec(LlmResponseCache.__table__.delete())
+            session.commit()
+
+    def tearDown(self) -> None:
+        with Session(engine) as session:
+            session.exec(LlmResponseCache.__table__.delete())
+            session.commit()
+        engine.dispose()
+
+    def test_hits_misses_and_bypass(self) -> None:
+        inner = CountingProvider()
+        provider = CachedProvider("fake", inner, ResponseCache(enabled=True))
+
+        async def scenario() -> list[str]:
+            first = await provider.generate("prompt", "m", "key")
+            await write_behind.flush()
+            second = await provider.generate("prompt", "m", "key")
+            bypassed = await provider.generate("prompt", "m", "key", use_cache=False)
+            inner.temperature = 0.2
+            other_params = await provider.generate("prompt", "m", "key")
+            await write_behind.flush()
+            return [first.content, second.content, bypassed.content, other_params.content]
+
+        contents = asyncio.run(scenario())
+        self.assertEqual(contents, ["prompt#1", "prompt#1", "prompt#2", "prompt#3"])
+        self.assertEqual(provider.cache.hits, 1)
+        self.assertEqual(provider.cache.misses, 2)
+        self.assertEqual(provider.cache.stats()["entries"], 2)
+
+    def test_disabled_cache_passes_through(self) -> None:
+        inner = CountingProvider()
+        provider = CachedProvider("fake", inner, ResponseCache(enabled=False))
+        asyncio.run(provider.generate("prompt", "m", "key"))
+        asyncio.run(provider.generate("prompt", "m", "key"))
+        self.assertEqual(inner.calls, 2)
+        self.assertEqual(provider.cache.stats()["entries"], 0)
+
+    def test_lru_and_age_eviction(self) -> None:
+        cache = ResponseCache(enabled=True, max_entries=2, max_age_seconds=60)
+        cache.put("a", "fake", "m", "A")
+        cache.put("b", "fake", "m", "B")
+        self.assertEqual(cache.get("a"), "A")
+        cache.put("c", "fake", "m", "C")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "A")
+
+        with Session(engine) as session:
+            entry = session.exec(select(LlmResponseCache).where(LlmResponseCache.cache_key == "c")).one()
+            entry.created_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+            session.add(entry)
+            session.commit()
+        self.assertIsNone(cache.get("c"))
+
+    def test_byte_limit_eviction(self) -> None:
+        cache = ResponseCache(enabled=True, max_bytes=10)
+        cache.put("a", "fake", "m", "x" * 6)
+        cache.put("b", "fake", "m", "y" * 6)
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.get("b"), "y" * 6)
+
+    def test_sweep_runs_only_past_a_limit_or_the_interval(self) -> None:
+        cache = ResponseCache(enabled=True, max_entries=3)
+        sweeps: list[int] = []
+        evict = cache._evict
+        cache._evict = lambda session, now: (sweeps.append(1), evict(session, now))
+        for key in "abc":
+            cache.put(key, "fake", "m", key)
+        # The first put loads the totals and sweeps once; the next ones stay under the limits.
+        self.assertEqual(len(sweeps), 1)
+        cache.put("d", "fake", "m", "d")
+        self.assertEqual((len(sweeps), cache.stats()["entries"]), (2, 3))
+        cache._next_evict = 0.0
+        cache.put("a", "fake", "m", "A")
+        self.assertEqual(len(sweeps), 3)
+
+    def test_key_covers_provider_model_prompt_and_params(self) -> None:
+        base = cache_key("openai", "m", "p", {"temperature": 0.7})
+        self.assertEqual(base, cache_key("openai", "m", "p", {"temperature": 0.7}))
+        self.assertNotEqual(base, cache_key("anthropic", "m", "p", {"temperature": 0.7}))
+        self.assertNotEqual(base, cache_key("openai", "m2", "p", {"temperature": 0.7}))
+        self.assertNotEqual(base, cache_key("openai", "m", "p2", {"temperature": 0.7}))
+        self.assertNotEqual(base, cache_key("openai", "m", "p", {"temperature": 0.2}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,533 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.crypto import prepare_encrypted_secret
+from app.db import create_db_and_tables, engine
+from app.models import (
+    AgentMemo,
+    CouncilMemo,
+    CouncilRound,
+    DossierKind,
+    DossierPart,
+    GateResult,
+    GateStatus,
+    Idea,
+    Job,
+    LiteratureAssessment,
+    LlmCall,
+    LlmResponseCache,
+    ProviderCredential,
+    Run,
+    RunStatus,
+)
+from app.main import app
+from app.orchestrator import pending_stages, run_swarm
+from app.persistence import write_behind
+from app.prompts import PITCH_BATCH_MARKER
+from app.structured import SCORE_FIELDS
+from app.providers.accounting import AccountedProvider
+from app.providers.cache import CachedProvider, ResponseCache
+from app.providers.base import ProviderResponse, conversation, response_schema
+
+VALID_PITCH = "\n".join([
+    "LANE_PRIMARY: Sanctions, Enforcement, and Evasion Ecosystems",
+    "BREAKTHROUGH_TYPE: mechanism",
+    "WHY_THIS_IS_BREAKTHROUGH: Reframes evasion as a network good.",
+    "Working title: Evasion Hubs",
+    "One-sentence big claim: Evasion concentrates in a few hubs.",
+])
+
+
+class FakeProvider:
+    def __init__(self, delay: float = 0.01, fail_on: str | None = None) -> None:
+        self.delay = delay
+        self.fail_on = fail_on
+        self.calls: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        self.calls.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("provider exploded")
+        if "Produce a single idea dossier PITCH.md" in prompt:
+            return ProviderResponse(content=VALID_PITCH)
+        if "Produce five council memos" in prompt:
+            return ProviderResponse(content="Referee A\nVerdict: revise\n---\nReferee B\nVerdict: revise")
+        return ProviderResponse(content="Section content")
+
+
+class RunSwarmTest(unittest.TestCase):
+    passphrase = "test-passphrase"
+
+    def setUp(self) -> None:
+        create_db_and_tables()
+        encrypted, salt = prepare_encrypted_secret(self.passphrase, "sk-test")
+        with Session(engine) as session:
+            credential = ProviderCredential(provider="fake", api_key_encrypted=encrypted, salt=salt)
+            session.add(credential)
+            run = Run(provider="fake", model="fake-model", idea_count=1)
+            session.add(run)
+            session.commit()
+            session.refresh(credential)
+            session.refresh(run)
+            self.credential_id = credential.id
+            self.run_id = run.id
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self.tmp_dir.name)
+
+    def tearDown(self) -> None:
+        with Session(engine) as session:
+            idea_ids = [idea.id for idea in session.exec(select(Idea).where(Idea.run_id == self.run_id)).all()]
+            for model in (DossierPart, GateResult, CouncilMemo, CouncilRound):
+                session.exec(model.__table__.delete().where(model.idea_id.in_(idea_ids)))
+            session.exec(AgentMemo.__table__.delete().where(AgentMemo.run_id == self.run_id))
+            session.exec(LlmCall.__table__.delete().where(LlmCall.run_id == self.run_id))
+            session.exec(Idea.__table__.delete().where(Idea.run_id == self.run_id))
+            session.exec(Run.__table__.delete().where(Run.id == self.run_id))
+            session.exec(Job.__table__.delete().where(Job.kind == "run_swarm"))
+            session.exec(ProviderCredential.__table__.delete().where(ProviderCredential.id == self.credential_id))
+            session.exec(
+                LiteratureAssessment.__table__.delete().where(
+                    LiteratureAssessment.query_id == self.run_id + 10_000
+                )
+            )
+            session.commit()
+        engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def _update_run(self, **fields) -> None:
+        with Session(engine) as session:
+            run = session.get(Run, self.run_id)
+            for key, value in fields.items():
+                setattr(run, key, value)
+            session.add(run)
+            session.commit()
+
+    def _run(self, provider: FakeProvider) -> Run:
+        with patch.dict("app.orchestrator.PROVIDERS", {"fake": provider}):
+            asyncio.run(run_swarm(self.run_id, self.passphrase, self.base_dir))
+        with Session(engine) as session:
+            return session.get(Run, self.run_id)
+
+    def test_dossier_stages_run_concurrently(self) -> None:
+        provider = FakeProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        self.assertEqual(len(provider.calls), 6)
+        self.assertEqual(provider.max_in_flight, 5)
+        with Session(engine) as session:
+            idea = session.exec(select(Idea).where(Idea.run_id == self.run_id)).one()
+            parts = session.exec(select(DossierPart).where(DossierPart.idea_id == idea.id)).all()
+            memos = session.exec(select(CouncilMemo).where(CouncilMemo.idea_id == idea.id)).all()
+        self.assertEqual(idea.title, "Evasion Hubs")
+        self.assertEqual(len(parts), 5)
+        self.assertFalse(any(part.partial for part in parts))
+        self.assertEqual(len(memos), 2)
+
+    def test_ideas_run_in_parallel_under_concurrency_limit(self) -> None:
+        self._update_run(idea_count=4, concurrency=2)
+        provider = FakeProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        self.assertEqual(len(provider.calls), 24)
+        self.assertEqual(provider.max_in_flight, 10)
+
+    def test_failed_idea_does_not_fail_run(self) -> None:
+        with Session(engine) as session:
+            assessment = LiteratureAssessment(
+                query_id=self.run_id + 10_000,
+                content="## Idea prompts\n- boom\n- fine\n",
+            )
+            session.add(assessment)
+            session.commit()
+        self._update_run(
+            idea_count=2,
+            concurrency=2,
+            literature_query_id=self.run_id + 10_000,
+            use_assessment_seeds=True,
+        )
+        provider = FakeProvider(fail_on="Idea seed: boom")
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed)
+        self.assertIn("provider exploded", run.log)
+        with Session(engine) as session:
+            ideas = session.exec(
+                select(Idea).where(Idea.run_id == self.run_id).order_by(Idea.id)
+            ).all()
+        self.assertEqual([idea.status for idea in ideas], ["failed", None])
+        self.assertEqual(ideas[1].title, "Evasion Hubs")
+
+    def test_resumed_run_only_regenerates_unfinished_ideas(self) -> None:
+        self._update_run(idea_count=2, status=RunStatus.running)
+        with Session(engine) as session:
+            done, interrupted = Idea(run_id=self.run_id, title="Rejected"), Idea(run_id=self.run_id)
+            session.add_all([done, interrupted])
+            session.commit()
+            session.add(GateResult(idea_id=done.id, gate=1, status=GateStatus.failed))
+            session.add(GateResult(idea_id=interrupted.id, gate=1, status=GateStatus.passed))
+            session.add(DossierPart(idea_id=interrupted.id, kind=DossierKind.design, content="half", partial=True))
+            session.commit()
+            done_id, interrupted_id = done.id, interrupted.id
+
+        provider = FakeProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        self.assertEqual(len(provider.calls), 6)
+        with Session(engine) as session:
+            self.assertEqual(session.get(Idea, done_id).title, "Rejected")
+            self.assertEqual(len(session.exec(select(Idea).where(Idea.run_id == self.run_id)).all()), 2)
+            parts = session.exec(select(DossierPart).where(DossierPart.idea_id == interrupted_id)).all()
+        self.assertEqual(len(parts), 5)
+        self.assertFalse(any(part.partial for part in parts))
+
+    def test_resumed_run_fails_when_every_rerun_idea_fails(self) -> None:
+        self._update_run(idea_count=2, status=RunStatus.running)
+        with Session(engine) as session:
+            done, interrupted = Idea(run_id=self.run_id, title="Rejected"), Idea(run_id=self.run_id)
+            session.add_all([done, interrupted])
+            session.commit()
+            session.add(GateResult(idea_id=done.id, gate=1, status=GateStatus.failed))
+            session.add(GateResult(idea_id=interrupted.id, gate=1, status=GateStatus.passed))
+            session.commit()
+
+        run = self._run(FakeProvider(fail_on="Produce five council memos"))
+        self.assertEqual(run.status, RunStatus.failed)
+        self.assertIn("provider exploded", run.log)
+
+    def test_resume_endpoint_reruns_only_missing_stages(self) -> None:
+        failed = self._run(FakeProvider(fail_on="Produce five council memos"))
+        self.assertEqual(failed.status, RunStatus.failed)
+        self.assertIn("provider exploded", failed.log)
+
+        client = TestClient(app)
+        app.state.passphrase = self.passphrase
+        try:
+            response = client.post(f"/api/runs/{self.run_id}/resume")
+            conflict = client.post(f"/api/runs/{self.run_id}/resume")
+        finally:
+            app.state.passphrase = None
+        self.assertEqual(response.status_code, 200)
+        (stages,) = response.json()["pending_stages"].values()
+        self.assertEqual(stages, ["council"])
+        self.assertIsNotNone(response.json()["job_id"])
+        self.assertEqual(conflict.status_code, 409)
+
+        provider = FakeProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        self.assertEqual(len(provider.calls), 1)
+        with Session(engine) as session:
+            idea = session.exec(select(Idea).where(Idea.run_id == self.run_id)).one()
+            parts = session.exec(select(DossierPart).where(DossierPart.idea_id == idea.id)).all()
+            rounds = session.exec(select(CouncilRound).where(CouncilRound.idea_id == idea.id)).all()
+        self.assertIsNone(idea.status)
+        self.assertEqual(len(parts), 5)
+        self.assertEqual([council_round.status for council_round in rounds], ["generated"])
+
+    def test_gate1_failure_is_repaired_with_a_fill_only_call(self) -> None:
+        class MissingHeaderProvider(FakeProvider):
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                if "Return only these lines" in prompt:
+                    self.calls.append(prompt)
+                    return ProviderResponse(content="BREAKTHROUGH_TYPE: mechanism")
+                response = await super().generate(prompt, model, api_key)
+                if response.content == VALID_PITCH:
+                    response.content = VALID_PITCH.replace("BREAKTHROUGH_TYPE: mechanism\n", "")
+                return response
+
+        provider = MissingHeaderProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        self.assertEqual(len(provider.calls), 7)
+        self.assertFalse(any("CRITICAL FIX" in call for call in provider.calls))
+        with Session(engine) as session:
+            idea = session.exec(select(Idea).where(Idea.run_id == self.run_id)).one()
+        self.assertEqual(idea.breakthrough_type, "mechanism")
+
+    def test_structured_output_mode_renders_pitch_and_council(self) -> None:
+        self._update_run(structured_output=True)
+
+        class JsonProvider(FakeProvider):
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                schema = response_schema(prompt)
+                if schema is None:
+                    return await super().generate(prompt, model, api_key)
+                self.calls.append(prompt)
+                if schema["name"] == "pitch":
+                    return ProviderResponse(content=json.dumps({
+                        "lane_primary": "Sanctions, Enforcement, and Evasion Ecosystems",
+                        "lane_secondary": "",
+                        "breakthrough_type": "mechanism",
+                        "why_this_is_breakthrough": "Reframes evasion as a network good.",
+                        "working_title": "Structured Hubs",
+                        "big_claim": "Evasion concentrates in a few hubs.",
+                        "body": "Theoretical puzzle: why hubs?",
+                    }))
+                memo = {
+                    "verdict": "revise",
+                    "strengths": ["Clear"],
+                    "fatal_flaws": ["Thin"],
+                    "required_revisions": ["More data"],
+                    "scores": {key: 7 for key in SCORE_FIELDS},
+                }
+                return ProviderResponse(content=json.dumps({"memos": [
+                    {**memo, "referee": "Referee A"},
+                    {**memo, "referee": "Referee B"},
+                ]}))
+
+        provider = JsonProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        self.assertEqual(len(provider.calls), 6)
+        with Session(engine) as session:
+            idea = session.exec(select(Idea).where(Idea.run_id == self.run_id)).one()
+            memos = session.exec(select(CouncilMemo).where(CouncilMemo.idea_id == idea.id)).all()
+        self.assertEqual(idea.title, "Structured Hubs")
+        self.assertEqual(len(memos), 2)
+        self.assertIn("Lane Fit: 7/10", memos[0].content)
+
+    def test_damaged_structured_council_is_repaired_without_a_second_call(self) -> None:
+        self._update_run(structured_output=True)
+
+        class DamagedJsonProvider(FakeProvider):
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                schema = response_schema(prompt)
+                if schema is None or schema["name"] != "council":
+                    return await super().generate(prompt, model, api_key)
+                self.calls.append(prompt)
+                memo = {
+                    "verdict": "revise",
+                    "strengths": ["Clear"],
+                    "fatal_flaws": ["Thin"],
+                    "required_revisions": ["More data"],
+                    "scores": {key: 7 for key in SCORE_FIELDS},
+                }
+                text = json.dumps({"memos": [
+                    {**memo, "referee": "Referee A"},
+                    {**memo, "referee": "Referee B"},
+                ]})
+                # Fenced, with a trailing comma, and cut off inside the second memo.
+                return ProviderResponse(content="```json\n" + text.replace('"Clear"]', '"Clear",]')[:-60])
+
+        provider = DamagedJsonProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        council_calls = [call for call in provider.calls if (response_schema(call) or {}).get("name") == "council"]
+        self.assertEqual(len(council_calls), 1)
+        self.assertFalse(any("Produce five council memos" in call and response_schema(call) is None
+                             for call in provider.calls))
+        with Session(engine) as session:
+            idea = session.exec(select(Idea).where(Idea.run_id == self.run_id)).one()
+            memos = session.exec(select(CouncilMemo).where(CouncilMemo.idea_id == idea.id)).all()
+        self.assertEqual([memo.referee for memo in memos], ["Referee A"])
+        self.assertIn("Required revisions:\n- More data", memos[0].content)
+
+    def test_stage_writes_are_batched(self) -> None:
+        self._update_run(idea_count=3, concurrency=3)
+        batches = write_behind.batches
+        commits: list[int] = []
+
+        def count(connection) -> None:
+            commits.append(1)
+
+        event.listen(engine, "commit", count)
+        try:
+            run = self._run(AccountedProvider("fake", FakeProvider()))
+        finally:
+            event.remove(engine, "commit", count)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        # Roughly twenty stage writes and six call rows per idea land in a handful
+        # of shared transactions.
+        self.assertLessEqual(write_behind.batches - batches, 6)
+        # Those batches plus the run's own status and idea bookkeeping, not one
+        # commit per write or per call.
+        self.assertLessEqual(len(commits), 10)
+        with Session(engine) as session:
+            calls = session.exec(select(LlmCall).where(LlmCall.run_id == self.run_id)).all()
+        self.assertEqual(len(calls), 18)
+        with Session(engine) as session:
+            ideas = session.exec(select(Idea).where(Idea.run_id == self.run_id)).all()
+            for idea in ideas:
+                self.assertEqual(pending_stages(session, idea.id), [])
+
+    def test_chained_mode_continues_the_pitch_conversation(self) -> None:
+        self._update_run(chained=True)
+
+        class ChainProvider(FakeProvider):
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                chained = conversation(prompt)
+                if chained is None:
+                    response = await super().generate(prompt, model, api_key)
+                    return ProviderResponse(content=response.content, response_id="resp_pitch")
+                self.calls.append(prompt)
+                history, message = chained
+                if "council memos" in message:
+                    return ProviderResponse(content="Referee A\nVerdict: revise")
+                return ProviderResponse(content="Section content")
+
+        provider = ChainProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        followups = [conversation(call) for call in provider.calls if conversation(call)]
+        self.assertEqual(len(followups), 5)
+        for history, message in followups:
+            self.assertEqual(history.previous_response_id, "resp_pitch")
+            self.assertEqual(history.turns[0][1], VALID_PITCH)
+            self.assertTrue(message.startswith("Building on the pitch above"))
+            self.assertNotIn("Lane catalog", message)
+
+    def test_batched_pitches_fall_back_to_single_calls_for_failures(self) -> None:
+        self._update_run(idea_count=3, concurrency=3, pitch_batch_size=3)
+
+        class BatchProvider(FakeProvider):
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                if "distinct PITCH.md dossiers" in prompt:
+                    self.calls.append(prompt)
+                    # Out of order, and pitch 2 is missing: only idea 2 needs its own call.
+                    return ProviderResponse(content="\n".join([
+                        PITCH_BATCH_MARKER.format(index=3),
+                        VALID_PITCH.replace("Evasion Hubs", "Third"),
+                        PITCH_BATCH_MARKER.format(index=1),
+                        VALID_PITCH.replace("Evasion Hubs", "First"),
+                    ]))
+                return await super().generate(prompt, model, api_key)
+
+        provider = BatchProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        pitch_calls = [call for call in provider.calls if "PITCH.md" in call]
+        self.assertEqual(len(pitch_calls), 2)
+        self.assertIn("Produce 3 distinct PITCH.md dossiers", pitch_calls[0])
+        self.assertEqual(len(provider.calls), 2 + 3 * 5)
+        with Session(engine) as session:
+            ideas = session.exec(select(Idea).where(Idea.run_id == self.run_id).order_by(Idea.id)).all()
+        self.assertEqual([idea.title for idea in ideas], ["First", "Evasion Hubs", "Third"])
+
+    def test_funnel_expands_only_top_scoring_candidates(self) -> None:
+        self._update_run(idea_count=1, candidate_count=3)
+        sections = "\n".join([
+            "Theoretical puzzle + stakes: why hubs matter.",
+            "Predictions: a disconfirming pattern is uniform evasion.",
+            "Design family: DiD around designation shocks.",
+            "Novelty statement: new.",
+            "Kill criteria: no concentration.",
+        ])
+        full_pitch = VALID_PITCH + "\n" + sections
+
+        class FunnelProvider(FakeProvider):
+            # Every candidate follows the template, so only the judge can rank them.
+            pitches = [full_pitch, full_pitch.replace("Evasion Hubs", "Strong Idea"), full_pitch]
+
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                if "Produce a single idea dossier PITCH.md" in prompt:
+                    self.calls.append(prompt)
+                    return ProviderResponse(content=self.pitches.pop(0))
+                if "screening referee" in prompt:
+                    self.calls.append(prompt)
+                    score = 9 if "Strong Idea" in prompt else 6
+                    return ProviderResponse(content="\n".join(
+                        f"{label}: {score}/10" for label in SCORE_FIELDS.values()
+                    ))
+                return await super().generate(prompt, model, api_key)
+
+        provider = FunnelProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        self.assertEqual(len(provider.calls), 3 + 3 + 5)
+        with Session(engine) as session:
+            ideas = session.exec(select(Idea).where(Idea.run_id == self.run_id).order_by(Idea.id)).all()
+            expanded = {part.idea_id for part in session.exec(
+                select(DossierPart).where(DossierPart.kind == DossierKind.design)
+            ).all()}
+        self.assertEqual([idea.status for idea in ideas], ["screened_out", None, "screened_out"])
+        self.assertGreater(ideas[1].screen_score, ideas[0].screen_score)
+        self.assertEqual(expanded & {idea.id for idea in ideas}, {ideas[1].id})
+        with Session(engine) as session:
+            self.assertEqual(pending_stages(session, ideas[0].id), [])
+
+    def test_response_cache_keeps_ideas_distinct(self) -> None:
+        self._update_run(idea_count=3)
+
+        class NumberingProvider(FakeProvider):
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                response = await super().generate(prompt, model, api_key)
+                if "Produce a single idea dossier PITCH.md" in prompt:
+                    pitches = sum("Produce a single idea dossier PITCH.md" in call for call in self.calls)
+                    response.content = VALID_PITCH.replace("Evasion Hubs", f"Idea {pitches}")
+                return response
+
+        inner = NumberingProvider()
+        try:
+            run = self._run(CachedProvider("fake", inner, ResponseCache(enabled=True)))
+        finally:
+            with Session(engine) as session:
+                session.exec(LlmResponseCache.__table__.delete().where(LlmResponseCache.provider == "fake"))
+                session.commit()
+        self.assertEqual(run.status, RunStatus.completed, run.log)
+        self.assertEqual(len(inner.calls), 3 * 6)
+        with Session(engine) as session:
+            ideas = session.exec(select(Idea).where(Idea.run_id == self.run_id).order_by(Idea.id)).all()
+        self.assertEqual(sorted(idea.title for idea in ideas), ["Idea 1", "Idea 2", "Idea 3"])
+
+    def test_token_budget_stops_run_and_keeps_partial_ideas(self) -> None:
+        self._update_run(idea_count=2, concurrency=1, max_tokens=50)
+
+        class MeteredProvider(FakeProvider):
+            async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+                response = await super().generate(prompt, model, api_key)
+                response.prompt_tokens, response.completion_tokens = 40, 20
+                return response
+
+        provider = MeteredProvider()
+        run = self._run(AccountedProvider("fake", provider))
+        self.assertEqual(run.status, RunStatus.budget_exhausted)
+        self.assertIn("Token budget", run.log)
+        self.assertEqual(len(provider.calls), 1)
+        with Session(engine) as session:
+            ideas = session.exec(select(Idea).where(Idea.run_id == self.run_id).order_by(Idea.id)).all()
+        self.assertEqual([idea.title for idea in ideas], ["Evasion Hubs", None])
+        self.assertEqual([idea.status for idea in ideas], [None, None])
+
+    def test_deadline_cancels_in_flight_calls(self) -> None:
+        self._update_run(deadline_seconds=1)
+        provider = FakeProvider(delay=30)
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.budget_exhausted)
+        self.assertIn("Deadline", run.log)
+        self.assertEqual(provider.in_flight, 0)
+
+    def test_cancel_endpoint(self) -> None:
+        client = TestClient(app)
+        response = client.post(f"/api/runs/{self.run_id}/cancel")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], RunStatus.cancelled)
+        self.assertEqual(client.post(f"/api/runs/{self.run_id}/cancel").status_code, 409)
+
+        provider = FakeProvider()
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.cancelled)
+        self.assertEqual(provider.calls, [])
+
+        self._update_run(status=RunStatus.running)
+        run = self._run(provider)
+        self.assertEqual(run.status, RunStatus.cancelled)
+        self.assertEqual(provider.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
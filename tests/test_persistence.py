@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from sqlmodel import Session
+
+from app.db import create_db_and_tables, engine
+from app.models import Run
+from app.persistence import WriteBehind
+
+
+class WriteBehindTest(unittest.TestCase):
+    def setUp(self) -> None:
+        create_db_and_tables()
+        self.run_ids: list[int] = []
+
+    def tearDown(self) -> None:
+        with Session(engine) as session:
+            session.exec(Run.__table__.delete().where(Run.id.in_(self.run_ids)))
+            session.commit()
+
+    @staticmethod
+    def _add_run(session: Session) -> int:
+        # Ids are only recorded from resolved futures: a rolled-back attempt
+        # flushes ids that SQLite hands out again.
+        run = Run(provider="fake", model="fake-model", idea_count=1)
+        session.add(run)
+        session.flush()
+        return run.id
+
+    def test_coalesces_writes_into_one_transaction(self) -> None:
+        writer = WriteBehind(max_delay=0.05)
+
+        async def scenario() -> list:
+            futures = [writer.submit(self._add_run) for _ in range(5)]
+            return await asyncio.gather(*futures)
+
+        ids = asyncio.run(scenario())
+        self.run_ids.extend(ids)
+        self.assertEqual(writer.batches, 1)
+        self.assertEqual(writer.writes, 5)
+        with Session(engine) as session:
+            self.assertTrue(all(session.get(Run, run_id) for run_id in ids))
+
+    def test_failed_write_does_not_sink_the_batch(self) -> None:
+        writer = WriteBehind(max_delay=0.05)
+
+        def broken(session: Session) -> None:
+            raise RuntimeError("bad row")
+
+        async def scenario() -> list:
+            futures = [writer.submit(self._add_run), writer.submit(broken), writer.submit(self._add_run)]
+            return await asyncio.gather(*futures, return_exceptions=True)
+
+        first, error, last = asyncio.run(scenario())
+        self.run_ids.extend([first, last])
+        self.assertIsInstance(error, RuntimeError)
+        with Session(engine) as session:
+            self.assertIsNotNone(session.get(Run, first))
+            self.assertIsNotNone(session.get(Run, last))
+
+    def test_stop_drains_queued_writes(self) -> None:
+        writer = WriteBehind(max_delay=0.2)
+
+        async def scenario() -> asyncio.Future:
+            future = writer.submit(self._add_run)
+            await writer.stop()
+            return future
+
+        future = asyncio.run(scenario())
+        self.run_ids.append(future.result())
+        self.assertEqual(writer.snapshot()["pending"], 0)
+        self.assertIsNone(writer._writer)
+        with Session(engine) as session:
+            self.assertIsNotNone(session.get(Run, future.result()))
+
+
+if __name__ == "__main__":
+    unittest.main()
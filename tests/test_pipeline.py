@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+
+from app.pipeline import Stage, StageGraph
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.started: list[str] = []
+        self.persisted: dict[str, object] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+def _stage(name: str, inputs: tuple[str, ...] = (), fail: bool = False, gate=None) -> Stage:
+    async def run(ctx: Recorder, upstream: dict) -> str:
+        ctx.started.append(name)
+        ctx.in_flight += 1
+        ctx.max_in_flight = max(ctx.max_in_flight, ctx.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            ctx.in_flight -= 1
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        return "+".join([name, *sorted(str(value) for value in upstream.values())])
+
+    def persist(ctx: Recorder, output: str) -> None:
+        ctx.persisted[name] = output
+
+    return Stage(name, run, inputs=inputs, persist=persist, gate=gate)
+
+
+class StageGraphTest(unittest.TestCase):
+    def test_ready_stages_run_concurrently_and_receive_inputs(self) -> None:
+        graph = StageGraph([
+            _stage("b", ("a",)),
+            _stage("c", ("a",)),
+            _stage("d", ("a",)),
+            _stage("a"),
+            _stage("e", ("b", "c", "d")),
+        ])
+        ctx = Recorder()
+        result = asyncio.run(graph.run(ctx))
+        self.assertEqual(ctx.started[0], "a")
+        self.assertEqual(ctx.started[-1], "e")
+        self.assertEqual(ctx.max_in_flight, 3)
+        self.assertEqual(result.outputs["e"], "e+b+a+c+a+d+a")
+        self.assertEqual(set(ctx.persisted), {"a", "b", "c", "d", "e"})
+
+    def test_closed_gate_skips_downstream(self) -> None:
+        graph = StageGraph([
+            _stage("pitch"),
+            _stage("gate", ("pitch",), gate=lambda output: False),
+            _stage("design", ("gate",)),
+        ])
+        ctx = Recorder()
+        result = asyncio.run(graph.run(ctx))
+        self.assertEqual(ctx.started, ["pitch", "gate"])
+        self.assertEqual(result.skipped, ["design"])
+        self.assertEqual(result.errors, {})
+
+    def test_failure_keeps_sibling_outputs(self) -> None:
+        graph = StageGraph([
+            _stage("a"),
+            _stage("ok", ("a",)),
+            _stage("boom", ("a",), fail=True),
+            _stage("final", ("ok", "boom")),
+        ])
+        ctx = Recorder()
+        result = asyncio.run(graph.run(ctx))
+        self.assertIn("ok", ctx.persisted)
+        self.assertEqual(list(result.errors), ["boom"])
+        self.assertEqual(result.skipped, ["final"])
+
+    def test_completed_stages_are_not_rerun(self) -> None:
+        graph = StageGraph([_stage("a"), _stage("b", ("a",)), _stage("c", ("a",))])
+        ctx = Recorder()
+        result = asyncio.run(graph.run(ctx, completed={"a": "restored", "b": "done"}))
+        self.assertEqual(ctx.started, ["c"])
+        self.assertEqual(result.outputs["c"], "c+restored")
+
+    def test_invalid_graphs_are_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            StageGraph([_stage("a", ("b",)), _stage("b", ("a",))])
+        with self.assertRaises(ValueError):
+            StageGraph([_stage("a", ("missing",))])
+        with self.assertRaises(ValueError):
+            StageGraph([_stage("a"), _stage("a")])
+
+
+if __name__ == "__main__":
+    unittest.main()
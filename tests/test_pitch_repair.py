@@ -0,0 +1,48 @@
+import unittest
+
+from app.orchestrator import _gate1_status
+from app.models import GateStatus
+from app.pitch_repair import fill_headers, repair_pitch
+from app.prompts import build_header_fill_prompt
+
+
+class PitchRepairTest(unittest.TestCase):
+    def test_normalizes_decorated_headers(self) -> None:
+        pitch = "\n".join([
+            "**Lane primary:** Sanctions, Enforcement, and Evasion Ecosystems",
+            "- _Breakthrough type_: mechanism",
+            "## Why this is a breakthrough",
+            "Reframes evasion as a network good.",
+            "",
+            "Working title: Evasion Hubs",
+        ])
+        repaired, missing = repair_pitch(pitch)
+        self.assertEqual(missing, [])
+        self.assertEqual(_gate1_status(repaired)[0], GateStatus.passed)
+        self.assertTrue(repaired.startswith("LANE_PRIMARY: Sanctions, Enforcement, and Evasion Ecosystems\n"))
+        self.assertIn("WHY_THIS_IS_BREAKTHROUGH: Reframes evasion as a network good.", repaired)
+        self.assertEqual(repaired.count("Reframes evasion"), 1)
+        self.assertIn("Working title: Evasion Hubs", repaired)
+
+    def test_extracts_lane_and_why_from_body(self) -> None:
+        pitch = "\n".join([
+            "Working title: Conditionality Cascades",
+            "This idea sits in Debt, IMF Conditionality, and Crisis Politics.",
+            "Novelty statement: First measure of conditionality spillovers.",
+            "Kill criteria: no spillovers.",
+        ])
+        repaired, missing = repair_pitch(pitch)
+        self.assertEqual(missing, ["BREAKTHROUGH_TYPE"])
+        self.assertIn("LANE_PRIMARY: Debt, IMF Conditionality, and Crisis Politics", repaired)
+        self.assertIn("WHY_THIS_IS_BREAKTHROUGH: First measure of conditionality spillovers.", repaired)
+
+        prompt = build_header_fill_prompt(repaired, missing)
+        self.assertIn("BREAKTHROUGH_TYPE: <value>", prompt)
+        self.assertNotIn("Lane catalog", prompt)
+        filled, missing = fill_headers(repaired, "Sure!\nBreakthrough type: new measurement")
+        self.assertEqual(missing, [])
+        self.assertEqual(_gate1_status(filled)[0], GateStatus.passed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from app.prompts import build_council_prompt_with_dossier, build_prompt, build_review_prompt
+from app.providers.anthropic_provider import AnthropicProvider
+from app.providers.base import split_prompt
+from app.providers.clients import provider_clients
+from app.providers.gemini_provider import GeminiProvider
+from app.providers.openai_provider import OpenAIProvider
+
+
+def _with_mock_client(provider_name: str, handler, coro_factory):
+    async def scenario():
+        provider_clients._clients[provider_name] = (
+            httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            asyncio.get_running_loop(),
+        )
+        try:
+            return await coro_factory()
+        finally:
+            await provider_clients.aclose()
+
+    return asyncio.run(scenario())
+
+
+class PromptPrefixTest(unittest.TestCase):
+    def test_stage_prompts_share_prefix(self) -> None:
+        design = build_prompt("design", "sanctions", "Assessment text", "seed")
+        council = build_prompt("council", "sanctions", "Assessment text", "seed")
+        self.assertEqual(design.prefix, council.prefix)
+        self.assertIn("Assessment text", design.prefix)
+        self.assertTrue(design.startswith(design.prefix))
+        _, suffix = split_prompt(design)
+        self.assertTrue(suffix.startswith("Idea seed: seed"))
+        self.assertEqual(split_prompt("plain"), ("", "plain"))
+
+    def test_council_with_dossier_keeps_prefix(self) -> None:
+        prompt = build_council_prompt_with_dossier({"PITCH": "Pitch body"}, "trade")
+        self.assertEqual(prompt.prefix, build_prompt("council", "trade").prefix)
+        self.assertIn("## PITCH\nPitch body", prompt)
+
+    def test_review_personas_share_prefix(self) -> None:
+        kwargs = dict(
+            review_type="paper",
+            level=None,
+            title="Paper",
+            domain="IPE",
+            method_family="DiD",
+            language="en",
+            sections=[{"section_id": "S1", "title": "Intro", "page_start": 1, "page_end": 1, "excerpt": "x"}],
+        )
+        first = build_review_prompt(persona="identification", **kwargs)
+        second = build_review_prompt(persona="theory", **kwargs)
+        self.assertEqual(first.prefix, second.prefix)
+        self.assertIn("S1 Intro", first.prefix)
+        self.assertNotEqual(first, second)
+
+
+class ProviderPrefixCachingTest(unittest.TestCase):
+    def test_anthropic_marks_prefix_with_cache_control(self) -> None:
+        prompt = build_prompt("design", "sanctions")
+        payload = AnthropicProvider()._payload(prompt, "claude")
+        blocks = payload["messages"][0]["content"]
+        self.assertEqual(blocks[0]["text"], prompt.prefix)
+        self.assertEqual(blocks[0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(blocks[0]["text"] + blocks[1]["text"], str(prompt))
+        self.assertEqual(AnthropicProvider()._payload("plain", "claude")["messages"][0]["content"], "plain")
+
+    def test_openai_sends_stable_prompt_cache_key(self) -> None:
+        provider = OpenAIProvider()
+        _, first = provider._request(build_prompt("design", "x"), "gpt-4o-mini")
+        _, second = provider._request(build_prompt("data", "x"), "gpt-4o-mini")
+        self.assertEqual(first["prompt_cache_key"], second["prompt_cache_key"])
+        self.assertEqual(first["messages"][0]["role"], "system")
+        _, plain = provider._request("plain", "gpt-4o-mini")
+        self.assertNotIn("prompt_cache_key", plain)
+
+    def test_gemini_reuses_cached_contents(self) -> None:
+        requests: list[tuple[str, dict]] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            requests.append((request.url.path, body))
+            if request.url.path.endswith("/cachedContents"):
+                return httpx.Response(200, json={"name": "cachedContents/abc"})
+            return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "ok"}]}}]})
+
+        provider = GeminiProvider()
+
+        async def calls():
+            await provider.generate(build_prompt("design", "x"), "gemini-2.5-flash", "key")
+            await provider.generate(build_prompt("data", "x"), "gemini-2.5-flash", "key")
+
+        with patch.dict(os.environ, {"CODEX_COUNCIL_GEMINI_CACHE_MIN_CHARS": "10"}):
+            _with_mock_client("gemini", handler, calls)
+        paths = [path for path, _ in requests]
+        self.assertEqual(sum(path.endswith("/cachedContents") for path in paths), 1)
+        generate_bodies = [body for path, body in requests if path.endswith(":generateContent")]
+        self.assertEqual(len(generate_bodies), 2)
+        for body in generate_bodies:
+            self.assertEqual(body["cachedContent"], "cachedContents/abc")
+            self.assertNotIn("Lane catalog", body["contents"][0]["parts"][0]["text"])
+
+    def test_gemini_falls_back_inline_when_cache_refused(self) -> None:
+        requests: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request.url.path)
+            if request.url.path.endswith("/cachedContents"):
+                return httpx.Response(400, json={"error": {"message": "too small"}})
+            body = json.loads(request.content)
+            self.assertNotIn("cachedContent", body)
+            return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "ok"}]}}]})
+
+        provider = GeminiProvider()
+
+        async def calls():
+            await provider.generate(build_prompt("design", "x"), "gemini-2.5-flash", "key")
+            await provider.generate(build_prompt("data", "x"), "gemini-2.5-flash", "key")
+
+        with patch.dict(os.environ, {"CODEX_COUNCIL_GEMINI_CACHE_MIN_CHARS": "10"}):
+            _with_mock_client("gemini", handler, calls)
+        self.assertEqual(sum(path.endswith("/cachedContents") for path in requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import unittest
+
+import httpx
+
+from app.providers.clients import ProviderClientRegistry
+
+
+class ProviderClientRegistryTest(unittest.TestCase):
+    def test_client_is_reused_within_loop(self) -> None:
+        registry = ProviderClientRegistry(max_connections=4, max_keepalive_connections=2, http2=False)
+
+        async def scenario() -> None:
+            first = registry.get("openai")
+            second = registry.get("openai")
+            other = registry.get("anthropic")
+            self.assertIs(first, second)
+            self.assertIsNot(first, other)
+            self.assertEqual(registry.limits.max_connections, 4)
+            await registry.aclose()
+            self.assertTrue(first.is_closed)
+            self.assertTrue(other.is_closed)
+            self.assertIsNot(registry.get("openai"), first)
+            await registry.aclose()
+
+        asyncio.run(scenario())
+
+    def test_client_is_rebuilt_for_new_loop(self) -> None:
+        registry = ProviderClientRegistry(http2=False)
+
+        async def grab():
+            return registry.get("gemini")
+
+        first = asyncio.run(grab())
+        # The finished loop closed its client on shutdown.
+        self.assertTrue(first.is_closed)
+        second = asyncio.run(grab())
+        self.assertIsNot(first, second)
+
+    def test_replaced_client_is_closed_on_its_own_loop(self) -> None:
+        registry = ProviderClientRegistry(http2=False)
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever)
+        thread.start()
+        try:
+            async def grab():
+                return registry.get("openai")
+
+            first = asyncio.run_coroutine_threadsafe(grab(), other_loop).result(5)
+
+            async def replace() -> httpx.AsyncClient:
+                second = registry.get("openai")
+                for _ in range(100):
+                    if first.is_closed:
+                        break
+                    await asyncio.sleep(0.01)
+                return second
+
+            second = asyncio.run(replace())
+            self.assertIsNot(first, second)
+            self.assertTrue(first.is_closed)
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join(5)
+            pending = asyncio.all_tasks(other_loop)
+            for task in pending:
+                task.cancel()
+            other_loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            other_loop.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.db import create_db_and_tables, engine
+from app.models import (
+    CouncilRound,
+    GateResult,
+    Idea,
+    LiteratureQuery,
+    LiteratureWork,
+    ProviderCredential,
+    Review,
+    Run,
+)
+
+
+class QueryPlanTest(unittest.TestCase):
+    def setUp(self) -> None:
+        create_db_and_tables()
+
+    def _plan(self, statement) -> str:
+        sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+        with Session(engine) as session:
+            rows = session.exec(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        return "\n".join(row[-1] for row in rows)
+
+    def assertUsesIndex(self, statement, index: str) -> None:
+        plan = self._plan(statement)
+        self.assertIn(index, plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_hot_lookups_use_composite_indexes(self) -> None:
+        self.assertUsesIndex(
+            select(CouncilRound).where(CouncilRound.idea_id == 1).order_by(CouncilRound.round_number.desc()),
+            "ix_councilround_idea_round",
+        )
+        self.assertUsesIndex(
+            select(GateResult).where(GateResult.idea_id == 1, GateResult.gate == 4),
+            "ix_gateresult_idea_gate",
+        )
+        self.assertUsesIndex(
+            select(ProviderCredential)
+            .where(ProviderCredential.provider == "openai")
+            .order_by(ProviderCredential.created_at.desc()),
+            "ix_providercredential_provider_created",
+        )
+        self.assertUsesIndex(
+            select(LiteratureWork).where(LiteratureWork.query_id == 1, LiteratureWork.pdf_path == "a.pdf"),
+            "ix_literaturework_query_pdf",
+        )
+
+    def test_list_endpoints_read_newest_first_from_an_index(self) -> None:
+        for model, index in (
+            (Run, "ix_run_created_at"),
+            (Idea, "ix_idea_created_at"),
+            (Review, "ix_review_created_at"),
+            (LiteratureQuery, "ix_literaturequery_created_at"),
+        ):
+            self.assertUsesIndex(select(model).order_by(model.created_at.desc()).limit(5), index)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+from dataclasses import replace
+from unittest.mock import patch
+
+from app.providers.base import ProviderError, ProviderResponse, parse_retry_after
+from app.providers.rate_limit import (
+    ProviderLimiter,
+    RateLimitedProvider,
+    RateLimiterRegistry,
+    RateLimits,
+    TokenBucket,
+)
+from app.providers.resilience import CircuitBreakerRegistry, ResiliencePolicy, ResilientProvider
+
+
+def _limits(**overrides) -> RateLimits:
+    values = dict(
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        max_concurrency=4,
+    )
+    values.update(overrides)
+    return RateLimits(**values)
+
+
+def _policy(max_retries: int = 3) -> ResiliencePolicy:
+    return ResiliencePolicy(
+        max_retries=max_retries,
+        backoff_base=0.001,
+        backoff_max=0.01,
+        breaker_threshold=5,
+        breaker_reset_seconds=30.0,
+    )
+
+
+class FlakyProvider:
+    def __init__(self, failures: int, retry_after: float | None = None) -> None:
+        self.failures = failures
+        self.retry_after = retry_after
+        self.calls = 0
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ProviderError("Fake error 429: slow down", status_code=429, retry_after=self.retry_after)
+        return ProviderResponse(content="ok")
+
+
+class RateLimiterTest(unittest.TestCase):
+    def _provider(self, inner: FlakyProvider, limits: RateLimits, max_retries: int = 3) -> ResilientProvider:
+        registry = RateLimiterRegistry()
+        registry._limiters[("fake", "m")] = ProviderLimiter(limits)
+        limited = RateLimitedProvider("fake", inner, registry)
+        return ResilientProvider("fake", limited, CircuitBreakerRegistry(), _policy(max_retries))
+
+    def test_token_bucket_reports_wait_when_exhausted(self) -> None:
+        bucket = TokenBucket(60)
+        self.assertEqual(bucket.reserve(60), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1), 1.0, delta=0.05)
+        self.assertEqual(TokenBucket(0).reserve(10_000), 0.0)
+
+    def test_retries_429_and_shrinks_concurrency(self) -> None:
+        inner = FlakyProvider(failures=2)
+        provider = self._provider(inner, _limits())
+        response = asyncio.run(provider.generate("p", "m", "k"))
+        self.assertEqual(response.content, "ok")
+        self.assertEqual(inner.calls, 3)
+        limiter = provider.inner.registry.get("fake", "m")
+        self.assertEqual(limiter.rate_limited, 2)
+        # Halved twice (4 -> 2 -> 1), then one success grows it back by one.
+        self.assertEqual(limiter.concurrency, 2)
+
+    def test_gives_up_after_max_retries(self) -> None:
+        inner = FlakyProvider(failures=10)
+        provider = self._provider(inner, _limits(), max_retries=2)
+        with self.assertRaises(ProviderError):
+            asyncio.run(provider.generate("p", "m", "k"))
+        self.assertEqual(inner.calls, 3)
+
+    def test_honors_retry_after(self) -> None:
+        inner = FlakyProvider(failures=1, retry_after=7.5)
+        provider = self._provider(inner, _limits())
+        # Waits within the backoff cap are honored; longer ones fail fast.
+        provider.policy = replace(provider.policy, backoff_max=10.0)
+        sleeps: list[float] = []
+        real_sleep = asyncio.sleep
+
+        async def fake_sleep(delay: float) -> None:
+            sleeps.append(delay)
+            await real_sleep(0)
+
+        with patch("app.providers.resilience.asyncio.sleep", fake_sleep):
+            asyncio.run(provider.generate("p", "m", "k"))
+        self.assertIn(7.5, sleeps)
+
+    def test_concurrency_cap_is_enforced(self) -> None:
+        limiter = ProviderLimiter(_limits(max_concurrency=2))
+        peak = 0
+
+        async def worker() -> None:
+            nonlocal peak
+            await limiter.acquire(1)
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+            await limiter.release()
+
+        async def scenario() -> None:
+            await asyncio.gather(*[worker() for _ in range(6)])
+
+        asyncio.run(scenario())
+        self.assertEqual(peak, 2)
+
+    def test_parse_retry_after(self) -> None:
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
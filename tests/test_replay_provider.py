@@ -0,0 +1,197 @@
+import asyncio
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlmodel import Session, select
+
+from app.db import create_db_and_tables, engine
+from app.models import AgentMemo, CouncilMemo, CouncilRound, DossierPart, GateResult, Idea, LlmCall, Run, RunStatus
+from app.orchestrator import _provider_chain, run_swarm
+from app.providers.accounting import llm_scope
+from app.providers.base import ProviderError, ProviderResponse
+from app.providers.replay_provider import Cassette, LatencyModel, RecordingProvider, ReplayProvider, parse_error_rates
+from tests.test_orchestrator import VALID_PITCH, FakeProvider
+
+
+class NumberingProvider(FakeProvider):
+    # Answers the shared pitch prompt with a different title on every call.
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        # Numbered before the await, so concurrent pitch calls cannot share a number.
+        pitches = sum("Produce a single idea dossier PITCH.md" in call for call in [*self.calls, prompt])
+        response = await super().generate(prompt, model, api_key)
+        if "Produce a single idea dossier PITCH.md" in prompt:
+            response.content = VALID_PITCH.replace("Evasion Hubs", f"Idea {pitches}")
+        return response
+
+
+class UsageProvider:
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        return ProviderResponse(content=f"answer to {prompt}", prompt_tokens=5, completion_tokens=2)
+
+
+class ReplayProviderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cassette_path = Path(self.tmp_dir.name) / "cassette.jsonl"
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _replay(self, **kwargs) -> ReplayProvider:
+        kwargs.setdefault("latency", LatencyModel.parse("none"))
+        kwargs.setdefault("error_rates", [])
+        return ReplayProvider(cassette=Cassette(self.cassette_path), seed=1, **kwargs)
+
+    def test_recorded_session_replays_offline(self) -> None:
+        recorder = RecordingProvider("openai", UsageProvider(), Cassette(self.cassette_path))
+        asyncio.run(recorder.generate("p1", "m", "key"))
+        asyncio.run(recorder.generate("p2", "m", "key"))
+        self.assertEqual(len(Cassette(self.cassette_path)), 2)
+
+        replay = self._replay()
+        response = asyncio.run(replay.generate("p2", "other-model", ""))
+        self.assertEqual(response.content, "answer to p2")
+        self.assertEqual((response.prompt_tokens, response.completion_tokens), (5, 2))
+
+        async def collect() -> list[str]:
+            return [chunk async for chunk in replay.stream("p1", "m", "")]
+
+        replay.chunk_chars = 4
+        self.assertEqual(asyncio.run(collect()), ["answ", "er t", "o p1"])
+
+    def test_repeated_prompts_cycle_through_recordings(self) -> None:
+        cassette = Cassette(self.cassette_path)
+        for content in ("first", "second"):
+            RecordingProvider("x", UsageProvider(), cassette)._record("same", "m", content, 0.0, {})
+        replay = self._replay()
+        contents = [asyncio.run(replay.generate("same", "m", "")).content for _ in range(3)]
+        self.assertEqual(contents, ["first", "second", "first"])
+
+    def test_outcomes_do_not_depend_on_arrival_order(self) -> None:
+        cassette = Cassette(self.cassette_path)
+        for content in ("first", "second"):
+            RecordingProvider("x", UsageProvider(), cassette)._record("same", "m", content, 0.0, {})
+
+        def replay_in(order: list[int]) -> dict:
+            replay = self._replay(error_rates=[(503, 0.5)], latency=LatencyModel.parse("uniform:0:5"))
+            outcomes: dict = {}
+
+            async def call(idea_id: int) -> None:
+                with llm_scope(run_id=1, idea_id=idea_id):
+                    try:
+                        outcome = (await replay.generate("same", "m", "")).content
+                    except ProviderError as exc:
+                        outcome = exc.status_code
+                outcomes.setdefault(idea_id, []).append(outcome)
+
+            for idea_id in order:
+                asyncio.run(call(idea_id))
+            return outcomes
+
+        forward = replay_in([1, 1, 1, 2, 2, 2])
+        self.assertEqual(forward, replay_in([2, 1, 2, 1, 2, 1]))
+        self.assertEqual(forward[1], forward[2])
+        self.assertEqual(len(set(forward[1])), 2)
+
+    def test_missing_prompt_and_injected_errors(self) -> None:
+        with self.assertRaises(ProviderError) as missing:
+            asyncio.run(self._replay().generate("unknown", "m", ""))
+        self.assertEqual(missing.exception.status_code, 404)
+
+        with self.assertRaises(ProviderError) as injected:
+            asyncio.run(self._replay(error_rates=[(429, 1.0)]).generate("unknown", "m", ""))
+        self.assertEqual(injected.exception.status_code, 429)
+        self.assertEqual(parse_error_rates("429:0.05, 503:0.01"), [(429, 0.05), (503, 0.01)])
+
+    def test_latency_models(self) -> None:
+        rng = random.Random(0)
+        self.assertEqual(LatencyModel.parse("recorded", scale=0.5).sample(rng, 1000), 0.5)
+        self.assertEqual(LatencyModel.parse("fixed:250").sample(rng, 1000), 0.25)
+        self.assertEqual(LatencyModel.parse("none").sample(rng, 1000), 0.0)
+        self.assertTrue(0.1 <= LatencyModel.parse("uniform:100:200").sample(rng, None) <= 0.2)
+        with self.assertRaises(ValueError):
+            LatencyModel.parse("gamma:1")
+
+
+class ReplayRunSwarmTest(unittest.TestCase):
+    def setUp(self) -> None:
+        create_db_and_tables()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self.tmp_dir.name)
+        self.cassette_path = self.base_dir / "cassette.jsonl"
+        self.run_ids: list[int] = []
+
+    def tearDown(self) -> None:
+        with Session(engine) as session:
+            idea_ids = [
+                idea.id for idea in session.exec(select(Idea).where(Idea.run_id.in_(self.run_ids))).all()
+            ]
+            for model in (DossierPart, GateResult, CouncilMemo, CouncilRound):
+                session.exec(model.__table__.delete().where(model.idea_id.in_(idea_ids)))
+            session.exec(AgentMemo.__table__.delete().where(AgentMemo.run_id.in_(self.run_ids)))
+            session.exec(LlmCall.__table__.delete().where(LlmCall.run_id.in_(self.run_ids)))
+            session.exec(Idea.__table__.delete().where(Idea.run_id.in_(self.run_ids)))
+            session.exec(Run.__table__.delete().where(Run.id.in_(self.run_ids)))
+            session.commit()
+        engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def _run(self, provider, idea_count: int = 2) -> Run:
+        with Session(engine) as session:
+            run = Run(provider="replay", model="replay", idea_count=idea_count, concurrency=idea_count)
+            session.add(run)
+            session.commit()
+            run_id = run.id
+        self.run_ids.append(run_id)
+        with patch.dict("app.orchestrator.PROVIDERS", {"replay": _provider_chain("replay", provider)}):
+            asyncio.run(run_swarm(run_id, "unused-passphrase", self.base_dir))
+        with Session(engine) as session:
+            return session.get(Run, run_id)
+
+    def test_recorded_run_replays_without_credentials(self) -> None:
+        recorded = self._run(RecordingProvider("replay", FakeProvider(delay=0), Cassette(self.cassette_path)))
+        self.assertEqual(recorded.status, RunStatus.completed, recorded.log)
+
+        replayed = self._run(self._replay_provider())
+        self.assertEqual(replayed.status, RunStatus.completed, replayed.log)
+        with Session(engine) as session:
+            ideas = session.exec(select(Idea).where(Idea.run_id == replayed.id)).all()
+            calls = session.exec(select(LlmCall).where(LlmCall.run_id == replayed.id)).all()
+        self.assertEqual([idea.title for idea in ideas], ["Evasion Hubs", "Evasion Hubs"])
+        self.assertEqual(len(calls), 12)
+        self.assertEqual({call.status for call in calls}, {"ok"})
+
+    def test_multi_idea_run_replays_each_recorded_idea(self) -> None:
+        recorded = self._run(
+            RecordingProvider("replay", NumberingProvider(delay=0), Cassette(self.cassette_path)), idea_count=3
+        )
+        self.assertEqual(recorded.status, RunStatus.completed, recorded.log)
+
+        replayed = self._run(self._replay_provider(), idea_count=3)
+        self.assertEqual(replayed.status, RunStatus.completed, replayed.log)
+        with Session(engine) as session:
+            titles = {
+                run_id: sorted(idea.title for idea in session.exec(select(Idea).where(Idea.run_id == run_id)).all())
+                for run_id in (recorded.id, replayed.id)
+            }
+            calls = session.exec(select(LlmCall).where(LlmCall.run_id == replayed.id)).all()
+        self.assertEqual(titles[replayed.id], ["Idea 1", "Idea 2", "Idea 3"])
+        self.assertEqual(titles[replayed.id], titles[recorded.id])
+        # Every dossier prompt embeds its idea's pitch, so each one was found.
+        self.assertEqual(len(calls), 18)
+        self.assertEqual({call.status for call in calls}, {"ok"})
+
+    def _replay_provider(self) -> ReplayProvider:
+        return ReplayProvider(
+            cassette=Cassette(self.cassette_path),
+            latency=LatencyModel.parse("fixed:5"),
+            error_rates=[],
+            seed=0,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
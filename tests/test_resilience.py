@@ -0,0 +1,141 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from app.providers.base import ProviderError, ProviderResponse
+from app.providers.resilience import (
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    ResiliencePolicy,
+    ResilientProvider,
+    timeout_for,
+)
+
+
+def _policy(**overrides) -> ResiliencePolicy:
+    values = dict(
+        max_retries=3,
+        backoff_base=0.001,
+        backoff_max=0.01,
+        breaker_threshold=10,
+        breaker_reset_seconds=30.0,
+    )
+    values.update(overrides)
+    return ResiliencePolicy(**values)
+
+
+class ScriptedProvider:
+    def __init__(self, outcomes: list) -> None:
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        return ProviderResponse(content=self._next())
+
+    async def stream(self, prompt: str, model: str, api_key: str):
+        outcome = self._next()
+        yield outcome
+        if self.outcomes and isinstance(self.outcomes[0], BaseException):
+            raise self.outcomes.pop(0)
+
+
+def _server_error() -> ProviderError:
+    return ProviderError("Fake error 503: unavailable", status_code=503)
+
+
+class ResilientProviderTest(unittest.TestCase):
+    def _provider(self, inner: ScriptedProvider, **policy) -> ResilientProvider:
+        return ResilientProvider("fake", inner, CircuitBreakerRegistry(), _policy(**policy))
+
+    def test_retries_server_and_connection_errors(self) -> None:
+        inner = ScriptedProvider([_server_error(), httpx.ConnectError("refused"), httpx.ReadTimeout("slow")])
+        response = asyncio.run(self._provider(inner).generate("p", "m", "k"))
+        self.assertEqual(response.content, "ok")
+        self.assertEqual(inner.calls, 4)
+
+    def test_retry_after_beyond_backoff_max_fails_fast(self) -> None:
+        throttled = ProviderError("Fake error 429: slow down", status_code=429, retry_after=86400.0)
+        inner = ScriptedProvider([throttled])
+
+        async def scenario() -> None:
+            await asyncio.wait_for(self._provider(inner).generate("p", "m", "k"), 1.0)
+
+        with self.assertRaises(ProviderError) as raised:
+            asyncio.run(scenario())
+        self.assertIs(raised.exception, throttled)
+        self.assertEqual(inner.calls, 1)
+
+    def test_client_errors_are_not_retried(self) -> None:
+        inner = ScriptedProvider([ProviderError("Fake error 400: bad request", status_code=400)])
+        with self.assertRaises(ProviderError):
+            asyncio.run(self._provider(inner).generate("p", "m", "k"))
+        self.assertEqual(inner.calls, 1)
+
+    def test_stream_retries_only_before_first_chunk(self) -> None:
+        inner = ScriptedProvider([_server_error(), "partial", _server_error()])
+        provider = self._provider(inner)
+
+        async def collect(chunks: list[str]) -> None:
+            async for chunk in provider.stream("p", "m", "k"):
+                chunks.append(chunk)
+
+        chunks: list[str] = []
+        with self.assertRaises(ProviderError):
+            asyncio.run(collect(chunks))
+        self.assertEqual(chunks, ["partial"])
+        self.assertEqual(inner.calls, 2)
+
+    def test_breaker_opens_fails_fast_and_recovers(self) -> None:
+        inner = ScriptedProvider([_server_error() for _ in range(3)])
+        provider = self._provider(inner, max_retries=0, breaker_threshold=3, breaker_reset_seconds=60.0)
+        for _ in range(3):
+            with self.assertRaises(ProviderError):
+                asyncio.run(provider.generate("p", "m", "k"))
+        breaker = provider.breakers.get("fake", "m")
+        self.assertEqual(breaker.state, "open")
+
+        with self.assertRaises(CircuitOpenError) as opened:
+            asyncio.run(provider.generate("p", "m", "k"))
+        self.assertEqual(opened.exception.status_code, 503)
+        self.assertEqual(inner.calls, 3)
+
+        breaker.opened_at -= 60.0
+        self.assertEqual(breaker.state, "half_open")
+        self.assertEqual(asyncio.run(provider.generate("p", "m", "k")).content, "ok")
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(provider.breakers.snapshot()[0]["trips"], 1)
+
+    def test_rate_limits_do_not_trip_breaker(self) -> None:
+        inner = ScriptedProvider([ProviderError("Fake error 429", status_code=429, retry_after=0.001)] * 3)
+        provider = self._provider(inner, breaker_threshold=1)
+        asyncio.run(provider.generate("p", "m", "k"))
+        self.assertEqual(provider.breakers.get("fake", "m").state, "closed")
+
+
+class TimeoutTest(unittest.TestCase):
+    def test_defaults_and_overrides(self) -> None:
+        self.assertEqual(timeout_for("openai", "gpt-4o").read, 180.0)
+        self.assertEqual(timeout_for("anthropic", "claude").read, 60.0)
+        env = {
+            "CODEX_COUNCIL_GEMINI_TIMEOUT_SECONDS": "45",
+            "CODEX_COUNCIL_MODEL_TIMEOUTS": "gpt-5*=300, o1*=240",
+        }
+        with patch.dict(os.environ, env):
+            self.assertEqual(timeout_for("gemini", "gemini-2.5-flash").read, 45.0)
+            self.assertEqual(timeout_for("openai", "gpt-5-nano").read, 300.0)
+            self.assertEqual(timeout_for("openai", "gpt-4o").read, 180.0)
+            self.assertEqual(timeout_for("openai", "gpt-5-nano").connect, 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
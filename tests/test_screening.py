@@ -0,0 +1,34 @@
+import unittest
+
+from app.screening import parse_judge_scores, screen_score, template_gaps
+from app.structured import SCORE_FIELDS
+
+LANE = "Sanctions, Enforcement, and Evasion Ecosystems"
+SECTIONS = "\n".join([
+    "Theoretical puzzle + stakes: why hubs matter.",
+    "Predictions: uniform evasion would disconfirm.",
+    "Design family: DiD around designation shocks.",
+    "Novelty statement: new.",
+    "Kill criteria: no concentration.",
+])
+
+
+class ScreeningTest(unittest.TestCase):
+    def test_template_gaps_is_a_filter(self) -> None:
+        self.assertEqual(template_gaps(SECTIONS, LANE), [])
+        self.assertEqual(template_gaps(SECTIONS, "Astrology"), ["Lane Fit"])
+        self.assertEqual(
+            template_gaps("Theoretical puzzle: x", LANE),
+            ["Predictions", "Design family", "Novelty statement", "Kill criteria"],
+        )
+
+    def test_judge_scores_rank_substance(self) -> None:
+        strong = "\n".join(f"- **{label}**: 9/10" for label in SCORE_FIELDS.values())
+        weak = "\n".join(f"{label}: 6/10" for label in SCORE_FIELDS.values())
+        self.assertEqual(screen_score(parse_judge_scores(strong)), 9.0)
+        self.assertLess(screen_score(parse_judge_scores(weak)), 6.0)
+        self.assertIsNone(parse_judge_scores(weak.split("\n", 1)[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import unittest
+
+import httpx
+from sqlmodel import Session
+
+from app.db import create_db_and_tables, engine
+from app.models import DossierKind, DossierPart
+from app.providers.anthropic_provider import AnthropicProvider
+from app.providers.base import ProviderResponse, iter_sse_data
+from app.providers.clients import provider_clients
+from app.streaming import save_partial_content, stream_with_flush
+
+
+class ChunkedProvider:
+    def __init__(self, chunks: list[str], fail_after: int | None = None) -> None:
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    async def generate(self, prompt: str, model: str, api_key: str) -> ProviderResponse:
+        return ProviderResponse(content="".join(self.chunks))
+
+    async def stream(self, prompt: str, model: str, api_key: str):
+        for idx, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and idx >= self.fail_after:
+                raise RuntimeError("connection dropped")
+            yield chunk
+
+
+def _sse(events: list[dict]) -> bytes:
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events).encode("utf-8")
+
+
+class StreamingTest(unittest.TestCase):
+    def test_iter_sse_data_groups_data_lines(self) -> None:
+        body = b"event: ping\ndata: one\n\ndata: two\ndata: three\n\n: comment\ndata: four"
+        response = httpx.Response(200, content=body)
+
+        async def collect() -> list[str]:
+            return [item async for item in iter_sse_data(response)]
+
+        self.assertEqual(asyncio.run(collect()), ["one", "two\nthree", "four"])
+
+    def test_anthropic_stream_yields_text_deltas(self) -> None:
+        body = _sse([
+            {"type": "message_start"},
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hel"}},
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "lo"}},
+            {"type": "message_stop"},
+        ])
+        seen: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(json.loads(request.content))
+            return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+        async def scenario() -> list[str]:
+            provider_clients._clients["anthropic"] = (
+                httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+                asyncio.get_running_loop(),
+            )
+            try:
+                return [chunk async for chunk in AnthropicProvider().stream("hi", "claude", "key")]
+            finally:
+                await provider_clients.aclose()
+
+        self.assertEqual(asyncio.run(scenario()), ["Hel", "lo"])
+        self.assertTrue(seen[0]["stream"])
+
+    def test_stream_with_flush_reports_progress(self) -> None:
+        flushed: list[str] = []
+        content = asyncio.run(stream_with_flush(
+            ChunkedProvider(["a", "b", "c"]),
+            "prompt",
+            "m",
+            "k",
+            flushed.append,
+            interval=0,
+        ))
+        self.assertEqual(content, "abc")
+        self.assertEqual(flushed, ["a", "ab", "abc"])
+
+    def test_partial_content_survives_failure(self) -> None:
+        create_db_and_tables()
+        with Session(engine) as session:
+            part = DossierPart(idea_id=-1, kind=DossierKind.design, content="", partial=True)
+            session.add(part)
+            session.commit()
+            part_id = part.id
+        try:
+            with self.assertRaises(RuntimeError):
+                asyncio.run(stream_with_flush(
+                    ChunkedProvider(["Research ", "question", "!"], fail_after=2),
+                    "prompt",
+                    "m",
+                    "k",
+                    lambda text: save_partial_content(DossierPart, part_id, text),
+                    interval=0,
+                ))
+            with Session(engine) as session:
+                part = session.get(DossierPart, part_id)
+                self.assertEqual(part.content, "Research question")
+                self.assertTrue(part.partial)
+        finally:
+            with Session(engine) as session:
+                session.exec(DossierPart.__table__.delete().where(DossierPart.id == part_id))
+                session.commit()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
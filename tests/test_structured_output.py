@@ -0,0 +1,115 @@
+import json
+import unittest
+
+from app.main import _auto_gate4_status
+from app.models import CouncilMemo, GateStatus
+from app.orchestrator import _gate1_status, _render_council_draft
+from app.providers.anthropic_provider import AnthropicProvider
+from app.providers.base import response_schema
+from app.providers.gemini_provider import GeminiProvider
+from app.providers.openai_provider import CHAT_COMPLETIONS_URL, OpenAIProvider
+from app.structured import (
+    StructuredOutputError,
+    parse_structured,
+    render_council,
+    render_pitch,
+    repair_json,
+    salvage_council,
+    structured_prompt,
+)
+
+PITCH = {
+    "lane_primary": "Sanctions, Enforcement, and Evasion Ecosystems",
+    "lane_secondary": "",
+    "breakthrough_type": "mechanism",
+    "why_this_is_breakthrough": "Reframes evasion\nas a network good.",
+    "working_title": "Evasion Hubs",
+    "big_claim": "Evasion concentrates in a few hubs.",
+    "body": "Theoretical puzzle: why hubs?",
+}
+
+
+def council(verdict: str = "revise", score: float = 8) -> dict:
+    return {"memos": [{
+        "referee": "Referee A",
+        "verdict": verdict,
+        "strengths": ["Clear mechanism"],
+        "fatal_flaws": ["Thin data"],
+        "required_revisions": ["Add a placebo test"],
+        "scores": {field: score for field in (
+            "novelty", "stakes", "design", "data", "interpretability", "lane_fit", "breakthrough"
+        )},
+    }]}
+
+
+class StructuredOutputTest(unittest.TestCase):
+    def test_rendered_pitch_passes_gate1(self) -> None:
+        pitch = render_pitch(parse_structured("```json\n" + json.dumps(PITCH) + "\n```", "pitch"))
+        self.assertEqual(_gate1_status(pitch)[0], GateStatus.passed)
+        self.assertIn("WHY_THIS_IS_BREAKTHROUGH: Reframes evasion as a network good.", pitch)
+        self.assertNotIn("LANE_SECONDARY", pitch)
+        self.assertIn("Working title: Evasion Hubs", pitch)
+
+    def test_validation_rejects_drift(self) -> None:
+        with self.assertRaises(StructuredOutputError):
+            parse_structured("LANE_PRIMARY: x", "pitch")
+        with self.assertRaises(StructuredOutputError):
+            parse_structured(json.dumps({**PITCH, "lane_primary": None}), "pitch")
+        with self.assertRaises(StructuredOutputError):
+            parse_structured(json.dumps(council(verdict="maybe")), "council")
+        with self.assertRaises(StructuredOutputError):
+            parse_structured(json.dumps({"memos": []}), "council")
+
+    def test_rendered_council_feeds_gate4_scoring(self) -> None:
+        memos = render_council(parse_structured(json.dumps(council(verdict="accept", score=9)), "council"))
+        status, notes = _auto_gate4_status([CouncilMemo(idea_id=1, referee="A", content=memos[0])])
+        self.assertEqual(status, GateStatus.passed, notes)
+        memos = render_council(council(verdict="revise", score=5))
+        status, notes = _auto_gate4_status([CouncilMemo(idea_id=1, referee="A", content=memos[0])])
+        self.assertEqual(status, GateStatus.failed)
+        self.assertIn("Below thresholds", notes)
+
+    def test_damaged_json_is_repaired_locally(self) -> None:
+        self.assertEqual(repair_json('```json\n{"a": [1, 2,], "b": "x"}\n```'), {"a": [1, 2], "b": "x"})
+        self.assertEqual(repair_json('Here you go: {"a": 1, "b"'), {"a": 1})
+        self.assertEqual(repair_json('{"a": "cut, mid\\'), {"a": "cut, mid"})
+        self.assertIsNone(repair_json("LANE_PRIMARY: x"))
+
+        two = {"memos": [*council()["memos"], {**council()["memos"][0], "referee": "Referee B"}]}
+        text = json.dumps(two)
+        self.assertEqual([memo["referee"] for memo in salvage_council(text[:-2])], ["Referee A", "Referee B"])
+        self.assertEqual([memo["referee"] for memo in salvage_council(text[:len(text) - 40])], ["Referee A"])
+        self.assertEqual(salvage_council(text[:30]), [])
+
+    def test_council_draft_never_shows_raw_json(self) -> None:
+        text = json.dumps(council())
+        self.assertEqual(_render_council_draft(text[:30]), "")
+        draft = _render_council_draft(text[:-1])
+        self.assertTrue(draft.startswith("Referee A\nVerdict: revise"))
+        self.assertNotIn("{", draft)
+
+    def test_providers_request_native_structured_output(self) -> None:
+        prompt = structured_prompt("Produce a pitch.", "pitch")
+        self.assertEqual(response_schema(prompt)["name"], "pitch")
+
+        url, chat = OpenAIProvider()._request(prompt, "gpt-4o-mini")
+        self.assertEqual(url, CHAT_COMPLETIONS_URL)
+        self.assertEqual(chat["response_format"]["json_schema"]["name"], "pitch")
+        self.assertTrue(chat["response_format"]["json_schema"]["strict"])
+        _, responses = OpenAIProvider()._request(prompt, "gpt-5-nano")
+        self.assertEqual(responses["text"]["format"]["type"], "json_schema")
+        self.assertNotIn("response_format", OpenAIProvider()._request("plain", "gpt-4o-mini")[1])
+
+        anthropic = AnthropicProvider()
+        payload = anthropic._payload(prompt, "claude")
+        self.assertEqual(payload["tool_choice"], {"type": "tool", "name": "pitch"})
+        self.assertEqual(payload["tools"][0]["input_schema"]["required"][0], "lane_primary")
+        self.assertEqual(json.loads(anthropic._block_text({"type": "tool_use", "input": PITCH})), PITCH)
+
+        config = GeminiProvider()._generation_config(prompt, "gemini-2.5-flash")
+        self.assertEqual(config["responseMimeType"], "application/json")
+        self.assertNotIn("additionalProperties", json.dumps(config["responseSchema"]))
+
+
+if __name__ == "__main__":
+    unittest.main()